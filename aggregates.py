@@ -0,0 +1,47 @@
+from collections import Counter
+
+# Request fields that are counted incrementally
+AGGREGATE_COLUMNS = ('status', 'legislation_type', 'request_type', 'assigned_to', 'urgency')
+
+
+class RequestAggregates:
+    """Running counts of requests by status, legislation, type, assignee and urgency"""
+
+    def __init__(self, requests=()):
+        self.total = 0
+        self._counts = {column: Counter() for column in AGGREGATE_COLUMNS}
+        for request in requests:
+            self.add(request)
+
+    @classmethod
+    def from_counts(cls, total, counts):
+        """Start from precomputed totals; counts maps column -> {value: n}"""
+        aggregates = cls()
+        aggregates.total = total
+        for column in AGGREGATE_COLUMNS:
+            aggregates._counts[column].update(counts.get(column, {}))
+        return aggregates
+
+    def add(self, request):
+        """Count a newly created request"""
+        self.total += 1
+        for column in AGGREGATE_COLUMNS:
+            self._counts[column][request[column]] += 1
+
+    def change(self, old, new):
+        """Move a request between buckets after an update or transition"""
+        for column in AGGREGATE_COLUMNS:
+            if old[column] != new[column]:
+                counter = self._counts[column]
+                counter[old[column]] -= 1
+                if counter[old[column]] <= 0:
+                    del counter[old[column]]
+                counter[new[column]] += 1
+
+    def get(self, column, value):
+        """Return the number of requests with column == value"""
+        return self._counts[column].get(value, 0)
+
+    def counts(self, column):
+        """Return {value: count} for a column, largest groups first"""
+        return dict(self._counts[column].most_common())
@@ -0,0 +1,199 @@
+"""Async HTTP API over the FOI request engine, for intake portals and EHR integrations.
+
+Usage: python api.py [--host 127.0.0.1] [--port 8000] [--db foi_requests.db] [--roster staff.json]
+       (or: uvicorn api:app)
+
+  GET  /requests?status=&legislation=&assigned_to=&urgency=&q=&limit=&cursor=
+                                                                       page through requests
+  GET  /requests/{id}                                                  one request
+  POST /requests               {"requests": [...]} or one request      create in one transaction
+                                                                       (requests without assigned_to are auto-assigned)
+  POST /requests/transitions   {"transitions": [{"id", "status", "version"}]}
+  GET  /assignees                                                      open workload per assignee
+  POST /assignees/rebalance                                            move unstarted work off overloaded staff
+  GET  /metrics[?format=json]                                          timings and counters (Prometheus text)
+"""
+import argparse
+import contextlib
+import json
+import sqlite3
+import sys
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from assignment import DEFAULT_ROSTER_PATH, AssignmentEngine, load_roster
+from core import ValidationError, create_requests, find_requests, transition_requests
+from metrics import REGISTRY, span
+from store import DEFAULT_DB_PATH, RequestStore
+
+# Largest batch accepted by the create and transition endpoints
+MAX_BATCH_SIZE = 5000
+
+
+def _error(status_code, message):
+    return JSONResponse({'error': message}, status_code=status_code)
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except json.JSONDecodeError:
+        return None
+
+
+def _batch(body, key):
+    """Return the list under key, or a single object wrapped in a list"""
+    if isinstance(body, dict) and key in body:
+        body = body[key]
+    elif isinstance(body, dict):
+        body = [body]
+    if not isinstance(body, list) or not all(isinstance(item, dict) for item in body):
+        return None
+    return body
+
+
+def _timed(endpoint):
+    """Record each call of an endpoint as an 'api' span labelled with its name"""
+    async def timed(request):
+        with span('api', endpoint=endpoint.__name__):
+            return await endpoint(request)
+    return timed
+
+
+def _synced(store, call, *args, **kwargs):
+    """Pick up other processes' changes before touching the store (runs in the thread pool)"""
+    store.sync()
+    return call(store, *args, **kwargs)
+
+
+async def list_requests(request):
+    params = request.query_params
+    try:
+        limit = int(params.get('limit', 50))
+    except ValueError:
+        return _error(400, "limit must be an integer")
+    try:
+        requests, next_cursor = await run_in_threadpool(
+            _synced,
+            request.app.state.store,
+            find_requests,
+            status=params.getlist('status') or None,
+            legislation=params.getlist('legislation') or None,
+            assigned_to=params.getlist('assigned_to') or None,
+            urgency=params.getlist('urgency') or None,
+            search=params.get('q'),
+            limit=limit,
+            cursor=params.get('cursor')
+        )
+    except ValidationError as e:
+        return _error(400, str(e))
+    return JSONResponse({'requests': requests, 'next_cursor': next_cursor})
+
+
+async def get_request(request):
+    found = await run_in_threadpool(
+        _synced, request.app.state.store, lambda store, request_id: store.get(request_id),
+        request.path_params['request_id']
+    )
+    if found is None:
+        return _error(404, "Request not found")
+    return JSONResponse(found)
+
+
+async def create(request):
+    items = _batch(await _json_body(request), 'requests')
+    if items is None:
+        return _error(400, "Body must be a request object or {\"requests\": [...]}")
+    if len(items) > MAX_BATCH_SIZE:
+        return _error(413, f"At most {MAX_BATCH_SIZE} requests per batch")
+    try:
+        created, errors = await run_in_threadpool(
+            _synced, request.app.state.store, create_requests, items, assigner=request.app.state.assigner
+        )
+    except sqlite3.IntegrityError as e:
+        return _error(409, f"Batch rolled back: {e}")
+    return JSONResponse(
+        {'created': created, 'errors': [{'index': index, 'error': message} for index, message in errors]},
+        status_code=201 if created else 422
+    )
+
+
+async def transition(request):
+    items = _batch(await _json_body(request), 'transitions')
+    if items is None:
+        return _error(400, "Body must be {\"transitions\": [{\"id\": ..., \"status\": ...}]}")
+    if len(items) > MAX_BATCH_SIZE:
+        return _error(413, f"At most {MAX_BATCH_SIZE} transitions per batch")
+    results = await run_in_threadpool(_synced, request.app.state.store, transition_requests, items)
+    return JSONResponse({'results': results})
+
+
+async def workload(request):
+    frame = await run_in_threadpool(
+        _synced, request.app.state.store, lambda store, assigner: assigner.workload(), request.app.state.assigner
+    )
+    return JSONResponse({'assignees': frame.to_dict('records')})
+
+
+async def rebalance(request):
+    moves = await run_in_threadpool(
+        _synced, request.app.state.store, lambda store, assigner: assigner.rebalance(), request.app.state.assigner
+    )
+    return JSONResponse({'moved': [{'id': request_id, 'assigned_to': name} for request_id, name in moves.items()]})
+
+
+async def metrics(request):
+    if request.query_params.get('format') == 'json':
+        return JSONResponse(REGISTRY.to_dict())
+    return PlainTextResponse(REGISTRY.to_prometheus(), media_type='text/plain; version=0.0.4')
+
+
+def create_app(db_path=DEFAULT_DB_PATH, roster_path=DEFAULT_ROSTER_PATH):
+    """Build the API application around a request store opened at startup
+
+    New requests are auto-assigned to the staff in the roster_path JSON file,
+    or to staff inferred from recent requests when there is none.
+    """
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        app.state.store = RequestStore(db_path)
+        app.state.assigner = AssignmentEngine(app.state.store, load_roster(roster_path) if roster_path else None)
+        yield
+        app.state.store.close()
+
+    return Starlette(
+        routes=[
+            Route('/requests', _timed(list_requests), methods=['GET']),
+            Route('/requests', _timed(create), methods=['POST']),
+            Route('/requests/transitions', _timed(transition), methods=['POST']),
+            Route('/assignees', _timed(workload), methods=['GET']),
+            Route('/assignees/rebalance', _timed(rebalance), methods=['POST']),
+            Route('/metrics', metrics, methods=['GET']),
+            Route('/requests/{request_id}', _timed(get_request), methods=['GET']),
+        ],
+        lifespan=lifespan
+    )
+
+
+app = create_app()
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the FOI request HTTP API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Request store database path")
+    parser.add_argument('--roster', default=DEFAULT_ROSTER_PATH,
+                        help="JSON file of {name: {capacity, legislations}} (default: FOI_ROSTER, else inferred)")
+    args = parser.parse_args(argv)
+    uvicorn.run(create_app(args.db, args.roster), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,24 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
+import os
+import sqlite3
+
+from store import RequestStore, InvalidTransition, StaleRequest, URGENCY_LEVELS, can_transition
+from core import REQUEST_TYPES, REQUIRED_COLUMNS, ValidationError, create_request, transition_request
+from importer import import_file
+from exporter import EXPORT_FORMATS, export_to_tempfile
+from deadlines import LEGISLATION_RULES, days_remaining, today_snapshot
+from fees import MEDIA
+from trends import TREND_WINDOWS, TrendCache, window
+from scheduler import DeadlineScheduler
+from assignment import AssignmentEngine, default_roster
+from metrics import REGISTRY, begin_trace, count, serve, span
+
+# Time the whole rerun; the trace collects this rerun's spans for the debug panel
+trace = begin_trace()
+rerun_span = span('rerun')
 
 # Page configuration
 st.set_page_config(
@@ -52,77 +69,119 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'requests' not in st.session_state:
-    st.session_state.requests = [
-        {
-            'id': 'FOI-2024-001',
-            'requester_name': 'John Smith',
-            'request_type': 'Personal Health Information',
-            'date_received': '2024-11-01',
-            'due_date': '2024-12-01',
-            'status': 'In Progress',
-            'assigned_to': 'Sarah Johnson',
-            'legislation_type': 'PHIPA',
-            'description': 'Request for complete medical records from 2020-2024',
-            'third_party_notification': False,
-            'fee_estimate': 0,
-            'extension_granted': False
-        },
-        {
-            'id': 'FOI-2024-002',
-            'requester_name': 'Law Firm ABC',
-            'request_type': 'Legal/Insurance',
-            'date_received': '2024-11-15',
-            'due_date': '2024-12-15',
-            'status': 'Pending Review',
-            'assigned_to': 'Michael Chen',
-            'legislation_type': 'FIPPA',
-            'description': 'Incident reports and security footage from June 2024',
-            'third_party_notification': True,
-            'fee_estimate': 120,
-            'extension_granted': False
-        },
-        {
-            'id': 'FOI-2024-003',
-            'requester_name': 'Jane Doe',
-            'request_type': 'Audit Logs',
-            'date_received': '2024-10-20',
-            'due_date': '2024-11-19',
-            'status': 'In Progress',
-            'assigned_to': 'Sarah Johnson',
-            'legislation_type': 'PHIPA',
-            'description': 'Access logs for patient health record #12345',
-            'third_party_notification': False,
-            'fee_estimate': 0,
-            'extension_granted': False
-        }
-    ]
+# Seed records loaded into an empty store
+SEED_REQUESTS = [
+    {
+        'id': 'FOI-2024-001',
+        'requester_name': 'John Smith',
+        'request_type': 'Personal Health Information',
+        'date_received': '2024-11-01',
+        'due_date': '2024-12-01',
+        'status': 'In Progress',
+        'assigned_to': 'Sarah Johnson',
+        'legislation_type': 'PHIPA',
+        'description': 'Request for complete medical records from 2020-2024',
+        'third_party_notification': False,
+        'fee_estimate': 0,
+        'extension_granted': False
+    },
+    {
+        'id': 'FOI-2024-002',
+        'requester_name': 'Law Firm ABC',
+        'request_type': 'Legal/Insurance',
+        'date_received': '2024-11-15',
+        'due_date': '2024-12-15',
+        'status': 'Pending Review',
+        'assigned_to': 'Michael Chen',
+        'legislation_type': 'FIPPA',
+        'description': 'Incident reports and security footage from June 2024',
+        'third_party_notification': True,
+        'fee_estimate': 120,
+        'extension_granted': False
+    },
+    {
+        'id': 'FOI-2024-003',
+        'requester_name': 'Jane Doe',
+        'request_type': 'Audit Logs',
+        'date_received': '2024-10-20',
+        'due_date': '2024-11-19',
+        'status': 'In Progress',
+        'assigned_to': 'Sarah Johnson',
+        'legislation_type': 'PHIPA',
+        'description': 'Access logs for patient health record #12345',
+        'third_party_notification': False,
+        'fee_estimate': 0,
+        'extension_granted': False
+    }
+]
 
-# Helper functions
-def calculate_due_date(received_date, legislation):
-    """Calculate due date based on legislation (30 days for PHIPA/FIPPA/MFIPPA)"""
-    date_obj = datetime.strptime(received_date, '%Y-%m-%d')
-    due_date = date_obj + timedelta(days=30)
-    return due_date.strftime('%Y-%m-%d')
-
-def calculate_fee(request_type, legislation):
-    """Calculate estimated fee based on request type and legislation"""
-    if request_type == 'Personal Health Information' and legislation == 'PHIPA':
-        return 0
-    elif legislation == 'FIPPA':
-        return 30  # Application fee
-    elif legislation == 'MFIPPA':
-        return 5  # Application fee
-    return 0
-
-def get_days_remaining(due_date):
-    """Calculate days remaining until due date"""
-    due = datetime.strptime(due_date, '%Y-%m-%d')
-    today = datetime.now()
-    diff = (due - today).days
-    return diff
+# 'thread' runs the deadline scheduler inside the app; use 'worker' when scheduler.py runs separately
+SCHEDULER_MODE = os.environ.get('FOI_SCHEDULER', 'thread')
+
+# Set FOI_METRICS_PORT to serve /metrics (Prometheus) and /metrics.json; FOI_DEBUG_PANEL=1 adds a sidebar profile
+METRICS_PORT = os.environ.get('FOI_METRICS_PORT')
+DEBUG_PANEL = os.environ.get('FOI_DEBUG_PANEL') == '1'
+
+# Search results beyond this many are shown as "1000+" rather than counted
+MATCH_COUNT_LIMIT = 1000
+
+# Flagged requests listed on the Dashboard; the full list is a click away on All Requests
+URGENT_PANEL_SIZE = 5
+
+@st.cache_resource
+def get_store():
+    """Open the shared request store, seeding it on first use"""
+    store = RequestStore()
+    store.seed(SEED_REQUESTS)
+    return store
+
+@st.cache_resource
+def get_trend_cache():
+    """Shared trend rollups, recomputed only when requests change"""
+    return TrendCache(get_store())
+
+@st.cache_resource
+def get_assigner():
+    """Shared staff workload queues used to auto-assign new requests (roster from FOI_ROSTER if set)"""
+    return AssignmentEngine(get_store(), default_roster())
+
+@st.cache_resource
+def get_scheduler():
+    """Start the background scheduler that flags At Risk and Overdue requests"""
+    return DeadlineScheduler(get_store()).start()
+
+@st.cache_resource
+def get_metrics_server():
+    """Serve the process-wide timings and counters on a local port"""
+    return serve(int(METRICS_PORT))
+
+if METRICS_PORT:
+    get_metrics_server()
+
+startup_span = span('startup')
+store = get_store()
+if SCHEDULER_MODE == 'thread':
+    get_scheduler()
+# Pick up changes written by other processes (importer, scheduler, API)
+store.sync()
+
+# Tell this session about requests other users changed since its last render
+seen_seq = st.session_state.get('seen_change_seq')
+latest_seq, changed_ids = store.changes_since(seen_seq) if seen_seq is not None else (store.change_seq(), [])
+own_changes = st.session_state.pop('own_changes', set())
+changed_by_others = [i for i in changed_ids or [] if i not in own_changes]
+if changed_by_others:
+    more = f" and {len(changed_by_others) - 3} more" if len(changed_by_others) > 3 else ""
+    st.toast(f"🔄 Updated by other users: {', '.join(changed_by_others[:3])}{more}")
+st.session_state.seen_change_seq = latest_seq
+
+startup_span.stop()
 
+# One "today" snapshot shared by every page in this render; days remaining are
+# worked out only for the requests a page shows
+now = today_snapshot()
+
+# Helper functions
 def get_status_color(status):
     """Return color code for status"""
     colors = {
@@ -139,11 +198,17 @@ def get_status_badge(status):
     color = get_status_color(status)
     return f'<span class="status-badge" style="background-color: {color};">{status}</span>'
 
+def show_urgent_requests():
+    """Open All Requests filtered to every flagged request (button callback)"""
+    st.session_state.nav_page = "All Requests"
+    st.session_state.urgency_filter = list(URGENCY_LEVELS)
+
 # Sidebar Navigation
 st.sidebar.title("📋 Navigation")
 page = st.sidebar.radio(
     "Select Page",
-    ["Dashboard", "All Requests", "New Request", "Analytics"]
+    ["Dashboard", "All Requests", "New Request", "Analytics"],
+    key="nav_page"
 )
 
 st.sidebar.markdown("---")
@@ -161,356 +226,544 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# DASHBOARD PAGE
-if page == "Dashboard":
-    st.header("📊 Dashboard Overview")
-    
-    # Calculate statistics
-    df = pd.DataFrame(st.session_state.requests)
-    total_requests = len(df)
-    pending = len(df[df['status'] == 'Pending Review'])
-    in_progress = len(df[df['status'] == 'In Progress'])
-    completed = len(df[df['status'] == 'Completed'])
-    
-    # Calculate overdue
-    overdue = 0
-    for req in st.session_state.requests:
-        if get_days_remaining(req['due_date']) < 0 and req['status'] != 'Completed':
-            overdue += 1
-    
-    # Display statistics in columns
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown("""
-        <div class="stat-card" style="border-top: 4px solid #3b82f6;">
-            <h3 style="color: #3b82f6; margin: 0;">Total Requests</h3>
-            <h1 style="margin: 0.5rem 0;">{}</h1>
-        </div>
-        """.format(total_requests), unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("""
-        <div class="stat-card" style="border-top: 4px solid #f59e0b;">
-            <h3 style="color: #f59e0b; margin: 0;">Pending Review</h3>
-            <h1 style="margin: 0.5rem 0;">{}</h1>
-        </div>
-        """.format(pending), unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown("""
-        <div class="stat-card" style="border-top: 4px solid #10b981;">
-            <h3 style="color: #10b981; margin: 0;">In Progress</h3>
-            <h1 style="margin: 0.5rem 0;">{}</h1>
-        </div>
-        """.format(in_progress), unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown("""
-        <div class="stat-card" style="border-top: 4px solid #ef4444;">
-            <h3 style="color: #ef4444; margin: 0;">Overdue</h3>
-            <h1 style="margin: 0.5rem 0;">{}</h1>
-        </div>
-        """.format(overdue), unsafe_allow_html=True)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Urgent Attention Section
-    st.subheader("⚠️ Urgent Attention Required")
-    
-    urgent_requests = []
-    for req in st.session_state.requests:
-        days_left = get_days_remaining(req['due_date'])
-        if days_left <= 5 and req['status'] != 'Completed':
-            urgent_requests.append({**req, 'days_left': days_left})
-    
-    urgent_requests.sort(key=lambda x: x['days_left'])
-    
-    if urgent_requests:
-        for req in urgent_requests:
-            days_text = f"{abs(req['days_left'])} days overdue" if req['days_left'] < 0 else f"{req['days_left']} days remaining"
-            color = "#dc2626" if req['days_left'] < 0 else "#ea580c"
-            
-            st.markdown(f"""
-            <div class="urgent-card">
-                <div style="display: flex; justify-content: space-between; align-items: center;">
-                    <div>
-                        <strong>{req['id']} - {req['requester_name']}</strong><br>
-                        <span style="color: #6b7280; font-size: 0.875rem;">{req['request_type']}</span>
-                    </div>
-                    <div style="text-align: right;">
-                        <strong style="color: {color}; font-size: 1.125rem;">{days_text}</strong><br>
-                        <span style="color: #6b7280; font-size: 0.875rem;">Due: {req['due_date']}</span>
-                    </div>
-                </div>
+page_span = span('page', page=page)
+
+# st.rerun() ends the script early by raising, so the spans are stopped on the way out as well
+try:
+    # DASHBOARD PAGE
+    if page == "Dashboard":
+        st.header("📊 Dashboard Overview")
+        
+        # Read statistics from the incrementally maintained counters
+        aggregates = store.aggregates
+        total_requests = aggregates.total
+        pending = aggregates.get('status', 'Pending Review')
+        in_progress = aggregates.get('status', 'In Progress')
+        completed = aggregates.get('status', 'Completed')
+        
+        # Overdue flags are kept current by the deadline scheduler
+        overdue = aggregates.get('urgency', 'Overdue')
+        
+        # Display statistics in columns
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.markdown("""
+            <div class="stat-card" style="border-top: 4px solid #3b82f6;">
+                <h3 style="color: #3b82f6; margin: 0;">Total Requests</h3>
+                <h1 style="margin: 0.5rem 0;">{}</h1>
             </div>
-            """, unsafe_allow_html=True)
-    else:
-        st.success("✅ No urgent requests at this time")
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    
-    # Recent Activity
-    st.subheader("📅 Recent Requests")
-    recent_df = df.sort_values('date_received', ascending=False).head(5)
-    
-    for _, row in recent_df.iterrows():
-        with st.expander(f"{row['id']} - {row['requester_name']} ({row['status']})"):
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write(f"**Type:** {row['request_type']}")
-                st.write(f"**Legislation:** {row['legislation_type']}")
-                st.write(f"**Received:** {row['date_received']}")
-            with col2:
-                st.write(f"**Due Date:** {row['due_date']}")
-                st.write(f"**Assigned To:** {row['assigned_to']}")
-                st.write(f"**Fee:** ${row['fee_estimate']}")
-
-# ALL REQUESTS PAGE
-elif page == "All Requests":
-    st.header("📑 All FOI Requests")
-    
-    # Filters
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        status_filter = st.multiselect(
-            "Filter by Status",
-            options=['Pending Review', 'In Progress', 'Completed', 'Extended', 'Overdue'],
-            default=[]
-        )
-    with col2:
-        legislation_filter = st.multiselect(
-            "Filter by Legislation",
-            options=['PHIPA', 'FIPPA', 'MFIPPA'],
-            default=[]
-        )
-    with col3:
-        search_term = st.text_input("Search by Requester Name or ID")
-    
-    # Filter requests
-    filtered_requests = st.session_state.requests.copy()
-    
-    if status_filter:
-        filtered_requests = [r for r in filtered_requests if r['status'] in status_filter]
-    
-    if legislation_filter:
-        filtered_requests = [r for r in filtered_requests if r['legislation_type'] in legislation_filter]
-    
-    if search_term:
-        filtered_requests = [r for r in filtered_requests if 
-                            search_term.lower() in r['requester_name'].lower() or 
-                            search_term.lower() in r['id'].lower()]
-    
-    st.markdown(f"**Showing {len(filtered_requests)} of {len(st.session_state.requests)} requests**")
-    st.markdown("---")
-    
-    # Display requests
-    if filtered_requests:
-        for req in filtered_requests:
-            days_left = get_days_remaining(req['due_date'])
-            
-            with st.expander(f"**{req['id']}** - {req['requester_name']} - {req['status']}"):
-                col1, col2, col3 = st.columns(3)
+            """.format(total_requests), unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown("""
+            <div class="stat-card" style="border-top: 4px solid #f59e0b;">
+                <h3 style="color: #f59e0b; margin: 0;">Pending Review</h3>
+                <h1 style="margin: 0.5rem 0;">{}</h1>
+            </div>
+            """.format(pending), unsafe_allow_html=True)
+        
+        with col3:
+            st.markdown("""
+            <div class="stat-card" style="border-top: 4px solid #10b981;">
+                <h3 style="color: #10b981; margin: 0;">In Progress</h3>
+                <h1 style="margin: 0.5rem 0;">{}</h1>
+            </div>
+            """.format(in_progress), unsafe_allow_html=True)
+        
+        with col4:
+            st.markdown("""
+            <div class="stat-card" style="border-top: 4px solid #ef4444;">
+                <h3 style="color: #ef4444; margin: 0;">Overdue</h3>
+                <h1 style="margin: 0.5rem 0;">{}</h1>
+            </div>
+            """.format(overdue), unsafe_allow_html=True)
+        
+        st.markdown("<br>", unsafe_allow_html=True)
+        
+        # Urgent Attention Section
+        st.subheader("⚠️ Urgent Attention Required")
+        
+        # Indexed read of the requests the scheduler has flagged, most urgent first
+        urgent_total = sum(aggregates.get('urgency', level) for level in URGENCY_LEVELS)
+        with span('dashboard.urgent_query'):
+            urgent_requests = store.query(urgency=list(URGENCY_LEVELS), order_by='due_date', limit=URGENT_PANEL_SIZE)
+            for req, days_left in zip(urgent_requests, days_remaining([r['due_date'] for r in urgent_requests], now)):
+                req['days_left'] = int(days_left)
+        
+        if urgent_requests:
+            count('widgets_emitted', len(urgent_requests), section='dashboard.urgent')
+            for req in urgent_requests:
+                days_text = f"{abs(req['days_left'])} days overdue" if req['days_left'] < 0 else f"{req['days_left']} days remaining"
+                color = "#dc2626" if req['days_left'] < 0 else "#ea580c"
                 
+                st.markdown(f"""
+                <div class="urgent-card">
+                    <div style="display: flex; justify-content: space-between; align-items: center;">
+                        <div>
+                            <strong>{req['id']} - {req['requester_name']}</strong><br>
+                            <span style="color: #6b7280; font-size: 0.875rem;">{req['request_type']}</span>
+                        </div>
+                        <div style="text-align: right;">
+                            <strong style="color: {color}; font-size: 1.125rem;">{days_text}</strong><br>
+                            <span style="color: #6b7280; font-size: 0.875rem;">Due: {req['due_date']}</span>
+                        </div>
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
+            if urgent_total > len(urgent_requests):
+                st.caption(f"Showing the {len(urgent_requests)} most urgent of {urgent_total} flagged requests")
+                st.button(f"View all {urgent_total} urgent requests", on_click=show_urgent_requests)
+        else:
+            st.success("✅ No urgent requests at this time")
+        
+        st.markdown("<br>", unsafe_allow_html=True)
+        
+        # Recent Activity
+        st.subheader("📅 Recent Requests")
+        recent_requests = store.recent(5)
+        count('widgets_emitted', len(recent_requests), section='dashboard.recent')
+        for row in recent_requests:
+            with st.expander(f"{row['id']} - {row['requester_name']} ({row['status']})"):
+                col1, col2 = st.columns(2)
                 with col1:
-                    st.write(f"**Request Type:** {req['request_type']}")
-                    st.write(f"**Legislation:** {req['legislation_type']}")
-                    st.write(f"**Date Received:** {req['date_received']}")
-                    st.write(f"**Due Date:** {req['due_date']}")
-                
+                    st.write(f"**Type:** {row['request_type']}")
+                    st.write(f"**Legislation:** {row['legislation_type']}")
+                    st.write(f"**Received:** {row['date_received']}")
                 with col2:
-                    st.write(f"**Assigned To:** {req['assigned_to']}")
-                    st.write(f"**Status:** {req['status']}")
-                    days_color = "🔴" if days_left < 0 else "🟡" if days_left <= 5 else "🟢"
-                    days_text = f"{abs(days_left)} days overdue" if days_left < 0 else f"{days_left} days remaining"
-                    st.write(f"**Time Remaining:** {days_color} {days_text}")
-                    st.write(f"**Fee Estimate:** ${req['fee_estimate']}")
-                
-                with col3:
-                    st.write(f"**Third-Party Notice:** {'Yes' if req['third_party_notification'] else 'No'}")
-                    st.write(f"**Extension Granted:** {'Yes' if req['extension_granted'] else 'No'}")
-                
-                st.markdown("**Description:**")
-                st.info(req['description'])
-                
-                # Action buttons
-                st.markdown("---")
-                action_col1, action_col2, action_col3 = st.columns(3)
-                
-                with action_col1:
-                    if req['status'] == 'Pending Review':
-                        if st.button(f"▶️ Start Processing", key=f"start_{req['id']}"):
-                            for r in st.session_state.requests:
-                                if r['id'] == req['id']:
-                                    r['status'] = 'In Progress'
-                            st.success("Status updated to In Progress")
-                            st.rerun()
-                
-                with action_col2:
-                    if req['status'] == 'In Progress' and not req['extension_granted']:
-                        if st.button(f"⏰ Grant Extension", key=f"extend_{req['id']}"):
-                            for r in st.session_state.requests:
-                                if r['id'] == req['id']:
-                                    current_due = datetime.strptime(r['due_date'], '%Y-%m-%d')
-                                    new_due = current_due + timedelta(days=30)
-                                    r['due_date'] = new_due.strftime('%Y-%m-%d')
-                                    r['extension_granted'] = True
-                                    r['status'] = 'Extended'
-                            st.success("30-day extension granted")
-                            st.rerun()
-                
-                with action_col3:
-                    if req['status'] in ['In Progress', 'Extended']:
-                        if st.button(f"✅ Mark Complete", key=f"complete_{req['id']}"):
-                            for r in st.session_state.requests:
-                                if r['id'] == req['id']:
-                                    r['status'] = 'Completed'
-                            st.success("Request marked as completed")
-                            st.rerun()
-    else:
-        st.info("No requests found matching your filters")
-
-# NEW REQUEST PAGE
-elif page == "New Request":
-    st.header("➕ Create New FOI Request")
-    
-    with st.form("new_request_form"):
-        col1, col2 = st.columns(2)
+                    st.write(f"**Due Date:** {row['due_date']}")
+                    st.write(f"**Assigned To:** {row['assigned_to']}")
+                    st.write(f"**Fee:** ${row['fee_estimate']}")
+
+    # ALL REQUESTS PAGE
+    elif page == "All Requests":
+        st.header("📑 All FOI Requests")
         
+        # Filters
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
-            requester_name = st.text_input("Requester Name *", placeholder="Full name or organization")
-            request_type = st.selectbox(
-                "Request Type *",
-                options=[
-                    "Personal Health Information",
-                    "General Records",
-                    "Security and Incident Footage",
-                    "Audit Logs",
-                    "Legal/Insurance",
-                    "Correction Request",
-                    "Estate/Deceased Patient Access"
-                ]
+            status_filter = st.multiselect(
+                "Filter by Status",
+                options=['Pending Review', 'In Progress', 'Completed', 'Extended'],
+                default=[]
             )
-            date_received = st.date_input("Date Received *", value=datetime.now())
-        
         with col2:
-            legislation_type = st.selectbox(
-                "Legislation Type *",
-                options=["PHIPA", "FIPPA", "MFIPPA"]
+            urgency_filter = st.multiselect(
+                "Filter by Deadline",
+                options=list(URGENCY_LEVELS),
+                key="urgency_filter"
             )
-            assigned_to = st.text_input("Assigned To", placeholder="Staff member name")
-            third_party = st.checkbox("Third-party notification required")
+        with col3:
+            legislation_filter = st.multiselect(
+                "Filter by Legislation",
+                options=['PHIPA', 'FIPPA', 'MFIPPA'],
+                default=[]
+            )
+        with col4:
+            search_term = st.text_input("Search by Requester, ID, Description or Assignee")
+        
+        page_size = st.selectbox("Rows per page", options=[25, 50, 100], index=0)
+        
+        # Filter requests with an indexed query, one page at a time
+        query_span = span('requests.query')
+        filters = dict(status=status_filter, urgency=urgency_filter, legislation=legislation_filter, search=search_term)
+        # Searches stop counting past MATCH_COUNT_LIMIT; common terms would otherwise read every match
+        total_matches = store.count(limit=MATCH_COUNT_LIMIT if search_term else None, **filters)
+        more_matches = total_matches > MATCH_COUNT_LIMIT and bool(search_term)
+        if more_matches:
+            total_matches = MATCH_COUNT_LIMIT
+        
+        # Reset the page cursor whenever the filters or page size change
+        filter_key = (tuple(status_filter), tuple(urgency_filter), tuple(legislation_filter), search_term, page_size)
+        if st.session_state.get('page_filter_key') != filter_key:
+            st.session_state.page_filter_key = filter_key
+            st.session_state.page_cursors = [None]
+        cursors = st.session_state.page_cursors
+        page_number = len(cursors)
+        page_count = max(1, -(-total_matches // page_size), page_number if more_matches else 1)
         
-        description = st.text_area(
-            "Request Description *",
-            placeholder="Provide detailed description of the information being requested...",
-            height=150
+        if search_term:
+            # Ranked full-text matches, paged by offset
+            page_requests = store.search(
+                search_term,
+                limit=page_size,
+                offset=(page_number - 1) * page_size,
+                status=status_filter,
+                urgency=urgency_filter,
+                legislation=legislation_filter
+            )
+        else:
+            page_requests = store.query(limit=page_size, after=cursors[-1], **filters)
+        query_span.stop()
+        
+        more = "+" if more_matches else ""
+        st.markdown(
+            f"**Showing {len(page_requests)} of {total_matches}{more} matching requests "
+            f"({store.count()} total) - page {page_number} of {page_count}{more}**"
         )
         
-        submitted = st.form_submit_button("Create Request", use_container_width=True)
+        nav_col1, nav_col2, _ = st.columns([1, 1, 4])
+        with nav_col1:
+            if st.button("◀️ Previous", disabled=page_number <= 1):
+                cursors.pop()
+                st.rerun()
+        with nav_col2:
+            if st.button("Next ▶️", disabled=(page_number >= page_count and not more_matches) or len(page_requests) < page_size):
+                cursors.append(page_requests[-1]['id'])
+                st.rerun()
         
-        if submitted:
-            if requester_name and request_type and legislation_type and description:
-                # Calculate values
-                date_received_str = date_received.strftime('%Y-%m-%d')
-                due_date = calculate_due_date(date_received_str, legislation_type)
-                fee = calculate_fee(request_type, legislation_type)
-                
-                # Generate new ID
-                new_id = f"FOI-2024-{str(len(st.session_state.requests) + 1).zfill(3)}"
-                
-                # Create new request
-                new_request = {
-                    'id': new_id,
-                    'requester_name': requester_name,
-                    'request_type': request_type,
-                    'date_received': date_received_str,
-                    'due_date': due_date,
-                    'status': 'Pending Review',
-                    'assigned_to': assigned_to if assigned_to else 'Unassigned',
-                    'legislation_type': legislation_type,
-                    'description': description,
-                    'third_party_notification': third_party,
-                    'fee_estimate': fee,
-                    'extension_granted': False
-                }
-                
-                st.session_state.requests.append(new_request)
-                
-                st.markdown("""
-                <div class="success-box">
-                    <h3>✅ Request Created Successfully!</h3>
-                    <p><strong>Request ID:</strong> {}</p>
-                    <p><strong>Due Date:</strong> {}</p>
-                    <p><strong>Estimated Fee:</strong> ${}</p>
-                </div>
-                """.format(new_id, due_date, fee), unsafe_allow_html=True)
+        st.markdown("---")
+        
+        # Display requests as a compact table; only selected rows get full detail widgets
+        if page_requests:
+            with span('requests.table'):
+                table = pd.DataFrame(page_requests)[
+                    ['id', 'requester_name', 'request_type', 'legislation_type', 'status', 'urgency', 'due_date', 'assigned_to']
+                ]
+                table.insert(7, 'days_remaining', days_remaining(table['due_date'], now))
+            selection = st.dataframe(
+                table,
+                hide_index=True,
+                on_select="rerun",
+                selection_mode="multi-row",
+                key=f"requests_table_{hash(filter_key)}_{page_number}"
+            )
+            selected_requests = [page_requests[i] for i in selection.selection.rows if i < len(page_requests)]
+            
+            if not selected_requests:
+                st.caption("Select rows in the table to see full details and actions")
+            count('widgets_emitted', 1 + len(selected_requests), section='requests.table')
+            
+            for req in selected_requests:
+                days_left = int(days_remaining([req['due_date']], now)[0])
                 
-                st.balloons()
+                with st.expander(f"**{req['id']}** - {req['requester_name']} - {req['status']}", expanded=True):
+                    col1, col2, col3 = st.columns(3)
+                    
+                    with col1:
+                        st.write(f"**Request Type:** {req['request_type']}")
+                        st.write(f"**Legislation:** {req['legislation_type']}")
+                        st.write(f"**Date Received:** {req['date_received']}")
+                        st.write(f"**Due Date:** {req['due_date']}")
+                    
+                    with col2:
+                        st.write(f"**Assigned To:** {req['assigned_to']}")
+                        st.write(f"**Status:** {req['status']}")
+                        days_color = "🔴" if days_left < 0 else "🟡" if days_left <= 5 else "🟢"
+                        days_text = f"{abs(days_left)} days overdue" if days_left < 0 else f"{days_left} days remaining"
+                        st.write(f"**Time Remaining:** {days_color} {days_text}")
+                        st.write(f"**Fee Estimate:** ${req['fee_estimate']}")
+                    
+                    with col3:
+                        st.write(f"**Third-Party Notice:** {'Yes' if req['third_party_notification'] else 'No'}")
+                        st.write(f"**Extension Granted:** {'Yes' if req['extension_granted'] else 'No'}")
+                    
+                    st.markdown("**Description:**")
+                    st.info(req['description'])
+                    
+                    history = store.history(req['id'])
+                    if history:
+                        count('widgets_emitted', len(history), section='requests.history')
+                        st.markdown("**History:**")
+                        for event in history:
+                            if event.kind == 'create':
+                                details = f"received as {event.to_status}"
+                            elif event.kind == 'reminder':
+                                details = f"flagged {event.changes.get('urgency', event.to_status)}, due {event.changes['due_date']}"
+                            else:
+                                details = ', '.join(f"{k.replace('_', ' ')}: {v}" for k, v in event.changes.items())
+                                if event.from_status != event.to_status:
+                                    details = f"{event.from_status} → {event.to_status} {details}"
+                            st.caption(f"{event.time:%Y-%m-%d %H:%M} · {event.kind.title()} · {details}")
+                    
+                    # Action buttons
+                    st.markdown("---")
+                    action_col1, action_col2, action_col3 = st.columns(3)
+                    
+                    with action_col1:
+                        if can_transition(req, 'In Progress'):
+                            if st.button(f"▶️ Start Processing", key=f"start_{req['id']}"):
+                                try:
+                                    transition_request(store, req['id'], 'In Progress', expected_version=req['version'])
+                                except InvalidTransition as e:
+                                    st.error(str(e))
+                                except StaleRequest as e:
+                                    st.warning(str(e))
+                                else:
+                                    st.session_state.own_changes = {req['id']}
+                                    st.success("Status updated to In Progress")
+                                    st.rerun()
+                    
+                    with action_col2:
+                        if can_transition(req, 'Extended'):
+                            if st.button(f"⏰ Grant Extension", key=f"extend_{req['id']}"):
+                                try:
+                                    extended = transition_request(store, req['id'], 'Extended', expected_version=req['version'])
+                                except InvalidTransition as e:
+                                    st.error(str(e))
+                                except StaleRequest as e:
+                                    st.warning(str(e))
+                                else:
+                                    st.session_state.own_changes = {req['id']}
+                                    extension_days = LEGISLATION_RULES[req['legislation_type']]['extension_days']
+                                    st.success(f"{extension_days}-day extension granted, now due {extended['due_date']}")
+                                    st.rerun()
+                    
+                    with action_col3:
+                        if can_transition(req, 'Completed'):
+                            if st.button(f"✅ Mark Complete", key=f"complete_{req['id']}"):
+                                try:
+                                    transition_request(store, req['id'], 'Completed', expected_version=req['version'])
+                                except InvalidTransition as e:
+                                    st.error(str(e))
+                                except StaleRequest as e:
+                                    st.warning(str(e))
+                                else:
+                                    st.session_state.own_changes = {req['id']}
+                                    st.success("Request marked as completed")
+                                    st.rerun()
+        else:
+            st.info("No requests found matching your filters")
+
+    # NEW REQUEST PAGE
+    elif page == "New Request":
+        st.header("➕ Create New FOI Request")
+        
+        with st.form("new_request_form"):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                requester_name = st.text_input("Requester Name *", placeholder="Full name or organization")
+                request_type = st.selectbox("Request Type *", options=REQUEST_TYPES)
+                date_received = st.date_input("Date Received *", value=datetime.now())
+            
+            with col2:
+                legislation_type = st.selectbox(
+                    "Legislation Type *",
+                    options=["PHIPA", "FIPPA", "MFIPPA"]
+                )
+                assigned_to = st.text_input("Assigned To", placeholder="Leave blank to auto-assign by workload")
+                third_party = st.checkbox("Third-party notification required")
+            
+            description = st.text_area(
+                "Request Description *",
+                placeholder="Provide detailed description of the information being requested...",
+                height=150
+            )
+            
+            # Left blank, the estimate uses the typical workload for the request type
+            with st.expander("Fee Estimate Details"):
+                fee_col1, fee_col2 = st.columns(2)
+                with fee_col1:
+                    pages = st.number_input("Pages", min_value=0, value=None, step=1)
+                    search_hours = st.number_input("Search Hours", min_value=0.0, value=None, step=0.25)
+                    prep_hours = st.number_input("Preparation Hours", min_value=0.0, value=None, step=0.25)
+                with fee_col2:
+                    media = st.selectbox(
+                        "Media",
+                        options=[''] + list(MEDIA),
+                        format_func=lambda m: m.upper() if m else "Typical for request type"
+                    )
+                    fee_waived = st.checkbox("Fee waived")
+            
+            submitted = st.form_submit_button("Create Request", use_container_width=True)
+            
+            if submitted:
+                try:
+                    with span('new_request.create'):
+                        new_request = create_request(
+                            store,
+                            assigner=get_assigner(),
+                            requester_name=requester_name,
+                            request_type=request_type,
+                            legislation_type=legislation_type,
+                            date_received=date_received,
+                            description=description,
+                            assigned_to=assigned_to,
+                            third_party_notification=third_party,
+                            pages=pages,
+                            search_hours=search_hours,
+                            prep_hours=prep_hours,
+                            media=media,
+                            fee_waived=fee_waived
+                        )
+                except ValidationError:
+                    st.error("Please fill in all required fields (*)")
+                except sqlite3.IntegrityError as e:
+                    st.error(f"The request could not be saved, please try again ({e})")
+                else:
+                    st.session_state.own_changes = {new_request['id']}
+                    
+                    st.markdown("""
+                    <div class="success-box">
+                        <h3>✅ Request Created Successfully!</h3>
+                        <p><strong>Request ID:</strong> {}</p>
+                        <p><strong>Due Date:</strong> {}</p>
+                        <p><strong>Assigned To:</strong> {}</p>
+                        <p><strong>Estimated Fee:</strong> ${}</p>
+                    </div>
+                    """.format(
+                        new_request['id'], new_request['due_date'], new_request['assigned_to'], new_request['fee_estimate']
+                    ), unsafe_allow_html=True)
+                    
+                    st.balloons()
+        
+        # Bulk Import
+        st.markdown("---")
+        st.subheader("📤 Bulk Import")
+        st.caption(
+            "Load a legacy backlog from a CSV or JSONL file. Required columns: "
+            f"{', '.join(REQUIRED_COLUMNS)}. Missing IDs, due dates and fees are filled in automatically "
+            "(fees from the optional pages, search_hours, prep_hours, media and fee_waived columns), "
+            "and rows without an assignee are auto-assigned by workload."
+        )
+        uploaded_file = st.file_uploader("Import File", type=['csv', 'jsonl'])
+        
+        if uploaded_file is not None and st.button("Import Requests"):
+            progress_text = st.empty()
+            try:
+                report = import_file(
+                    store,
+                    uploaded_file,
+                    progress=lambda r: progress_text.text(f"{r.rows_read} rows read, {r.rows_imported} imported..."),
+                    assigner=get_assigner()
+                )
+            except ValueError as e:
+                st.error(str(e))
             else:
-                st.error("Please fill in all required fields (*)")
-
-# ANALYTICS PAGE
-elif page == "Analytics":
-    st.header("📈 Analytics & Reports")
-    
-    df = pd.DataFrame(st.session_state.requests)
-    
-    # Requests by Status
-    st.subheader("Requests by Status")
-    status_counts = df['status'].value_counts()
-    st.bar_chart(status_counts)
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Requests by Type
-        st.subheader("Requests by Type")
-        type_counts = df['request_type'].value_counts()
-        st.write(type_counts)
-    
-    with col2:
-        # Requests by Legislation
-        st.subheader("Requests by Legislation")
-        leg_counts = df['legislation_type'].value_counts()
-        st.write(leg_counts)
-    
-    # Timeline Analysis
-    st.subheader("Timeline Analysis")
-    on_time = 0
-    at_risk = 0
-    overdue_count = 0
-    
-    for req in st.session_state.requests:
-        days = get_days_remaining(req['due_date'])
-        if req['status'] == 'Completed':
-            on_time += 1
-        elif days < 0:
-            overdue_count += 1
-        elif days <= 5:
-            at_risk += 1
+                progress_text.empty()
+                import_col1, import_col2, import_col3 = st.columns(3)
+                with import_col1:
+                    st.metric("Imported", report.rows_imported)
+                with import_col2:
+                    st.metric("Errors", report.error_count)
+                with import_col3:
+                    st.metric("Rows / Second", f"{report.rows_per_second:,.0f}")
+                if report.errors:
+                    st.dataframe(pd.DataFrame(report.errors, columns=['Row', 'Error']), hide_index=True)
+
+    # ANALYTICS PAGE
+    elif page == "Analytics":
+        st.header("📈 Analytics & Reports")
+        
+        # Requests by Status
+        st.subheader("Requests by Status")
+        status_counts = pd.Series(store.aggregates.counts('status'), name='count')
+        st.bar_chart(status_counts)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Requests by Type
+            st.subheader("Requests by Type")
+            type_counts = pd.Series(store.aggregates.counts('request_type'), name='count')
+            st.write(type_counts)
+        
+        with col2:
+            # Requests by Legislation
+            st.subheader("Requests by Legislation")
+            leg_counts = pd.Series(store.aggregates.counts('legislation_type'), name='count')
+            st.write(leg_counts)
+        
+        # Timeline Analysis
+        st.subheader("Timeline Analysis")
+        at_risk = store.aggregates.get('urgency', 'At Risk')
+        overdue_count = store.aggregates.get('urgency', 'Overdue')
+        on_time = store.aggregates.total - at_risk - overdue_count
+        
+        timeline_col1, timeline_col2, timeline_col3 = st.columns(3)
+        
+        with timeline_col1:
+            st.metric("On Time", on_time)
+        with timeline_col2:
+            st.metric("At Risk (≤5 days)", at_risk)
+        with timeline_col3:
+            st.metric("Overdue", overdue_count)
+        
+        # Trends over time, from the request history
+        st.subheader("📊 Trends")
+        with span('analytics.rollups'):
+            rollups = get_trend_cache().rollups(now)
+        if rollups is None:
+            st.info("No requests to analyse yet")
         else:
-            on_time += 1
-    
-    timeline_col1, timeline_col2, timeline_col3 = st.columns(3)
-    
-    with timeline_col1:
-        st.metric("On Time", on_time)
-    with timeline_col2:
-        st.metric("At Risk (≤5 days)", at_risk)
-    with timeline_col3:
-        st.metric("Overdue", overdue_count)
-    
-    # Export Data
-    st.subheader("📥 Export Data")
-    if st.button("Download All Requests as CSV"):
-        csv = df.to_csv(index=False)
+            trend_window = TREND_WINDOWS[st.selectbox("Window", options=list(TREND_WINDOWS), index=2)]
+            
+            st.markdown("**Weekly intake by legislation**")
+            st.bar_chart(window(rollups['intake'], now, trend_window))
+            
+            st.markdown("**Open requests per assignee**")
+            st.line_chart(window(rollups['workload'], now, trend_window))
+            
+            trend_col1, trend_col2 = st.columns(2)
+            with trend_col1:
+                st.markdown("**Median days to complete**")
+                st.dataframe(rollups['time_to_complete'])
+                completion_trend = window(rollups['completion_trend'], now, trend_window)
+                if not completion_trend.empty:
+                    st.line_chart(completion_trend)
+            with trend_col2:
+                st.markdown("**Extension rate (%)**")
+                st.write(rollups['extension_by_legislation'].round(1))
+                st.line_chart(window(rollups['extension_by_month'], now, trend_window))
+        
+        # Staff workload, from the auto-assignment queues
+        st.subheader("👥 Staff Workload")
+        assigner = get_assigner()
+        st.dataframe(assigner.workload(), hide_index=True)
+        if st.button("⚖️ Rebalance Workload", help="Move requests not yet started off overloaded staff"):
+            moves = assigner.rebalance()
+            if moves:
+                st.session_state.own_changes = set(moves)
+                st.success(f"Reassigned {len(moves)} requests")
+                st.rerun()
+            st.info("Workload is already balanced")
+        
+        # Export Data
+        st.subheader("📥 Export Data")
+        export_col1, export_col2, export_col3, export_col4, export_col5 = st.columns(5)
+        with export_col1:
+            export_format = st.selectbox("Format", options=list(EXPORT_FORMATS), format_func=str.upper)
+        with export_col2:
+            export_status = st.multiselect(
+                "Status",
+                options=['Pending Review', 'In Progress', 'Completed', 'Extended'],
+                default=[],
+                key="export_status"
+            )
+        with export_col3:
+            export_legislation = st.multiselect(
+                "Legislation",
+                options=['PHIPA', 'FIPPA', 'MFIPPA'],
+                default=[],
+                key="export_legislation"
+            )
+        with export_col4:
+            export_urgency = st.multiselect(
+                "Deadline",
+                options=list(URGENCY_LEVELS),
+                default=[],
+                key="export_urgency"
+            )
+        with export_col5:
+            export_search = st.text_input("Search", key="export_search")
+        
+        export_filters = dict(
+            status=export_status, urgency=export_urgency, legislation=export_legislation, search=export_search
+        )
+        mime, extension = EXPORT_FORMATS[export_format]
+        st.caption(f"{store.count(**export_filters)} requests match the export filters")
+        
+        # The export runs in chunks when the button is clicked, spooled to a temporary file
         st.download_button(
-            label="Download CSV",
-            data=csv,
-            file_name=f"foi_requests_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
+            label=f"📥 Download {export_format.upper()}",
+            data=lambda: export_to_tempfile(store, export_format, **export_filters),
+            file_name=f"foi_requests_{datetime.now().strftime('%Y%m%d')}{extension}",
+            mime=mime
         )
+finally:
+    page_span.stop()
+    rerun_span.stop(page=page)
 
 # Footer
 st.markdown("---")
@@ -519,4 +772,38 @@ st.markdown("""
     <p><strong>FOI Request Management System</strong> | Developed for Healthcare Privacy Management</p>
     <p style="font-size: 0.875rem;">Supports PHIPA, FIPPA, and MFIPPA compliance requirements</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Debug panel: where this rerun's time went, and rerun latency across every session
+if DEBUG_PANEL:
+    with st.sidebar.expander("🛠 Performance"):
+        st.caption(f"This rerun: {rerun_span.seconds * 1000:.1f} ms")
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        'span': '\u2003' * depth + name + ''.join(f" [{v}]" for v in labels.values()),
+                        'ms': round(seconds * 1000, 1)
+                    }
+                    for _, depth, name, labels, seconds in sorted(trace.spans, key=lambda s: s[0])
+                ]
+            ),
+            hide_index=True
+        )
+        for (name, labels), n in sorted(trace.counts.items()):
+            st.caption(f"{name} {dict(labels)}: {n:,}")
+        st.markdown("**Rerun latency (this process)**")
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        'page': dict(labels).get('page'),
+                        'reruns': n,
+                        'p50 ms': round(quantiles[0.5] * 1000, 1),
+                        'p95 ms': round(quantiles[0.95] * 1000, 1)
+                    }
+                    for name, labels, n, _, quantiles in REGISTRY.spans() if name == 'rerun'
+                ]
+            ),
+            hide_index=True
+        )
\ No newline at end of file
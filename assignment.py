@@ -0,0 +1,433 @@
+"""Workload-aware auto-assignment of FOI requests to staff.
+
+Shows each assignee's open workload, and with --rebalance moves not-yet-started
+requests off overloaded staff (and hands out unassigned ones) in one pass.
+
+Without a roster (--roster or FOI_ROSTER), the staff are inferred from who holds
+open requests or has been given one recently.
+
+Usage: python assignment.py [--db foi_requests.db] [--roster staff.json] [--rebalance]
+"""
+import argparse
+import heapq
+import json
+import os
+import sys
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from deadlines import AT_RISK_DAYS
+from core import LEGISLATION_TYPES
+from store import DEFAULT_DB_PATH, RequestStore
+
+UNASSIGNED = 'Unassigned'
+
+# JSON roster of current staff; when unset the roster is inferred from the requests
+DEFAULT_ROSTER_PATH = os.environ.get('FOI_ROSTER')
+
+# Inferred rosters only include staff given a request within this many days (or holding open ones),
+# so people who have left stop receiving work once their requests are closed
+ROSTER_RECENT_DAYS = 90
+
+# Estimated hours of work per request type; requests with third-party notice add THIRD_PARTY_EFFORT
+EFFORT_HOURS = {
+    'Personal Health Information': 1.0,
+    'General Records': 3.0,
+    'Security and Incident Footage': 4.0,
+    'Audit Logs': 2.0,
+    'Legal/Insurance': 2.0,
+    'Correction Request': 0.5,
+    'Estate/Deceased Patient Access': 1.5,
+}
+DEFAULT_EFFORT = 2.0
+THIRD_PARTY_EFFORT = 1.0
+
+# Hours of open work an assignee can carry when the roster does not say otherwise
+DEFAULT_CAPACITY = 40.0
+
+# An assignee's nearest due date adds up to PRESSURE_WEIGHT to their load once it is
+# within PRESSURE_DAYS, so requests go to staff who are not about to hit a deadline
+PRESSURE_DAYS = 2 * AT_RISK_DAYS
+PRESSURE_WEIGHT = 0.5
+
+# Staff count as experts in a legislation once it makes up this share of their requests
+EXPERTISE_MIN_SHARE = 0.05
+# Staff with fewer past requests than this are treated as handling every legislation
+EXPERTISE_MIN_REQUESTS = 20
+
+# Rebalancing moves work off assignees loaded this far above the team's average
+REBALANCE_TOLERANCE = 0.25
+# Only requests nobody has started yet are moved between staff
+MOVABLE_STATUSES = ('Pending Review',)
+
+# Heaps are rebuilt once stale entries outnumber staff by this factor
+COMPACT_FACTOR = 4
+
+_ORDINAL_1970 = date(1970, 1, 1).toordinal()
+
+
+def _ordinal(due_date):
+    return date.fromisoformat(due_date).toordinal()
+
+
+def effort(request):
+    """Estimated hours of work for a request"""
+    hours = EFFORT_HOURS.get(request['request_type'], DEFAULT_EFFORT)
+    return hours + (THIRD_PARTY_EFFORT if request['third_party_notification'] else 0.0)
+
+
+def load_roster(path):
+    """Read {name: {"capacity": hours, "legislations": [...]}} from a JSON file"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def default_roster():
+    """Return the roster at FOI_ROSTER, or None to infer it"""
+    return load_roster(DEFAULT_ROSTER_PATH) if DEFAULT_ROSTER_PATH else None
+
+
+class _Queue:
+    """One assignee's open requests: count, total effort and a min-heap of due dates
+
+    Inactive queues belong to holders who are not on the roster; they are tracked
+    so rebalancing can hand their work out, but are never given new requests.
+    """
+
+    def __init__(self, name, capacity, legislations, active=True):
+        self.name = name
+        self.capacity = float(capacity)
+        self.legislations = tuple(legislations)
+        self.active = active
+        self.open = 0
+        self.effort = 0.0
+        # (due ordinal, request id); entries for requests that left the queue are skipped lazily
+        self.due = []
+        self.version = 0
+
+    def load(self):
+        return self.effort / self.capacity
+
+
+class AssignmentEngine:
+    """Live per-assignee queues with a priority heap of assignees per legislation
+
+    Each heap holds (score, version, name) where score is the assignee's load
+    (open effort / capacity) plus deadline pressure from their nearest due date.
+    Entries are re-pushed whenever an assignee's queue changes and stale ones are
+    skipped, so picking and updating an assignee is O(log n) in staff count.
+
+    roster ({name: {"capacity", "legislations"}}) lists who may be given work;
+    without one it is inferred from recent requests.
+    """
+
+    def __init__(self, store, roster=None):
+        self._store = store
+        self._roster = roster
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        """Rebuild every queue from the open requests in the store"""
+        self.seq = self._store.change_seq()
+        self._today = date.today().toordinal()
+        view = self._store.view([
+            'id', 'status', 'assigned_to', 'legislation_type', 'request_type', 'due_date',
+            'date_received', 'third_party_notification'
+        ])
+        self._queues = {}
+        # request id -> (assignee, effort, due ordinal, legislation) for open, assigned requests
+        self._requests = {}
+        for name, settings in (self._roster or self._infer_roster(view)).items():
+            self._add_assignee(name, settings.get('capacity', DEFAULT_CAPACITY), settings.get('legislations'))
+        open_requests = view[(view['status'] != 'Completed').to_numpy()]
+        efforts = (
+            open_requests['request_type'].map(EFFORT_HOURS).astype(float).fillna(DEFAULT_EFFORT).to_numpy()
+            + np.where(open_requests['third_party_notification'].to_numpy(), THIRD_PARTY_EFFORT, 0.0)
+        )
+        due = open_requests['due_date'].to_numpy().astype('datetime64[D]').astype(np.int64) + _ORDINAL_1970
+        for request_id, assignee, legislation, hours, due_day in zip(
+            open_requests['id'].tolist(), open_requests['assigned_to'].astype(object).tolist(),
+            open_requests['legislation_type'].astype(object).tolist(), efforts.tolist(), due.tolist()
+        ):
+            if assignee == UNASSIGNED:
+                continue
+            queue = self._holder(assignee)
+            self._requests[request_id] = (assignee, hours, due_day, legislation)
+            queue.open += 1
+            queue.effort += hours
+            queue.due.append((due_day, request_id))
+        for queue in self._queues.values():
+            heapq.heapify(queue.due)
+        self._rebuild_heaps()
+
+    def _infer_roster(self, view):
+        """Staff holding open requests or given one recently, expert in the legislations they have handled"""
+        assigned = view[(view['assigned_to'] != UNASSIGNED).to_numpy()]
+        received = assigned['date_received'].to_numpy().astype('datetime64[D]').astype(np.int64) + _ORDINAL_1970
+        current = (assigned['status'] != 'Completed').to_numpy() | (received >= self._today - ROSTER_RECENT_DAYS)
+        staff = set(assigned['assigned_to'].astype(object).to_numpy()[current])
+        counts = pd.crosstab(
+            assigned['assigned_to'].astype(object), assigned['legislation_type'].astype(object)
+        )
+        roster = {}
+        for name, row in counts.iterrows():
+            if name not in staff:
+                continue
+            total = row.sum()
+            legislations = None
+            if total >= EXPERTISE_MIN_REQUESTS:
+                legislations = [legislation for legislation, n in row.items() if n >= EXPERTISE_MIN_SHARE * total]
+            roster[name] = {'capacity': DEFAULT_CAPACITY, 'legislations': legislations}
+        return roster
+
+    def _add_assignee(self, name, capacity, legislations, active=True):
+        queue = self._queues[name] = _Queue(name, capacity, legislations or LEGISLATION_TYPES, active)
+        return queue
+
+    def _holder(self, name):
+        """Return the queue of whoever holds a request, tracking holders off the roster as inactive"""
+        return self._queues.get(name) or self._add_assignee(name, DEFAULT_CAPACITY, None, active=False)
+
+    def _rebuild_heaps(self):
+        # Heap per legislation, plus None for requests no expert is listed for
+        self._heaps = {None: []}
+        for queue in self._queues.values():
+            if not queue.active:
+                continue
+            for key in queue.legislations + (None,):
+                self._heaps.setdefault(key, []).append((self._score(queue), queue.version, queue.name))
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+
+    def _nearest_due(self, queue):
+        while queue.due:
+            due_day, request_id = queue.due[0]
+            held = self._requests.get(request_id)
+            if held is not None and held[0] == queue.name and held[2] == due_day:
+                return due_day
+            heapq.heappop(queue.due)
+        return None
+
+    def _score(self, queue):
+        nearest = self._nearest_due(queue)
+        pressure = 0.0
+        if nearest is not None:
+            pressure = max(0, PRESSURE_DAYS - (nearest - self._today)) / PRESSURE_DAYS
+        return queue.load() + PRESSURE_WEIGHT * min(pressure, 1.0)
+
+    def _push(self, queue):
+        queue.version += 1
+        if not queue.active:
+            return
+        entry = (self._score(queue), queue.version, queue.name)
+        for key in queue.legislations + (None,):
+            heap = self._heaps.setdefault(key, [])
+            heapq.heappush(heap, entry)
+        if sum(len(heap) for heap in self._heaps.values()) > COMPACT_FACTOR * 4 * len(self._queues) + 64:
+            self._rebuild_heaps()
+
+    def _best(self, legislation, exclude=None):
+        """Return the least-loaded assignee for a legislation, or None
+
+        When none of the legislation's experts is left, or the least loaded is
+        at capacity, the least-loaded assignee of any legislation is used instead.
+        """
+        queue = self._pick(self._heaps.get(legislation) or self._heaps[None], exclude)
+        if queue is None or queue.load() >= 1:
+            queue = self._pick(self._heaps[None], exclude) or queue
+        return queue
+
+    def _pick(self, heap, exclude):
+        """Return the assignee at the top of a heap, skipping stale entries and exclude"""
+        skipped = None
+        while heap:
+            _, version, name = heap[0]
+            queue = self._queues.get(name)
+            if queue is None or queue.version != version:
+                heapq.heappop(heap)
+                continue
+            if name == exclude:
+                skipped = heapq.heappop(heap)
+                continue
+            break
+        if skipped is not None:
+            heapq.heappush(heap, skipped)
+        return self._queues[heap[0][2]] if heap and heap[0][2] != exclude else None
+
+    def _take(self, queue, request_id, hours, due_day, legislation):
+        self._requests[request_id] = (queue.name, hours, due_day, legislation)
+        queue.open += 1
+        queue.effort += hours
+        heapq.heappush(queue.due, (due_day, request_id))
+        self._push(queue)
+
+    def _release(self, request_id):
+        held = self._requests.pop(request_id, None)
+        if held is None:
+            return
+        queue = self._queues.get(held[0])
+        if queue is not None:
+            queue.open -= 1
+            queue.effort -= held[1]
+            self._push(queue)
+
+    def refresh(self):
+        """Follow requests changed since the last call (new, completed, reassigned or re-dated)"""
+        with self._lock:
+            seq, changed = self._store.changes_since(self.seq)
+            if changed is None or date.today().toordinal() != self._today:
+                self._load()
+                return
+            for request_id in changed:
+                request = self._store.get(request_id)
+                held = self._requests.get(request_id)
+                if request is None or request['status'] == 'Completed' or request['assigned_to'] == UNASSIGNED:
+                    self._release(request_id)
+                    continue
+                due_day = _ordinal(request['due_date'])
+                hours = effort(request)
+                if held == (request['assigned_to'], hours, due_day, request['legislation_type']):
+                    continue
+                self._release(request_id)
+                queue = self._holder(request['assigned_to'])
+                self._take(queue, request_id, hours, due_day, request['legislation_type'])
+            self.seq = seq
+
+    def assign(self, request):
+        """Pick an assignee for a new request, set its assigned_to and count it in their queue
+
+        Returns the assignee, or None (leaving the request unassigned) when there is no staff.
+        """
+        return self.assign_many([request])[0]
+
+    def assign_many(self, requests):
+        """Assign each request in turn, so later ones see the load added by earlier ones"""
+        with self._lock:
+            self.refresh()
+            assigned = []
+            for request in requests:
+                queue = self._best(request['legislation_type'])
+                if queue is None:
+                    request['assigned_to'] = UNASSIGNED
+                    assigned.append(None)
+                    continue
+                request['assigned_to'] = queue.name
+                self._take(queue, request['id'], effort(request), _ordinal(request['due_date']),
+                           request['legislation_type'])
+                assigned.append(queue.name)
+            return assigned
+
+    def release(self, request_ids):
+        """Forget assignments whose requests were never stored (e.g. a rolled-back batch)"""
+        with self._lock:
+            for request_id in request_ids:
+                self._release(request_id)
+
+    def workload(self):
+        """Return a DataFrame of each assignee's open count, effort, capacity, load and nearest due date
+
+        Holders who are not on the roster are listed too, with active False.
+        """
+        with self._lock:
+            self.refresh()
+            rows = []
+            for queue in self._queues.values():
+                nearest = self._nearest_due(queue)
+                rows.append({
+                    'assigned_to': queue.name,
+                    'open': queue.open,
+                    'effort_hours': round(queue.effort, 1),
+                    'capacity_hours': queue.capacity,
+                    'load_pct': round(100 * queue.load(), 1),
+                    'nearest_due': None if nearest is None else date.fromordinal(nearest).isoformat(),
+                    'legislations': ', '.join(queue.legislations),
+                    'active': queue.active,
+                })
+        columns = [
+            'assigned_to', 'open', 'effort_hours', 'capacity_hours', 'load_pct', 'nearest_due', 'legislations', 'active'
+        ]
+        return pd.DataFrame(rows, columns=columns).sort_values('load_pct', ascending=False, ignore_index=True)
+
+    def plan_rebalance(self, tolerance=REBALANCE_TOLERANCE):
+        """Return ({request id: new assignee}, {request id: version}) from one pass over the open backlog
+
+        Unassigned open requests are handed out, and assignees loaded more than
+        tolerance above the team average give up their latest-due unstarted
+        requests until they are back under it. Holders who are not on the
+        roster give up all of their unstarted requests. The moves are applied to the
+        queues; apply them to the store with rebalance(), which uses the versions
+        the plan was made from to skip requests changed in the meantime.
+        """
+        with self._lock:
+            self._load()
+            staff = [queue for queue in self._queues.values() if queue.active]
+            capacity = sum(queue.capacity for queue in staff)
+            if not capacity:
+                return {}, {}
+            limit = sum(queue.effort for queue in staff) / capacity * (1 + tolerance)
+            view = self._store.view(['id', 'status', 'assigned_to', 'legislation_type', 'request_type',
+                                     'due_date', 'third_party_notification', 'version'])
+            unassigned = (view['assigned_to'] == UNASSIGNED).to_numpy() & (view['status'] != 'Completed').to_numpy()
+            view = view[unassigned | view['status'].isin(MOVABLE_STATUSES).to_numpy()]
+            unassigned = (view['assigned_to'] == UNASSIGNED).to_numpy()
+            # Unassigned requests first (most urgent first), then each donor's latest-due requests
+            due = view['due_date'].to_numpy()
+            order = np.lexsort((np.where(unassigned, due.astype(np.int64), -due.astype(np.int64)), ~unassigned))
+            moves = {}
+            versions = {}
+            for request in view.iloc[order].astype(object).to_dict('records'):
+                request['due_date'] = str(request['due_date'])[:10]
+                donor = None
+                if request['assigned_to'] != UNASSIGNED:
+                    donor = self._queues.get(request['assigned_to'])
+                    if donor is None or (donor.active and donor.load() <= limit):
+                        continue
+                queue = self._best(request['legislation_type'], exclude=donor and donor.name)
+                if queue is None or (
+                    donor is not None and donor.active
+                    and queue.load() + effort(request) / queue.capacity >= donor.load()
+                ):
+                    continue
+                if donor is not None:
+                    self._release(request['id'])
+                self._take(queue, request['id'], effort(request), _ordinal(request['due_date']),
+                           request['legislation_type'])
+                moves[request['id']] = queue.name
+                versions[request['id']] = request['version']
+            return moves, versions
+
+    def rebalance(self, tolerance=REBALANCE_TOLERANCE):
+        """Plan and apply a rebalance; returns {request id: new assignee} for the requests moved"""
+        with self._lock:
+            moves, versions = self.plan_rebalance(tolerance)
+            # Requests changed since the plan was made are left alone; refresh() picks up their real owner
+            updated = self._store.update_column('assigned_to', moves, expected_versions=versions)
+            return {request_id: moves[request_id] for request_id in updated}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show staff workload and rebalance open requests")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Request store database path")
+    parser.add_argument('--roster', default=DEFAULT_ROSTER_PATH,
+                        help="JSON file of {name: {capacity, legislations}} (default: FOI_ROSTER, else inferred)")
+    parser.add_argument('--rebalance', action='store_true', help="Move unstarted work off overloaded staff")
+    args = parser.parse_args(argv)
+
+    store = RequestStore(args.db)
+    try:
+        engine = AssignmentEngine(store, load_roster(args.roster) if args.roster else None)
+        if args.rebalance:
+            moves = engine.rebalance()
+            print(f"Reassigned {len(moves)} requests")
+        print(engine.workload().to_string(index=False))
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""Append-only audit log of request creates, transitions and extensions.
+
+Events are packed into fixed-header binary records and appended to numbered
+segment files. Segments are read through mmap, and a per-request offset index
+lets a case's timeline be read directly without scanning the log.
+
+Usage: python audit_log.py timeline FOI-2024-001 [--db foi_requests.db]
+       python audit_log.py verify [--db foi_requests.db]
+       python audit_log.py rebuild rebuilt.db [--db foi_requests.db]
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+SEGMENT_MAGIC = b'FOIEVT1\x00'
+# A new segment is started once the active one would grow past this size
+SEGMENT_BYTES = 64 * 1024 * 1024
+
+# length, crc32, timestamp, kind, from status, to status, id length, payload length
+RECORD_HEADER = struct.Struct('<IIdBBBBI')
+
+# Codes are persisted; only ever append to these tuples
+EVENT_KINDS = ('create', 'transition', 'extension', 'update', 'reminder')
+STATUS_CODES = ('Pending Review', 'In Progress', 'Extended', 'Completed', 'Overdue', 'At Risk')
+
+# Index entries pack the segment number above the byte offset
+_OFFSET_BITS = 40
+
+
+@dataclass
+class Event:
+    """A single entry in the audit log"""
+    request_id: str
+    kind: str
+    timestamp: float
+    from_status: str = None
+    to_status: str = None
+    changes: dict = field(default_factory=dict)
+
+    @property
+    def time(self):
+        return datetime.fromtimestamp(self.timestamp)
+
+
+def _status_code(status):
+    return STATUS_CODES.index(status) + 1 if status in STATUS_CODES else 0
+
+
+def _status_name(code):
+    return STATUS_CODES[code - 1] if code else None
+
+
+def encode_event(event):
+    """Pack an event into its on-disk record"""
+    changes = dict(event.changes)
+    # Statuses without a code are kept in the payload so nothing is lost
+    if event.to_status is not None and not _status_code(event.to_status):
+        changes['status'] = event.to_status
+    request_id = event.request_id.encode('utf-8')
+    payload = json.dumps(changes, separators=(',', ':'), default=str).encode('utf-8') if changes else b''
+    body = struct.pack(
+        '<dBBBBI',
+        event.timestamp,
+        EVENT_KINDS.index(event.kind) + 1,
+        _status_code(event.from_status),
+        _status_code(event.to_status),
+        len(request_id),
+        len(payload)
+    ) + request_id + payload
+    return struct.pack('<II', RECORD_HEADER.size + len(request_id) + len(payload), zlib.crc32(body)) + body
+
+
+def decode_event(buffer, offset):
+    """Unpack the record starting at offset"""
+    _, _, timestamp, kind, from_code, to_code, id_length, payload_length = (
+        RECORD_HEADER.unpack_from(buffer, offset)
+    )
+    start = offset + RECORD_HEADER.size
+    request_id = bytes(buffer[start:start + id_length]).decode('utf-8')
+    start += id_length
+    changes = json.loads(bytes(buffer[start:start + payload_length])) if payload_length else {}
+    to_status = changes.pop('status', None) or _status_name(to_code)
+    return Event(request_id, EVENT_KINDS[kind - 1], timestamp, _status_name(from_code), to_status, changes)
+
+
+def _valid_length(buffer, offset, end):
+    """Return the length of the intact record at offset, or 0 for a torn or corrupt tail"""
+    if offset + RECORD_HEADER.size > end:
+        return 0
+    length, crc = struct.unpack_from('<II', buffer, offset)
+    if length < RECORD_HEADER.size or offset + length > end:
+        return 0
+    if zlib.crc32(buffer[offset + 8:offset + length]) != crc:
+        return 0
+    return length
+
+
+def _id_at(buffer, offset):
+    id_length = buffer[offset + RECORD_HEADER.size - 5]
+    start = offset + RECORD_HEADER.size
+    return bytes(buffer[start:start + id_length]).decode('utf-8')
+
+
+class EventLog:
+    """Segmented append-only event log with a per-request offset index
+
+    Several processes may append to the same directory; appends are serialised
+    with a lock file, and each process picks up the others' records lazily.
+    """
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._lock_file = open(os.path.join(directory, 'LOCK'), 'a+b')
+        # segment number -> (mmap, mapped size)
+        self._maps = {}
+        # segment number -> bytes already read into the index
+        self._scanned = {}
+        # request id -> packed (segment, offset) of each of its events, oldest first
+        self._index = defaultdict(lambda: array('Q'))
+        # Header fields of every event in append order, for columnar analytics
+        self._event_ids = []
+        self._timestamps = array('d')
+        self._kinds = array('B')
+        self._to_codes = array('B')
+        self.count = 0
+        self.refresh()
+
+    def __len__(self):
+        self.refresh()
+        return self.count
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"{number:06d}.seg")
+
+    def _segments(self):
+        names = (name for name in os.listdir(self.directory) if name.endswith('.seg'))
+        return sorted(int(name[:-4]) for name in names if name[:-4].isdigit())
+
+    def _map(self, number, size):
+        """Return an mmap of the segment covering at least size bytes
+
+        A map that is replaced is not closed here: events() readers may still hold
+        it, and it is released once the last of them lets go.
+        """
+        mapped = self._maps.get(number)
+        if mapped is None or mapped[1] < size:
+            with open(self._segment_path(number), 'rb') as handle:
+                buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            mapped = self._maps[number] = (buffer, len(buffer))
+        return mapped[0]
+
+    def _note(self, request_id, timestamp, kind, to_code, location):
+        """Add an event to the offset index and the header columns"""
+        self._index[request_id].append(location)
+        self._event_ids.append(request_id)
+        self._timestamps.append(timestamp)
+        self._kinds.append(kind)
+        self._to_codes.append(to_code)
+        self.count += 1
+
+    def refresh(self):
+        """Index records appended since the last call, including other processes' appends"""
+        with self._lock:
+            for number in self._segments():
+                size = os.path.getsize(self._segment_path(number))
+                offset = self._scanned.get(number, len(SEGMENT_MAGIC))
+                if size <= offset:
+                    continue
+                buffer = self._map(number, size)
+                while True:
+                    length = _valid_length(buffer, offset, size)
+                    if not length:
+                        break
+                    _, _, timestamp, kind, _, to_code, _, _ = RECORD_HEADER.unpack_from(buffer, offset)
+                    self._note(_id_at(buffer, offset), timestamp, kind, to_code, number << _OFFSET_BITS | offset)
+                    offset += length
+                self._scanned[number] = offset
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the cross-process append lock"""
+        if fcntl is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        else:
+            self._lock_file.seek(0)
+            msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            else:
+                self._lock_file.seek(0)
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def append(self, events):
+        """Append events in order with a single write; returns how many were written"""
+        events = list(events)
+        records = [encode_event(event) for event in events]
+        if not records:
+            return 0
+        with self._lock, self._exclusive():
+            self.refresh()
+            segments = self._segments()
+            number = segments[-1] if segments else 1
+            path = self._segment_path(number)
+            size = os.path.getsize(path) if segments else 0
+            blob_size = sum(len(record) for record in records)
+            if not segments or (size + blob_size > self.segment_bytes and size > len(SEGMENT_MAGIC)):
+                if segments:
+                    number += 1
+                    path = self._segment_path(number)
+                with open(path, 'wb') as handle:
+                    handle.write(SEGMENT_MAGIC)
+                size = len(SEGMENT_MAGIC)
+            elif self._scanned.get(number, len(SEGMENT_MAGIC)) < size:
+                # Drop a torn record left behind by a writer that crashed mid-append
+                size = self._scanned.get(number, len(SEGMENT_MAGIC))
+                self._maps.pop(number, None)
+                with open(path, 'r+b') as handle:
+                    handle.truncate(size)
+            with open(path, 'ab') as handle:
+                handle.write(b''.join(records))
+            offset = size
+            for event, record in zip(events, records):
+                self._note(
+                    event.request_id,
+                    event.timestamp,
+                    EVENT_KINDS.index(event.kind) + 1,
+                    _status_code(event.to_status),
+                    number << _OFFSET_BITS | offset
+                )
+                offset += len(record)
+            self._scanned[number] = offset
+        return len(records)
+
+    def _read(self, location):
+        number, offset = location >> _OFFSET_BITS, location & ((1 << _OFFSET_BITS) - 1)
+        return decode_event(self._map(number, self._scanned[number]), offset)
+
+    def timeline(self, request_id):
+        """Return every event for a request, oldest first"""
+        with self._lock:
+            self.refresh()
+            locations = self._index.get(request_id, ())
+            return [self._read(location) for location in locations]
+
+    def frame(self):
+        """Return request_id, time, kind and to_status of every event, without decoding payloads"""
+        with self._lock:
+            self.refresh()
+            request_ids = list(self._event_ids)
+            timestamps = np.array(self._timestamps, dtype=float)
+            kinds = np.array(self._kinds, dtype=np.int8) - 1
+            to_codes = np.array(self._to_codes, dtype=np.int8) - 1
+        return pd.DataFrame({
+            'request_id': request_ids,
+            # Naive local times, like the rest of the app
+            'time': pd.to_datetime(timestamps, unit='s', utc=True)
+                      .tz_convert(datetime.now().astimezone().tzinfo).tz_localize(None),
+            'kind': pd.Categorical.from_codes(kinds, EVENT_KINDS),
+            'to_status': pd.Categorical.from_codes(to_codes, STATUS_CODES),
+        })
+
+    def events(self):
+        """Yield every event in append order"""
+        with self._lock:
+            self.refresh()
+            segments = [(self._map(number, end), end) for number, end in sorted(self._scanned.items())]
+        for buffer, end in segments:
+            offset = len(SEGMENT_MAGIC)
+            while offset < end:
+                length = struct.unpack_from('<I', buffer, offset)[0]
+                yield decode_event(buffer, offset)
+                offset += length
+
+    def close(self):
+        """Release the mapped segments and the lock file"""
+        with self._lock:
+            for mapped, _ in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            self._lock_file.close()
+
+
+def apply_event(states, event):
+    """Apply one event to a dict of id -> request state"""
+    if event.kind == 'create':
+        states[event.request_id] = dict(event.changes, status=event.to_status)
+        return
+    if event.kind == 'reminder':
+        # Notifications only; the change they announce is logged as its own event
+        return
+    state = states.get(event.request_id)
+    if state is None:
+        return
+    state.update(event.changes)
+    if event.to_status is not None:
+        state['status'] = event.to_status
+
+
+def replay(events):
+    """Rebuild the current state of every request from an event stream"""
+    states = {}
+    for event in events:
+        apply_event(states, event)
+    return states
+
+
+def rebuild_store(log, store):
+    """Load the state replayed from log into an empty store; returns the number of requests"""
+    if store.count():
+        raise ValueError("Can only rebuild into an empty store")
+    states = replay(log.events())
+    store.add_many(list(states.values()))
+    return len(states)
+
+
+def main(argv=None):
+    from store import COLUMN_DEFAULTS, COLUMNS, DEFAULT_DB_PATH, RequestStore
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="SQLite database the log belongs to")
+    commands = parser.add_subparsers(dest='command', required=True)
+    timeline = commands.add_parser('timeline', help="Print a request's history")
+    timeline.add_argument('request_id')
+    commands.add_parser('verify', help="Check that replaying the log reproduces the database")
+    rebuild = commands.add_parser('rebuild', help="Replay the log into a new database")
+    rebuild.add_argument('output', help="Path of the database to create")
+    args = parser.parse_args(argv)
+
+    store = RequestStore(args.db)
+    log = store.events
+    if args.command == 'timeline':
+        events = log.timeline(args.request_id)
+        if not events:
+            print(f"No events recorded for {args.request_id}", file=sys.stderr)
+            return 1
+        for event in events:
+            status = f"{event.from_status or ''} -> {event.to_status}" if event.from_status != event.to_status else ''
+            changes = ', '.join(f"{k}={v}" for k, v in event.changes.items()) if event.kind != 'create' else ''
+            print(f"{event.time:%Y-%m-%d %H:%M:%S}  {event.kind:<10} {status}  {changes}".rstrip())
+        return 0
+
+    started = time.perf_counter()
+    if args.command == 'verify':
+        states = replay(log.events())
+        mismatched = [
+            request['id'] for request in store.query()
+            if {k: states.get(request['id'], {}).get(k, COLUMN_DEFAULTS.get(k)) for k in COLUMNS}
+            != {k: request[k] for k in COLUMNS}
+        ]
+        print(f"Replayed {len(log):,} events for {len(states):,} requests "
+              f"in {time.perf_counter() - started:.2f}s")
+        if mismatched:
+            print(f"{len(mismatched):,} requests differ from the database, e.g. {', '.join(mismatched[:5])}")
+            return 1
+        return 0
+
+    rebuilt = rebuild_store(log, RequestStore(args.output))
+    print(f"Rebuilt {rebuilt:,} requests into {args.output} in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Time the Streamlit pages against a synthetic workload and compare with stored baselines.
+
+Each scenario drives app.py through Streamlit's AppTest (a full script rerun,
+as a browser interaction would trigger) and records the median and worst time
+over --repeats runs. Results are compared with benchmarks/baselines.json for
+the same record count; scenarios slower than the baseline by more than
+--tolerance are reported and the exit status is 1.
+
+Usage: python benchmarks/app_pages.py [--records 10000] [--repeats 5] [--db foi_bench.db]
+       [--tolerance 0.25] [--save-baseline]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+APP_PATH = os.path.join(ROOT, 'app.py')
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+APP_TIMEOUT = 600
+
+
+def _timed(runs, repeats):
+    """Call runs() repeats times; returns per-run times in ms"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        runs()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def _check(at):
+    if at.exception:
+        raise RuntimeError(f"App raised: {at.exception[0].value}")
+    return at
+
+
+def _widget(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+def _open(page):
+    from streamlit.testing.v1 import AppTest
+
+    at = _check(AppTest.from_file(APP_PATH, default_timeout=APP_TIMEOUT).run())
+    return _check(at.sidebar.radio[0].set_value(page).run())
+
+
+def scenarios(store):
+    """Return {name: (setup, run)}; setup returns the state run() acts on"""
+    from exporter import export
+
+    def rerun(at):
+        _check(at.run())
+
+    def filter_status(at):
+        status = _widget(at.multiselect, "Filter by Status")
+        status.set_value([] if status.value else ['In Progress', 'Extended'])
+        _check(at.run())
+
+    def search(at):
+        box = _widget(at.text_input, "Search by Requester, ID, Description or Assignee")
+        _check(box.input('audit trail' if box.value != 'audit trail' else 'patel').run())
+
+    def submit(at):
+        _widget(at.text_input, "Requester Name *").input("Benchmark Requester")
+        _widget(at.text_area, "Request Description *").input("Complete medical records for the benchmark run")
+        _check(_widget(at.button, "Create Request").click().run())
+
+    def export_csv(_):
+        export(store, io.BytesIO(), 'csv')
+
+    return {
+        'dashboard': (lambda: _open("Dashboard"), rerun),
+        'all_requests': (lambda: _open("All Requests"), rerun),
+        'all_requests_filter': (lambda: _open("All Requests"), filter_status),
+        'all_requests_search': (lambda: _open("All Requests"), search),
+        'new_request_submit': (lambda: _open("New Request"), submit),
+        'analytics': (lambda: _open("Analytics"), rerun),
+        'csv_export': (lambda: None, export_csv),
+    }
+
+
+def run_benchmarks(store, repeats):
+    """Return {scenario: {'first_ms', 'median_ms', 'max_ms'}}"""
+    results = {}
+    for name, (setup, run) in scenarios(store).items():
+        state = setup()
+        first, *rest = _timed(lambda: run(state), repeats + 1)
+        results[name] = {
+            'first_ms': round(first, 1),
+            'median_ms': round(float(np.median(rest)), 1),
+            'max_ms': round(max(rest), 1),
+        }
+        print(f"  {name:<22} first {first:9.1f}  median {results[name]['median_ms']:9.1f}"
+              f"  max {results[name]['max_ms']:9.1f} ms")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the scenarios whose median is more than tolerance slower than the baseline"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before and result['median_ms'] > before['median_ms'] * (1 + tolerance):
+            regressions.append((name, before['median_ms'], result['median_ms']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Streamlit pages on a synthetic workload")
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help="Reuse (or create) this workload database instead of a temporary one")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown against the baseline median before flagging a regression")
+    parser.add_argument('--save-baseline', action='store_true', help=f"Record these results in {BASELINE_PATH}")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.abspath(args.db or os.path.join(tmp, 'bench.db'))
+        # store.py reads FOI_DB_PATH at import, so point the app at the workload first
+        os.environ['FOI_DB_PATH'] = db_path
+        # Keep the deadline scheduler out of the timings; the workload is generated already flagged
+        os.environ.setdefault('FOI_SCHEDULER', 'worker')
+
+        from store import RequestStore
+        from workload import generate, load
+
+        store = RequestStore(db_path)
+        if not store.count():
+            started = time.perf_counter()
+            load(store, generate(args.records, seed=args.seed))
+            print(f"Loaded {args.records:,} synthetic requests in {time.perf_counter() - started:.1f}s")
+        records = store.count()
+        print(f"{records:,} requests, {args.repeats} repeats")
+        results = run_benchmarks(store, args.repeats)
+        store.close()
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baselines = json.load(f)
+    key = str(records)
+    if args.save_baseline:
+        baselines[key] = results
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Saved baseline for {key} records")
+        return 0
+    if key not in baselines:
+        print(f"No baseline for {key} records (run with --save-baseline)")
+        return 0
+    regressions = compare(results, baselines[key], args.tolerance)
+    for name, before, after in regressions:
+        print(f"REGRESSION {name}: median {before:.1f} -> {after:.1f} ms ({after / before - 1:+.0%})")
+    if not regressions:
+        print(f"No regressions against the {key}-record baseline (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
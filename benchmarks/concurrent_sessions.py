@@ -0,0 +1,121 @@
+"""Simulate many Streamlit sessions sharing one RequestStore and measure throughput.
+
+Each simulated session loops like a browser rerun: it pulls change events since
+its last render, refreshes only the changed rows it is showing, reads one page
+of requests and sometimes transitions a request with optimistic versioning.
+
+Usage: python benchmarks/concurrent_sessions.py [--sessions 50] [--seconds 10] [--records 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import InvalidTransition, RequestStore, StaleRequest, can_transition  # noqa: E402
+
+STATUSES = ['Pending Review', 'In Progress', 'Extended']
+LEGISLATIONS = ['PHIPA', 'FIPPA', 'MFIPPA']
+
+
+def populate(store, records):
+    """Fill an empty store with simple open requests"""
+    store.add_many([
+        {
+            'id': f"FOI-2025-{i:06d}",
+            'requester_name': f"Requester {i}",
+            'request_type': 'General Records',
+            'date_received': '2025-01-01',
+            'due_date': '2025-01-31',
+            'status': STATUSES[i % len(STATUSES)],
+            'assigned_to': f"Staff {i % 12}",
+            'legislation_type': LEGISLATIONS[i % len(LEGISLATIONS)],
+            'description': 'Synthetic benchmark request',
+            'third_party_notification': False,
+            'fee_estimate': 0,
+            'extension_granted': False
+        }
+        for i in range(records)
+    ])
+
+
+def run_session(store, deadline, write_ratio, seed, results):
+    """One simulated user session; appends (latencies, writes, conflicts, refreshed) to results"""
+    rng = random.Random(seed)
+    latencies = []
+    writes = conflicts = refreshed = 0
+    seen_seq = store.change_seq()
+    page = store.query(limit=25, status=[rng.choice(STATUSES)])
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        seen_seq, changed = store.changes_since(seen_seq)
+        if changed is None:
+            page = store.query(limit=25, status=[rng.choice(STATUSES)])
+        elif changed:
+            # Refresh only the rows on this page that someone changed
+            visible = {r['id']: i for i, r in enumerate(page)}
+            for request_id in changed:
+                if request_id in visible:
+                    page[visible[request_id]] = store.get(request_id)
+                    refreshed += 1
+        if rng.random() < write_ratio:
+            open_requests = [r for r in page if r['status'] != 'Completed']
+            if not open_requests:
+                page = store.query(limit=25, status=[rng.choice(STATUSES)])
+                open_requests = page
+            if open_requests:
+                request = rng.choice(open_requests)
+                target = 'Completed' if can_transition(request, 'Completed') else 'In Progress'
+                try:
+                    store.transition(request['id'], target, expected_version=request['version'])
+                    writes += 1
+                except (StaleRequest, InvalidTransition):
+                    conflicts += 1
+        latencies.append(time.perf_counter() - start)
+    results.append((latencies, writes, conflicts, refreshed))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent session throughput benchmark")
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--write-ratio', type=float, default=0.05, help="Fraction of reruns that click a button")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RequestStore(os.path.join(tmp, 'bench.db'))
+        populate(store, args.records)
+        results = []
+        deadline = time.perf_counter() + args.seconds
+        threads = [
+            threading.Thread(target=run_session, args=(store, deadline, args.write_ratio, i, results))
+            for i in range(args.sessions)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.close()
+
+    latencies = np.concatenate([np.array(r[0]) for r in results]) * 1000
+    writes = sum(r[1] for r in results)
+    conflicts = sum(r[2] for r in results)
+    refreshed = sum(r[3] for r in results)
+    print(f"{args.sessions} sessions, {args.records} records, {args.seconds:.0f}s")
+    print(f"  reruns:     {len(latencies)} ({len(latencies) / args.seconds:,.0f}/s)")
+    print(f"  writes:     {writes} ({writes / args.seconds:,.0f}/s), {conflicts} optimistic conflicts")
+    print(f"  refreshed:  {refreshed} rows via change events")
+    print(f"  latency ms: p50 {np.percentile(latencies, 50):.2f}  p95 {np.percentile(latencies, 95):.2f}"
+          f"  p99 {np.percentile(latencies, 99):.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""Generate a synthetic FOI request workload with realistic distributions.
+
+Intake is mostly PHIPA personal health information requests, arrives on
+business days and grows year over year. A few staff members carry most of the
+caseload, descriptions have a long tail of lengths, and statuses, extensions and
+urgency flags follow each request's age against its statutory deadline.
+
+Usage: python benchmarks/workload.py --records 100000 (--db foi_bench.db | --out requests.csv)
+       [--years 3] [--seed 0]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import REQUEST_TYPES  # noqa: E402
+from deadlines import AT_RISK_DAYS, calculate_due_dates  # noqa: E402
+from fees import calculate_fees  # noqa: E402
+from store import COLUMNS, RequestStore, format_id  # noqa: E402
+
+LEGISLATION_WEIGHTS = {'PHIPA': 0.55, 'FIPPA': 0.30, 'MFIPPA': 0.15}
+
+# Request type mix per legislation, in REQUEST_TYPES order
+REQUEST_TYPE_WEIGHTS = {
+    'PHIPA': (0.62, 0.05, 0.04, 0.12, 0.08, 0.06, 0.03),
+    'FIPPA': (0.05, 0.45, 0.15, 0.10, 0.20, 0.01, 0.04),
+    'MFIPPA': (0.05, 0.50, 0.20, 0.08, 0.15, 0.01, 0.01),
+}
+
+# Share of requests that need third-party notice (PHIPA has no notice period)
+THIRD_PARTY_RATES = {'PHIPA': 0.0, 'FIPPA': 0.12, 'MFIPPA': 0.10}
+
+EXTENSION_RATE = 0.08
+UNASSIGNED_RATE = 0.04
+ORGANIZATION_RATE = 0.15
+STAFF_COUNT = 40
+
+# Relative intake Monday..Sunday
+WEEKDAY_WEIGHTS = (1.25, 1.1, 1.0, 1.0, 0.9, 0.06, 0.04)
+ANNUAL_GROWTH = 0.12
+
+FIRST_NAMES = (
+    'Sarah', 'Michael', 'Priya', 'Wei', 'Fatima', 'David', 'Emily', 'Omar', 'Grace', 'Lucas',
+    'Aisha', 'Daniel', 'Mei', 'Jacob', 'Olivia', 'Arjun', 'Chloe', 'Mateo', 'Hannah', 'Noah',
+    'Leila', 'Ethan', 'Sofia', 'Samuel', 'Isabelle', 'Kwame', 'Zoe', 'Liam', 'Nadia', 'Owen'
+)
+LAST_NAMES = (
+    'Smith', 'Johnson', 'Chen', 'Patel', 'Nguyen', 'Brown', 'Tremblay', 'Singh', 'Wilson', 'Martin',
+    'Roy', 'Lee', 'Gagnon', 'Khan', 'Taylor', 'Campbell', 'Anderson', 'Wong', 'Li', 'Thompson',
+    'Ali', 'White', 'MacDonald', 'Clark', 'Lewis', 'Young', 'Bouchard', 'Hall', 'Kim', 'Scott'
+)
+ORGANIZATIONS = (
+    'Law Firm LLP', 'Insurance Company', 'Legal Services', 'Media Group', 'Advocacy Network',
+    'Research Institute', 'Estate Trustees', 'Union Local'
+)
+
+# Description phrases per request type; descriptions join a lognormal number of them
+PHRASES = {
+    'Personal Health Information': (
+        'Complete medical records', 'including physician notes', 'lab results and imaging reports',
+        'from the emergency department visit', 'discharge summary', 'medication administration records',
+        'for the admission in', 'consultation letters', 'nursing notes', 'for continuity of care'
+    ),
+    'General Records': (
+        'Policies and procedures', 'board meeting minutes', 'procurement contracts', 'staffing reports',
+        'budget documents', 'correspondence with the ministry', 'for the fiscal year', 'internal memos',
+        'regarding the program review', 'and related briefing notes'
+    ),
+    'Security and Incident Footage': (
+        'Security camera footage', 'from the parking garage', 'incident report', 'on the evening of',
+        'main entrance cameras', 'related to the altercation', 'visitor log entries', 'between 18:00 and 22:00'
+    ),
+    'Audit Logs': (
+        'Access logs for patient health record', 'showing every user who viewed', 'electronic health record',
+        'audit trail', 'for the past two years', 'including role and timestamp', 'suspected snooping',
+        'privacy breach investigation'
+    ),
+    'Legal/Insurance': (
+        'Records requested by counsel', 'in support of a claim', 'motor vehicle accident', 'signed consent attached',
+        'insurance adjuster request', 'litigation hold', 'for the period of treatment', 'certified copies'
+    ),
+    'Correction Request': (
+        'Request to correct', 'the recorded date of birth', 'allergy information', 'incorrect diagnosis entry',
+        'statement of disagreement', 'in the clinic notes', 'under section 55'
+    ),
+    'Estate/Deceased Patient Access': (
+        'Records of the deceased patient', 'requested by the estate trustee', 'certificate of appointment attached',
+        'final admission', 'end of life care notes', 'cause of death documentation'
+    ),
+}
+
+LOAD_CHUNK_SIZE = 20000
+
+
+def _weights(values):
+    values = np.asarray(values, dtype=float)
+    return values / values.sum()
+
+
+def _pick(rng, options, weights, size):
+    return np.asarray(options, dtype=object)[rng.choice(len(options), size=size, p=_weights(weights))]
+
+
+def intake_dates(rng, count, start, end):
+    """Receipt dates weighted toward weekdays and growing by ANNUAL_GROWTH a year"""
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    weekdays = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    years = (days - days[0]).astype(np.int64) / 365.25
+    weights = np.asarray(WEEKDAY_WEIGHTS)[weekdays] * (1 + ANNUAL_GROWTH) ** years
+    return np.sort(days[rng.choice(len(days), size=count, p=_weights(weights))])
+
+
+def staff_names(rng):
+    """STAFF_COUNT distinct staff names, ordered from busiest to quietest"""
+    names = []
+    while len(names) < STAFF_COUNT:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def requester_names(rng, count):
+    first = _pick(rng, FIRST_NAMES, np.ones(len(FIRST_NAMES)), count)
+    last = _pick(rng, LAST_NAMES, np.ones(len(LAST_NAMES)), count)
+    names = first + ' ' + last
+    organizations = rng.random(count) < ORGANIZATION_RATE
+    names[organizations] = last[organizations] + ' ' + _pick(
+        rng, ORGANIZATIONS, np.ones(len(ORGANIZATIONS)), int(organizations.sum())
+    )
+    return names
+
+
+def descriptions(rng, request_types):
+    """Join a long-tailed number of phrases for each request's type"""
+    lengths = np.clip(np.rint(rng.lognormal(mean=1.1, sigma=0.6, size=len(request_types))), 1, 60).astype(int)
+    result = np.empty(len(request_types), dtype=object)
+    for request_type, phrases in PHRASES.items():
+        rows = np.flatnonzero(request_types == request_type)
+        picks = rng.integers(0, len(phrases), size=int(lengths[rows].sum()))
+        bounds = np.concatenate(([0], np.cumsum(lengths[rows])))
+        result[rows] = [
+            ', '.join(phrases[i] for i in picks[bounds[n]:bounds[n + 1]]) for n in range(len(rows))
+        ]
+    return result
+
+
+def generate(records, years=3, seed=0, today=None):
+    """Return a DataFrame of synthetic requests (store columns) received over the last years"""
+    rng = np.random.default_rng(seed)
+    today = np.datetime64(today or date.today(), 'D')
+    received = intake_dates(rng, records, today - int(365.25 * years), today)
+
+    legislation = _pick(rng, list(LEGISLATION_WEIGHTS), list(LEGISLATION_WEIGHTS.values()), records)
+    request_type = np.empty(records, dtype=object)
+    third_party = np.zeros(records, dtype=bool)
+    for name, weights in REQUEST_TYPE_WEIGHTS.items():
+        rows = legislation == name
+        request_type[rows] = _pick(rng, REQUEST_TYPES, weights, int(rows.sum()))
+        third_party[rows] = rng.random(int(rows.sum())) < THIRD_PARTY_RATES[name]
+
+    # Caseload follows a Zipf-like curve across staff
+    staff = staff_names(rng)
+    assigned_to = _pick(rng, staff, 1 / np.arange(1, len(staff) + 1) ** 0.8, records)
+    assigned_to[rng.random(records) < UNASSIGNED_RATE] = 'Unassigned'
+
+    received_str = np.datetime_as_string(received, unit='D').astype(object)
+    age = (today - received).astype(np.int64)
+    # Days a request stays open: mostly within the statutory 30 days, with a slow tail
+    open_days = np.rint(rng.gamma(shape=2.2, scale=9.0, size=records)).astype(np.int64) + 1
+    extension = (rng.random(records) < EXTENSION_RATE) & (np.minimum(age, open_days) > 20)
+    due = calculate_due_dates(received_str, legislation, third_party, extension)
+
+    completed = open_days <= age
+    status = np.where(age < 3, 'Pending Review', 'In Progress').astype(object)
+    status[extension] = 'Extended'
+    status[completed] = 'Completed'
+    days_left = (due.astype('datetime64[D]') - today).astype(np.int64)
+    urgency = np.where(days_left < 0, 'Overdue', np.where(days_left <= AT_RISK_DAYS, 'At Risk', '')).astype(object)
+    urgency[completed] = ''
+
+    # Sequence numbers restart each year, in order of receipt
+    year = received.astype('datetime64[Y]').astype(np.int64) + 1970
+    sequence = pd.Series(year).groupby(year).cumcount().to_numpy() + 1
+    frame = pd.DataFrame({
+        'id': [format_id(y, s) for y, s in zip(year.tolist(), sequence.tolist())],
+        'requester_name': requester_names(rng, records),
+        'request_type': request_type,
+        'date_received': received_str,
+        'due_date': due,
+        'status': status,
+        'assigned_to': assigned_to,
+        'legislation_type': legislation,
+        'description': descriptions(rng, request_type),
+        'third_party_notification': third_party,
+        'fee_estimate': calculate_fees(request_type, legislation),
+        'extension_granted': extension,
+        'urgency': urgency,
+        'pages': np.nan,
+        'search_hours': np.nan,
+        'prep_hours': np.nan,
+        'media': '',
+        'fee_waived': False,
+        'fee_computed': True,
+    })
+    return frame[COLUMNS]
+
+
+def load(store, frame, chunk_size=LOAD_CHUNK_SIZE, progress=None):
+    """Insert a generated workload into a store chunk by chunk"""
+    for start in range(0, len(frame), chunk_size):
+        store.add_many(frame.iloc[start:start + chunk_size].to_dict('records'))
+        if progress is not None:
+            progress(min(start + chunk_size, len(frame)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic FOI request workload")
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--years', type=float, default=3.0, help="Spread receipt dates over this many years")
+    parser.add_argument('--seed', type=int, default=0)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--db', help="Load into this (empty) request store database")
+    target.add_argument('--out', help="Write a .csv or .jsonl file for importer.py")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    frame = generate(args.records, years=args.years, seed=args.seed)
+    print(f"Generated {len(frame):,} requests in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    if args.out:
+        if args.out.endswith('.jsonl'):
+            frame.to_json(args.out, orient='records', lines=True)
+        else:
+            frame.to_csv(args.out, index=False)
+    else:
+        store = RequestStore(args.db)
+        if store.count():
+            print(f"{args.db} already holds {store.count():,} requests", file=sys.stderr)
+            store.close()
+            return 1
+        load(store, frame, progress=lambda n: print(f"\r  {n:,} loaded", end='', flush=True))
+        print()
+        store.close()
+    print(f"Wrote {args.out or args.db} in {time.perf_counter() - started:.1f}s")
+    print(frame['status'].value_counts().to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,303 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow views are optional
+    pa = None
+
+# Small vocabularies stored as int8/int16 codes
+CATEGORICAL_COLUMNS = ('status', 'legislation_type', 'request_type', 'urgency', 'media')
+# Open vocabularies stored as int32 codes into a list of interned names
+INTERNED_COLUMNS = ('assigned_to',)
+# Dates stored as int32 days since 1970-01-01 (the Arrow date32 layout)
+DATE_COLUMNS = ('date_received', 'due_date')
+# Boolean fields packed into one byte per request
+FLAG_BITS = {'third_party_notification': 1, 'extension_granted': 2, 'fee_waived': 4, 'fee_computed': 8}
+# Optional quantities stored as float64, NaN when not given
+QUANTITY_COLUMNS = ('pages', 'search_hours', 'prep_hours')
+# Free text kept as Python strings
+TEXT_COLUMNS = ('id', 'requester_name', 'description')
+
+_DTYPES = {
+    'status': np.int8,
+    'legislation_type': np.int8,
+    'request_type': np.int16,
+    'urgency': np.int8,
+    'media': np.int8,
+    **{column: np.int32 for column in INTERNED_COLUMNS},
+    **{column: np.int32 for column in DATE_COLUMNS},
+    **{column: object for column in TEXT_COLUMNS},
+    'flags': np.uint8,
+    'fee_estimate': np.float64,
+    **{column: np.float64 for column in QUANTITY_COLUMNS},
+    'version': np.int32,
+}
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def _day_number(value):
+    return int((np.datetime64(value, 'D') - _EPOCH).astype(np.int64))
+
+
+def _day_numbers(values):
+    days = pd.to_datetime(pd.Series(values), format='%Y-%m-%d').to_numpy().astype('datetime64[D]')
+    return days.astype(np.int64).astype(np.int32)
+
+
+def _iso_dates(days):
+    return np.datetime_as_string(days.astype('datetime64[D]')).astype(object)
+
+
+def _fee(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _quantity(value):
+    return None if np.isnan(value) else _fee(value)
+
+
+class _Vocabulary:
+    """Values seen in one column, each with a stable code"""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def existing_codes(self, values):
+        """Return the codes of the values already seen, skipping unknown ones"""
+        return [self._codes[value] for value in values if value in self._codes]
+
+    def codes(self, values):
+        """Encode an array of values in one pass over its distinct values"""
+        positions, uniques = pd.factorize(np.asarray(values, dtype=object))
+        mapping = np.array([self.code(value) for value in uniques], dtype=np.int64)
+        return mapping[positions]
+
+
+class RequestTable:
+    """Column-per-field store of every request, addressed by ID
+
+    Rows hold codes, day numbers and flag bits instead of per-request dicts;
+    get() rebuilds a request dict on demand. to_pandas() and to_arrow() return
+    snapshots: the selected arrays are copied together with the vocabularies
+    their codes refer to, so later updates do not change them.
+    """
+
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._columns = {column: np.empty(capacity, dtype=dtype) for column, dtype in _DTYPES.items()}
+        self._vocabularies = {column: _Vocabulary() for column in CATEGORICAL_COLUMNS + INTERNED_COLUMNS}
+        # request id -> row
+        self._rows = {}
+        self._id_order = None
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Build a table from a DataFrame with one string/bool/number column per field"""
+        table = cls(capacity=max(len(frame), 1024))
+        table.append_frame(frame)
+        return table
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, request_id):
+        return request_id in self._rows
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the columns, including the strings they point to"""
+        total = sum(array[:self._size].nbytes for array in self._columns.values())
+        for column in TEXT_COLUMNS:
+            total += sum(len(value) + 49 for value in self._columns[column][:self._size])
+        return total
+
+    def _reserve(self, count):
+        needed = self._size + count
+        capacity = len(self._columns['id'])
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for column, array in self._columns.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._columns[column] = grown
+
+    def append_frame(self, frame):
+        """Append requests from a DataFrame in one vectorized pass"""
+        count = len(frame)
+        if not count:
+            return
+        self._reserve(count)
+        rows = slice(self._size, self._size + count)
+        columns = self._columns
+        for column in CATEGORICAL_COLUMNS + INTERNED_COLUMNS:
+            columns[column][rows] = self._vocabularies[column].codes(frame[column])
+        for column in DATE_COLUMNS:
+            columns[column][rows] = _day_numbers(frame[column])
+        flags = np.zeros(count, dtype=np.uint8)
+        for column, bit in FLAG_BITS.items():
+            flags |= np.where(frame[column].to_numpy(dtype=bool), bit, 0).astype(np.uint8)
+        columns['flags'][rows] = flags
+        for column in TEXT_COLUMNS:
+            columns[column][rows] = frame[column].to_numpy(dtype=object)
+        columns['fee_estimate'][rows] = frame['fee_estimate'].to_numpy(dtype=np.float64)
+        for column in QUANTITY_COLUMNS:
+            columns[column][rows] = frame[column].astype(np.float64).to_numpy()
+        columns['version'][rows] = frame['version'].to_numpy() if 'version' in frame else 1
+        for offset, request_id in enumerate(frame['id'].tolist()):
+            self._rows[request_id] = self._size + offset
+        self._size += count
+        self._id_order = None
+
+    def append_many(self, requests):
+        """Append a list of request dicts"""
+        self.append_frame(pd.DataFrame(requests))
+
+    def put(self, request):
+        """Insert or overwrite one request dict"""
+        row = self._rows.get(request['id'])
+        if row is None:
+            self._reserve(1)
+            row = self._size
+            self._columns['id'][row] = request['id']
+            self._rows[request['id']] = row
+            self._size += 1
+            self._id_order = None
+        columns = self._columns
+        for column in CATEGORICAL_COLUMNS + INTERNED_COLUMNS:
+            columns[column][row] = self._vocabularies[column].code(request[column])
+        for column in DATE_COLUMNS:
+            columns[column][row] = _day_number(request[column])
+        columns['flags'][row] = sum(bit for column, bit in FLAG_BITS.items() if request[column])
+        columns['requester_name'][row] = request['requester_name']
+        columns['description'][row] = request['description']
+        columns['fee_estimate'][row] = request['fee_estimate']
+        for column in QUANTITY_COLUMNS:
+            columns[column][row] = np.nan if request[column] is None else request[column]
+        columns['version'][row] = request.get('version', 1)
+
+    def get(self, request_id):
+        """Return a request as a dict, or None"""
+        row = self._rows.get(request_id)
+        if row is None:
+            return None
+        columns = self._columns
+        vocabularies = self._vocabularies
+        flags = columns['flags'][row]
+        return {
+            'id': columns['id'][row],
+            'requester_name': columns['requester_name'][row],
+            'request_type': vocabularies['request_type'].values[columns['request_type'][row]],
+            'date_received': str(_EPOCH + columns['date_received'][row]),
+            'due_date': str(_EPOCH + columns['due_date'][row]),
+            'status': vocabularies['status'].values[columns['status'][row]],
+            'assigned_to': vocabularies['assigned_to'].values[columns['assigned_to'][row]],
+            'legislation_type': vocabularies['legislation_type'].values[columns['legislation_type'][row]],
+            'description': columns['description'][row],
+            'third_party_notification': bool(flags & FLAG_BITS['third_party_notification']),
+            'fee_estimate': _fee(columns['fee_estimate'][row]),
+            'extension_granted': bool(flags & FLAG_BITS['extension_granted']),
+            'urgency': vocabularies['urgency'].values[columns['urgency'][row]],
+            **{column: _quantity(columns[column][row]) for column in QUANTITY_COLUMNS},
+            'media': vocabularies['media'].values[columns['media'][row]],
+            'fee_waived': bool(flags & FLAG_BITS['fee_waived']),
+            'fee_computed': bool(flags & FLAG_BITS['fee_computed']),
+            'version': int(columns['version'][row]),
+        }
+
+    def version(self, request_id):
+        """Return the stored version of a request, or None"""
+        row = self._rows.get(request_id)
+        return None if row is None else int(self._columns['version'][row])
+
+    def records(self):
+        """Yield every request as a dict"""
+        for request_id in self._columns['id'][:self._size]:
+            yield self.get(request_id)
+
+    def value_counts(self, column):
+        """Return {value: count} for a categorical or interned column"""
+        counts = np.bincount(self._columns[column][:self._size], minlength=len(self._vocabularies[column].values))
+        return {value: int(n) for value, n in zip(self._vocabularies[column].values, counts) if n}
+
+    def rows(self, request_ids):
+        """Return the row positions of the given request IDs"""
+        return np.fromiter((self._rows[request_id] for request_id in request_ids), dtype=np.int64)
+
+    def id_order(self):
+        """Row positions sorted by request ID (cached until rows are added)"""
+        if self._id_order is None:
+            self._id_order = np.argsort(self._columns['id'][:self._size], kind='stable')
+        return self._id_order
+
+    def mask(self, column, values):
+        """Boolean mask of rows whose categorical or interned column is one of values"""
+        codes = self._vocabularies[column].existing_codes(values)
+        return np.isin(self._columns[column][:self._size], codes)
+
+    def to_pandas(self, columns, rows=None, iso_dates=False):
+        """Return the given fields as a DataFrame
+
+        Codes become Categoricals and dates become datetime64 (or 'YYYY-MM-DD'
+        strings with iso_dates). With rows, only those positions are gathered,
+        in that order.
+        """
+        def pick(array):
+            return array[:self._size].copy() if rows is None else array[rows]
+
+        data = {}
+        for column in columns:
+            if column in CATEGORICAL_COLUMNS or column in INTERNED_COLUMNS:
+                data[column] = pd.Categorical.from_codes(
+                    pick(self._columns[column]), categories=list(self._vocabularies[column].values), validate=False
+                )
+            elif column in DATE_COLUMNS:
+                days = pick(self._columns[column])
+                data[column] = _iso_dates(days) if iso_dates else days.astype('datetime64[D]').astype('datetime64[s]')
+            elif column in FLAG_BITS:
+                data[column] = (pick(self._columns['flags']) & FLAG_BITS[column]) != 0
+            else:
+                data[column] = pick(self._columns[column])
+        return pd.DataFrame(data, columns=list(columns), copy=False)
+
+    def to_arrow(self, columns, rows=None):
+        """Return the given fields as an Arrow table
+
+        Codes become dictionary arrays and dates date32 arrays over copies of
+        the table's buffers; text and flag columns are converted.
+        """
+        if pa is None:
+            raise RuntimeError("Arrow views require pyarrow (pip install pyarrow)")
+
+        def pick(array):
+            return array[:self._size].copy() if rows is None else array[rows]
+
+        arrays = []
+        for column in columns:
+            if column in CATEGORICAL_COLUMNS or column in INTERNED_COLUMNS:
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(pick(self._columns[column])), pa.array(self._vocabularies[column].values, pa.string())
+                ))
+            elif column in DATE_COLUMNS:
+                arrays.append(pa.array(pick(self._columns[column])).view(pa.date32()))
+            elif column in FLAG_BITS:
+                arrays.append(pa.array((pick(self._columns['flags']) & FLAG_BITS[column]) != 0))
+            elif column in TEXT_COLUMNS:
+                arrays.append(pa.array(pick(self._columns[column]), pa.string()))
+            elif column in QUANTITY_COLUMNS:
+                # NaN marks a missing quantity; Arrow has nulls for that
+                arrays.append(pa.array(pick(self._columns[column]), from_pandas=True))
+            else:
+                arrays.append(pa.array(pick(self._columns[column])))
+        return pa.table(arrays, names=list(columns))
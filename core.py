@@ -0,0 +1,361 @@
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from deadlines import calculate_due_date, calculate_due_dates, extend_due_date, today_snapshot, urgency_levels
+from fees import MEDIA, calculate_fee, calculate_fees
+from store import COLUMNS, TRANSITIONS, URGENCY_LEVELS, WORKLOAD_COLUMNS, InvalidTransition, StaleRequest
+
+REQUEST_TYPES = (
+    "Personal Health Information",
+    "General Records",
+    "Security and Incident Footage",
+    "Audit Logs",
+    "Legal/Insurance",
+    "Correction Request",
+    "Estate/Deceased Patient Access"
+)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Tries at storing a new request whose ID was taken in the meantime by another process
+ID_ATTEMPTS = 3
+
+LEGISLATION_TYPES = ('PHIPA', 'FIPPA', 'MFIPPA')
+REQUIRED_COLUMNS = ('requester_name', 'request_type', 'legislation_type', 'date_received', 'description')
+TRUE_VALUES = {'true', 'yes', 'y', '1'}
+
+# Per-row errors kept in the report; the total is always counted
+MAX_REPORTED_ERRORS = 1000
+
+
+class ValidationError(ValueError):
+    """Raised when a new request is missing fields or has invalid values"""
+
+
+@dataclass
+class ImportReport:
+    """Outcome of a bulk import"""
+    rows_read: int = 0
+    rows_imported: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_imported / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, row, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row, message))
+
+
+def build_request(store, requester_name, request_type, legislation_type, date_received, description,
+                  assigned_to='', third_party_notification=False, assigner=None, pages=None,
+                  search_hours=None, prep_hours=None, media='', fee_waived=False):
+    """Return a new Pending Review request with its ID, due date and fee filled in
+
+    Without assigned_to, the assigner (an AssignmentEngine) picks the assignee if given.
+    The fee is estimated from pages, search_hours, prep_hours and media, each
+    falling back to the request type's typical workload when not given, and
+    those inputs are kept with the request so the estimate can be redone.
+    """
+    missing = [
+        name for name, value in (
+            ('requester_name', requester_name), ('request_type', request_type),
+            ('legislation_type', legislation_type), ('description', description)
+        ) if not value
+    ]
+    if missing:
+        raise ValidationError(f"Missing required fields: {', '.join(missing)}")
+    if legislation_type not in LEGISLATION_TYPES:
+        raise ValidationError(f"Unknown legislation_type: {legislation_type}")
+    if not isinstance(date_received, date):
+        try:
+            date_received = datetime.strptime(date_received, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise ValidationError("date_received must be YYYY-MM-DD") from None
+    workload = {'pages': pages, 'search_hours': search_hours, 'prep_hours': prep_hours}
+    for name, value in workload.items():
+        if value is not None and not value >= 0:
+            raise ValidationError(f"{name} must be a number of at least 0")
+    if media and media not in MEDIA:
+        raise ValidationError(f"Unknown media: {media}")
+
+    date_received_str = date_received.strftime('%Y-%m-%d')
+    request = {
+        'id': store.next_id(date_received.year),
+        'requester_name': requester_name,
+        'request_type': request_type,
+        'date_received': date_received_str,
+        'due_date': calculate_due_date(date_received_str, legislation_type, third_party_notification),
+        'status': 'Pending Review',
+        'assigned_to': assigned_to if assigned_to else 'Unassigned',
+        'legislation_type': legislation_type,
+        'description': description,
+        'third_party_notification': bool(third_party_notification),
+        'fee_estimate': calculate_fee(
+            request_type, legislation_type, pages, search_hours, prep_hours, media or None, fee_waived
+        ),
+        'extension_granted': False,
+        'urgency': '',
+        **workload,
+        'media': media or '',
+        'fee_waived': bool(fee_waived),
+        'fee_computed': True
+    }
+    if not assigned_to and assigner is not None:
+        assigner.assign(request)
+    return request
+
+
+def create_request(store, assigner=None, **fields):
+    """Build and store one new request; returns it as stored, with its version
+
+    If its ID turns out to be taken already, the request is retried with a
+    fresh ID up to ID_ATTEMPTS times before the IntegrityError is raised.
+    """
+    for attempt in range(1, ID_ATTEMPTS + 1):
+        request = build_request(store, assigner=assigner, **fields)
+        try:
+            store.add(request)
+        except Exception as e:
+            if assigner is not None:
+                assigner.release([request['id']])
+            if not isinstance(e, sqlite3.IntegrityError) or attempt == ID_ATTEMPTS:
+                raise
+            # Load what other processes inserted, so next_id() skips the taken ID
+            store.sync()
+            if request['id'] not in store:
+                raise
+        else:
+            return store.get(request['id'])
+
+
+def _text(frame, column, default=''):
+    """Return a column as stripped strings, or a default-filled column if absent"""
+    if column not in frame:
+        return pd.Series(default, index=frame.index, dtype=object)
+    values = frame[column].astype(object).where(frame[column].notna(), '')
+    return values.astype(str).str.strip()
+
+
+def _flag(frame, column):
+    """Return a boolean column parsed from bools or yes/no/true/false/1/0 strings"""
+    return _text(frame, column).str.lower().isin(TRUE_VALUES).to_numpy()
+
+
+def prepare_chunk(frame, first_row, store, report):
+    """Validate a chunk and return the request dicts that can be inserted and their row numbers"""
+    missing = [c for c in REQUIRED_COLUMNS if c not in frame]
+    if missing:
+        raise ValueError(f"Import file is missing required columns: {', '.join(missing)}")
+
+    valid = np.ones(len(frame), dtype=bool)
+    row_numbers = np.arange(first_row, first_row + len(frame))
+
+    def reject(mask, message):
+        nonlocal valid
+        for row in row_numbers[mask & valid]:
+            report.add_error(int(row), message)
+        valid &= ~mask
+
+    text = {c: _text(frame, c) for c in REQUIRED_COLUMNS}
+    for column in REQUIRED_COLUMNS:
+        reject((text[column] == '').to_numpy(), f"missing {column}")
+
+    # Rows without an id get one allocated after validation
+    ids = _text(frame, 'id').to_numpy(copy=True)
+    has_id = ids != ''
+    reject(has_id & pd.Series(ids).duplicated().to_numpy(), "duplicate id in file")
+    reject(np.fromiter((i in store for i in ids), dtype=bool, count=len(ids)), "id already exists")
+
+    legislation = text['legislation_type'].to_numpy()
+    reject(~np.isin(legislation, LEGISLATION_TYPES), "unknown legislation_type")
+
+    received = pd.to_datetime(text['date_received'], format='%Y-%m-%d', errors='coerce')
+    reject(received.isna().to_numpy(), "date_received must be YYYY-MM-DD")
+
+    status = _text(frame, 'status').replace('', 'Pending Review').to_numpy(copy=True)
+    reject(~np.isin(status, list(TRANSITIONS) + list(URGENCY_LEVELS)), "unknown status")
+
+    # Compute due dates and fees in one batch for rows that do not carry their own
+    third_party = _flag(frame, 'third_party_notification')
+    extension_granted = _flag(frame, 'extension_granted')
+    due_date = _text(frame, 'due_date').to_numpy(copy=True)
+    needs_due = (due_date == '') & valid
+    if needs_due.any():
+        due_date[needs_due] = calculate_due_dates(
+            text['date_received'].to_numpy()[needs_due],
+            legislation[needs_due],
+            third_party[needs_due],
+            extension_granted[needs_due]
+        )
+    due_parsed = pd.to_datetime(pd.Series(due_date), format='%Y-%m-%d', errors='coerce')
+    reject(due_parsed.isna().to_numpy(), "due_date must be YYYY-MM-DD")
+
+    # Legacy exports record At Risk / Overdue as a status; they become the urgency flag
+    urgency = _text(frame, 'urgency').to_numpy(copy=True)
+    flagged = np.isin(status, URGENCY_LEVELS)
+    urgency[flagged] = status[flagged]
+    status[flagged] = np.where(extension_granted[flagged], 'Extended', 'In Progress')
+    reject(~np.isin(urgency, ('',) + URGENCY_LEVELS), "unknown urgency")
+
+    # Optional fee inputs; blank quantities and media mean the request type's typical workload
+    workload = {}
+    for column in WORKLOAD_COLUMNS:
+        values = _text(frame, column)
+        workload[column] = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+        reject(~(workload[column] >= 0) & (values != '').to_numpy(), f"{column} must be a number of at least 0")
+    media = _text(frame, 'media').str.lower().to_numpy()
+    reject(~np.isin(media, ('',) + MEDIA), "unknown media")
+    fee_waived = _flag(frame, 'fee_waived')
+
+    fee_text = _text(frame, 'fee_estimate')
+    fee = pd.to_numeric(fee_text, errors='coerce').to_numpy(dtype=float, copy=True)
+    reject(~np.isfinite(fee) & (fee_text != '').to_numpy(), "fee_estimate must be a number")
+    # Fees carried over from the file are kept as they are; only missing ones are estimated
+    needs_fee = np.isnan(fee) & valid
+    if needs_fee.any():
+        fee[needs_fee] = calculate_fees(
+            text['request_type'].to_numpy()[needs_fee],
+            legislation[needs_fee],
+            *(workload[column][needs_fee] for column in WORKLOAD_COLUMNS),
+            np.where(media == '', None, media)[needs_fee],
+            fee_waived[needs_fee]
+        )
+
+    # Allocate missing IDs in one block per year of receipt rather than one per row
+    needs_id = ~has_id & valid
+    if needs_id.any():
+        years = received.dt.year.to_numpy()
+        for year in np.unique(years[needs_id]):
+            rows = needs_id & (years == year)
+            ids[rows] = store.allocate_ids(int(year), int(rows.sum()))
+
+    prepared = pd.DataFrame({
+        'id': ids,
+        'requester_name': text['requester_name'].to_numpy(),
+        'request_type': text['request_type'].to_numpy(),
+        'date_received': text['date_received'].to_numpy(),
+        'due_date': due_date,
+        'status': status,
+        'assigned_to': _text(frame, 'assigned_to').replace('', 'Unassigned').to_numpy(),
+        'legislation_type': legislation,
+        'description': text['description'].to_numpy(),
+        'third_party_notification': third_party,
+        'fee_estimate': fee,
+        'extension_granted': extension_granted,
+        'urgency': urgency,
+        **workload,
+        'media': media,
+        'fee_waived': fee_waived,
+        'fee_computed': needs_fee
+    }, columns=COLUMNS)
+    return prepared[valid].to_dict('records'), row_numbers[valid].tolist()
+
+
+def add_assigned(store, requests, assigner=None):
+    """Auto-assign the unassigned requests (when an assigner is given), then insert them all"""
+    unassigned = [] if assigner is None else [r for r in requests if r['assigned_to'] == 'Unassigned']
+    if unassigned:
+        assigner.assign_many(unassigned)
+    try:
+        store.add_many(requests)
+    except sqlite3.IntegrityError:
+        if unassigned:
+            assigner.release([r['id'] for r in unassigned])
+        raise
+
+
+def create_requests(store, items, assigner=None):
+    """Validate and store many requests in one transaction
+
+    Items use the bulk import fields (id, due_date, status and fee_estimate are
+    optional). Unassigned ones are auto-assigned when an assigner is given.
+    Returns (created requests as stored, [(item index, message)]).
+    """
+    report = ImportReport()
+    frame = pd.DataFrame(list(items))
+    frame = frame.reindex(columns=list(dict.fromkeys(list(frame.columns) + list(REQUIRED_COLUMNS))))
+    created, _ = prepare_chunk(frame, 0, store, report) if len(frame) else ([], [])
+    if created:
+        add_assigned(store, created, assigner)
+    return [store.get(request['id']) for request in created], sorted(report.errors)
+
+
+def transition_request(store, request_id, new_status, expected_version=None):
+    """Move a request to new_status
+
+    An extension also pushes out its due date and completion clears its
+    urgency; both take effect at once rather than on the scheduler's next pass.
+    """
+    if new_status == 'Extended':
+        request = store.get(request_id)
+        if request is None:
+            raise KeyError(request_id)
+        due_date = extend_due_date(request['due_date'], request['legislation_type'])
+        return store.transition(
+            request_id,
+            'Extended',
+            expected_version=expected_version,
+            due_date=due_date,
+            extension_granted=True,
+            urgency=urgency_levels([due_date], today_snapshot())[0]
+        )
+    if new_status == 'Completed':
+        return store.transition(request_id, new_status, expected_version=expected_version, urgency='')
+    return store.transition(request_id, new_status, expected_version=expected_version)
+
+
+def transition_requests(store, items):
+    """Apply many transitions independently; returns one result dict per item, in order"""
+    results = []
+    for item in items:
+        request_id = item.get('id')
+        version = item.get('version')
+        if not isinstance(request_id, str) or not isinstance(item.get('status'), str):
+            results.append({'id': request_id, 'error': 'invalid', 'message': "id and status must be strings"})
+            continue
+        if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+            results.append({'id': request_id, 'error': 'invalid', 'message': "version must be an integer"})
+            continue
+        try:
+            request = transition_request(store, request_id, item['status'], version)
+        except KeyError:
+            results.append({'id': request_id, 'error': 'not_found', 'message': f"No request {request_id}"})
+        except InvalidTransition as e:
+            results.append({'id': request_id, 'error': 'invalid_transition', 'message': str(e)})
+        except StaleRequest as e:
+            results.append({'id': request_id, 'error': 'stale', 'message': str(e)})
+        else:
+            results.append({'id': request_id, 'request': request})
+    return results
+
+
+def find_requests(store, status=None, legislation=None, assigned_to=None, urgency=None, search=None,
+                  limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """Return (requests, next cursor) for one page of matching requests
+
+    Plain listings page by id with a keyset cursor; searches are ranked and
+    page by offset. The cursor is None on the last page.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    filters = dict(status=status, legislation=legislation, assigned_to=assigned_to, urgency=urgency)
+    if search:
+        offset = cursor or '0'
+        if not offset.isdigit():
+            raise ValidationError("cursor must be the next_cursor of a previous page")
+        offset = int(offset)
+        page = store.search(search, limit=limit + 1, offset=offset, **filters)
+        next_cursor = str(offset + limit) if len(page) > limit else None
+    else:
+        page = store.query(limit=limit + 1, after=cursor, **filters)
+        next_cursor = page[limit - 1]['id'] if len(page) > limit else None
+    return page[:limit], next_cursor
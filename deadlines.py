@@ -0,0 +1,144 @@
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from ontario_calendar import next_business_day, roll_forward
+from store import DEFAULT_DB_PATH, RequestStore
+
+# Open requests due within this many days are "At Risk"
+AT_RISK_DAYS = 5
+
+# Statutory time limits in calendar days. PHIPA s.54 allows one extension of up to 30 days;
+# FIPPA s.27-28 and MFIPPA s.20-21 also add a third-party notice period to the clock.
+LEGISLATION_RULES = {
+    'PHIPA': {'response_days': 30, 'extension_days': 30, 'third_party_days': 0},
+    'FIPPA': {'response_days': 30, 'extension_days': 30, 'third_party_days': 30},
+    'MFIPPA': {'response_days': 30, 'extension_days': 30, 'third_party_days': 30}
+}
+
+
+def _rule(legislation):
+    """Return the deadline rule for a legislation"""
+    try:
+        return LEGISLATION_RULES[legislation]
+    except KeyError:
+        raise ValueError(f"Unknown legislation: {legislation}") from None
+
+
+# Memoized per (legislation, third-party flag); recompute_due_dates() clears it after a rule change
+@lru_cache(maxsize=None)
+def response_offset(legislation, third_party_notification=False):
+    """Calendar days from receipt to the unrolled due date"""
+    rule = _rule(legislation)
+    return rule['response_days'] + (rule['third_party_days'] if third_party_notification else 0)
+
+
+def calculate_due_date(received_date, legislation, third_party_notification=False):
+    """Calculate the statutory due date, moved off weekends and Ontario holidays"""
+    received = datetime.strptime(received_date, '%Y-%m-%d').date()
+    due = received + timedelta(days=response_offset(legislation, bool(third_party_notification)))
+    return next_business_day(due).strftime('%Y-%m-%d')
+
+
+def extend_due_date(due_date, legislation):
+    """Return the due date after the legislation's time extension"""
+    due = datetime.strptime(due_date, '%Y-%m-%d').date()
+    extended = due + timedelta(days=_rule(legislation)['extension_days'])
+    return next_business_day(extended).strftime('%Y-%m-%d')
+
+
+def calculate_due_dates(received_dates, legislations, third_party_notification=None, extension_granted=None):
+    """Vectorized calculate_due_date (plus extend_due_date where an extension was granted)"""
+    received = pd.to_datetime(pd.Series(received_dates), format='%Y-%m-%d').to_numpy().astype('datetime64[D]')
+    # Look up each rule column through legislation codes instead of per-row dict access
+    codes = pd.Categorical(np.asarray(legislations, dtype=object), categories=list(LEGISLATION_RULES)).codes
+    if (codes < 0).any():
+        raise ValueError(f"Unknown legislation: {np.asarray(legislations, dtype=object)[codes < 0][0]}")
+    rules = {
+        key: np.array([rule[key] for rule in LEGISLATION_RULES.values()])
+        for key in ('response_days', 'extension_days', 'third_party_days')
+    }
+    offsets = rules['response_days'][codes]
+    if third_party_notification is not None:
+        offsets = offsets + np.where(
+            np.asarray(third_party_notification, dtype=bool), rules['third_party_days'][codes], 0
+        )
+    due = roll_forward(received + offsets.astype('timedelta64[D]'))
+    if extension_granted is not None:
+        extension = np.where(np.asarray(extension_granted, dtype=bool), rules['extension_days'][codes], 0)
+        due = np.where(extension > 0, roll_forward(due + extension.astype('timedelta64[D]')), due)
+    return np.datetime_as_string(due, unit='D').astype(object)
+
+
+def recompute_due_dates(store):
+    """Recompute due dates for every open request in one batch, e.g. after a rule change
+
+    Returns the number of requests whose due date changed.
+    """
+    response_offset.cache_clear()
+    frame = store.frame(['id', 'date_received', 'legislation_type', 'third_party_notification',
+                         'extension_granted', 'status', 'due_date'])
+    if frame.empty:
+        return 0
+    due = calculate_due_dates(
+        frame['date_received'],
+        frame['legislation_type'],
+        frame['third_party_notification'].to_numpy(dtype=bool),
+        frame['extension_granted'].to_numpy(dtype=bool)
+    )
+    changed = (frame['status'].to_numpy() != 'Completed') & (due != frame['due_date'].to_numpy())
+    store.update_column('due_date', dict(zip(frame['id'].to_numpy()[changed], due[changed])))
+    return int(changed.sum())
+
+
+def today_snapshot():
+    """Take the single 'now' timestamp shared by every page in one render"""
+    return np.datetime64(datetime.now(), 's')
+
+
+def days_remaining(due_dates, now):
+    """Whole days from now until each 'YYYY-MM-DD' due date, negative once it has passed"""
+    due = pd.to_datetime(pd.Series(due_dates), format='%Y-%m-%d').to_numpy()
+    return np.floor_divide(due - np.datetime64(now, 's'), np.timedelta64(1, 'D')).astype(np.int64)
+
+
+def urgency_thresholds(due_dates):
+    """Return the first instants (datetime64[s]) at which requests become At Risk and Overdue
+
+    These match days_remaining(): a request is At Risk once AT_RISK_DAYS or
+    fewer days remain, and Overdue once its due date has started.
+    """
+    due = pd.to_datetime(pd.Series(due_dates), format='%Y-%m-%d').to_numpy().astype('datetime64[s]')
+    one_second = np.timedelta64(1, 's')
+    return due - np.timedelta64(AT_RISK_DAYS + 1, 'D') + one_second, due + one_second
+
+
+def urgency_levels(due_dates, now):
+    """Return the urgency ('', 'At Risk' or 'Overdue') of open requests with these due dates at now"""
+    at_risk_at, overdue_at = urgency_thresholds(due_dates)
+    now = np.datetime64(now, 's')
+    return np.select([overdue_at <= now, at_risk_at <= now], ['Overdue', 'At Risk'], default='').astype(object)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute statutory due dates for all open requests")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Request store database path")
+    args = parser.parse_args(argv)
+
+    store = RequestStore(args.db)
+    try:
+        start = time.perf_counter()
+        changed = recompute_due_dates(store)
+    finally:
+        store.close()
+    print(f"Updated {changed} due dates in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Chunked export of FOI requests to CSV, JSONL or Parquet.
+
+Usage: python exporter.py requests.parquet [--status "In Progress"] [--legislation PHIPA] [--urgency Overdue]
+       [--search smith]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+from store import COLUMNS, DEFAULT_DB_PATH, URGENCY_LEVELS, WORKLOAD_COLUMNS, RequestStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+# format -> (MIME type, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'jsonl': ('application/x-ndjson', '.jsonl'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet')
+}
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def parquet_schema():
+    """Arrow schema used for Parquet exports"""
+    return pa.schema([
+        ('id', pa.string()),
+        ('requester_name', pa.string()),
+        ('request_type', pa.string()),
+        ('date_received', pa.date32()),
+        ('due_date', pa.date32()),
+        ('status', pa.string()),
+        ('assigned_to', pa.string()),
+        ('legislation_type', pa.string()),
+        ('description', pa.string()),
+        ('third_party_notification', pa.bool_()),
+        ('fee_estimate', pa.float64()),
+        ('extension_granted', pa.bool_()),
+        ('urgency', pa.string()),
+        ('pages', pa.float64()),
+        ('search_hours', pa.float64()),
+        ('prep_hours', pa.float64()),
+        ('media', pa.string()),
+        ('fee_waived', pa.bool_()),
+        ('fee_computed', pa.bool_())
+    ])
+
+
+def iter_row_chunks(store, chunk_size=DEFAULT_CHUNK_SIZE, status=None, legislation=None, urgency=None, search=None):
+    """Yield arrays of in-memory table rows for matching requests, in id order"""
+    rows = store.rows(status=status, legislation=legislation, urgency=urgency, search=search)
+    for start in range(0, len(rows), chunk_size):
+        yield rows[start:start + chunk_size]
+
+
+def iter_pages(store, chunk_size=DEFAULT_CHUNK_SIZE, status=None, legislation=None, urgency=None, search=None):
+    """Yield DataFrames of matching requests in id order, one keyset page of SQLite rows at a time"""
+    after = None
+    while True:
+        batch = store.query(limit=chunk_size, after=after, status=status, legislation=legislation,
+                            urgency=urgency, search=search)
+        if not batch:
+            return
+        frame = pd.DataFrame(batch, columns=COLUMNS)
+        frame[['fee_estimate', *WORKLOAD_COLUMNS]] = frame[['fee_estimate', *WORKLOAD_COLUMNS]].astype(float)
+        yield frame
+        if len(batch) < chunk_size:
+            return
+        after = batch[-1]['id']
+
+
+def iter_batches(store, chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """Yield DataFrames of matching requests in id order, one chunk at a time"""
+    if store.table is None:
+        yield from iter_pages(store, chunk_size, **filters)
+        return
+    for rows in iter_row_chunks(store, chunk_size, **filters):
+        yield store.view(COLUMNS, rows, iso_dates=True)
+
+
+def export(store, out, fmt, chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """Write matching requests to a binary file object chunk by chunk and return the row count"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    rows = 0
+    if fmt == 'csv':
+        for frame in iter_batches(store, chunk_size, **filters):
+            out.write(frame.to_csv(index=False, header=rows == 0).encode('utf-8'))
+            rows += len(frame)
+        if rows == 0:
+            out.write((','.join(COLUMNS) + '\n').encode('utf-8'))
+    elif fmt == 'jsonl':
+        for frame in iter_batches(store, chunk_size, **filters):
+            out.write(frame.to_json(orient='records', lines=True).rstrip('\n').encode('utf-8') + b'\n')
+            rows += len(frame)
+    else:
+        if pa is None:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        schema = parquet_schema()
+        with pq.ParquetWriter(out, schema, compression='zstd') as writer:
+            if store.table is None:
+                for frame in iter_pages(store, chunk_size, **filters):
+                    for column in ('date_received', 'due_date'):
+                        frame[column] = pd.to_datetime(frame[column], format='%Y-%m-%d').dt.date
+                    writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+                    rows += len(frame)
+                return rows
+            # Arrow snapshots keep codes and dates compact; only the dictionaries are expanded
+            for chunk in iter_row_chunks(store, chunk_size, **filters):
+                writer.write_table(store.arrow_view(COLUMNS, chunk).cast(schema))
+                rows += len(chunk)
+    return rows
+
+
+def export_to_tempfile(store, fmt, chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """Export into a temporary file on disk and return it rewound for reading"""
+    spool = tempfile.TemporaryFile()
+    export(store, spool, fmt, chunk_size, **filters)
+    spool.seek(0)
+    return spool
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export FOI requests to CSV, JSONL or Parquet")
+    parser.add_argument('path', help="Output file (.csv, .jsonl or .parquet)")
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), help="Override format detection")
+    parser.add_argument('--status', action='append', help="Only export this status (repeatable)")
+    parser.add_argument('--legislation', action='append', help="Only export this legislation (repeatable)")
+    parser.add_argument('--urgency', action='append', choices=list(URGENCY_LEVELS),
+                        help="Only export requests with this deadline flag (repeatable)")
+    parser.add_argument('--search', help="Only export requests matching this search term")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows fetched per batch")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Request store database path")
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None:
+        extension = os.path.splitext(args.path)[1].lower()
+        fmt = next((f for f, (_, ext) in EXPORT_FORMATS.items() if ext == extension), None)
+        if fmt is None:
+            parser.error(f"Cannot detect export format for {args.path}; use --format")
+
+    # Pages straight from SQLite rather than loading every request into memory first
+    store = RequestStore(args.db, audit=False, load_table=False)
+    try:
+        with open(args.path, 'wb') as out:
+            rows = export(store, out, fmt, args.chunk_size, status=args.status,
+                          legislation=args.legislation, urgency=args.urgency, search=args.search)
+    finally:
+        store.close()
+    print(f"Exported {rows} requests to {args.path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
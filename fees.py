@@ -0,0 +1,230 @@
+"""Fee estimates from a declarative table of per-legislation fee rules.
+
+Re-run after changing FEE_RULES to re-estimate the open requests whose fee was
+estimated here; fees entered by staff or carried over by an import are kept.
+
+Usage: python fees.py [--db foi_requests.db]
+"""
+import argparse
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from store import DEFAULT_DB_PATH, RequestStore
+
+# Billable items; a request's units of each are multiplied by the item's rate
+FEE_ITEMS = ('application', 'page', 'search_hour', 'prep_hour', 'cd', 'usb')
+
+MEDIA = ('paper', 'cd', 'usb')
+
+# (legislation, request type or None for every type, item, rate, units included free).
+# Type-specific rows override the legislation-wide row for the same item. FIPPA and
+# MFIPPA charge $7.50 per 15 minutes of search and preparation and 20 cents a page;
+# personal information requests pay only for copies, and corrections are free.
+FEE_RULES = [
+    ('PHIPA', None, 'page', 0.25, 20),
+    ('PHIPA', None, 'cd', 10, 0),
+    ('PHIPA', None, 'usb', 10, 0),
+
+    ('FIPPA', None, 'application', 30, 0),
+    ('FIPPA', None, 'page', 0.20, 0),
+    ('FIPPA', None, 'search_hour', 30, 0),
+    ('FIPPA', None, 'prep_hour', 30, 0),
+    ('FIPPA', None, 'cd', 10, 0),
+    ('FIPPA', None, 'usb', 10, 0),
+    ('FIPPA', 'Personal Health Information', 'search_hour', 0, 0),
+    ('FIPPA', 'Personal Health Information', 'prep_hour', 0, 0),
+
+    ('MFIPPA', None, 'application', 5, 0),
+    ('MFIPPA', None, 'page', 0.20, 0),
+    ('MFIPPA', None, 'search_hour', 30, 0),
+    ('MFIPPA', None, 'prep_hour', 30, 0),
+    ('MFIPPA', None, 'cd', 10, 0),
+    ('MFIPPA', None, 'usb', 10, 0),
+    ('MFIPPA', 'Personal Health Information', 'search_hour', 0, 0),
+    ('MFIPPA', 'Personal Health Information', 'prep_hour', 0, 0),
+]
+FEE_RULES += [
+    (legislation, 'Correction Request', item, 0, 0)
+    for legislation in ('PHIPA', 'FIPPA', 'MFIPPA') for item in FEE_ITEMS
+]
+
+# Fees (beyond the application fee) below this amount are not charged
+WAIVE_BELOW = {'PHIPA': 0, 'FIPPA': 5, 'MFIPPA': 5}
+
+# Typical work per request type, used when a request does not state its own:
+# (pages, search hours, preparation hours, media). A typical PHIPA record of
+# personal health information fits in the 20 free pages, so it costs nothing.
+TYPICAL_WORKLOAD = {
+    'Personal Health Information': (20, 0, 0, 'paper'),
+    'General Records': (120, 3, 1, 'paper'),
+    'Security and Incident Footage': (0, 2, 3, 'usb'),
+    'Audit Logs': (15, 1, 0.5, 'paper'),
+    'Legal/Insurance': (80, 1, 0.5, 'paper'),
+    'Correction Request': (0, 0, 0, 'paper'),
+    'Estate/Deceased Patient Access': (60, 0.5, 0, 'paper'),
+}
+
+
+def _codes(values, vocabulary):
+    """Map values to their position in vocabulary (-1 if absent) in one pass over the distinct values"""
+    positions, uniques = pd.factorize(values if isinstance(values, pd.Series) else np.asarray(values, dtype=object))
+    index = {value: code for code, value in enumerate(vocabulary)}
+    # Missing values factorize to -1, which picks the trailing -1
+    mapping = np.array([index.get(value, -1) for value in uniques] + [-1], dtype=np.int64)
+    return mapping[positions]
+
+
+class FeeSchedule:
+    """FEE_RULES compiled into rate and free-unit arrays indexed by legislation and request type code"""
+
+    def __init__(self, rules, waive_below, typical_workload):
+        self.legislations = sorted({rule[0] for rule in rules} | set(waive_below))
+        # Code 0 stands for every request type without rules or a typical workload of its own
+        self.request_types = [None] + sorted(
+            {rule[1] for rule in rules if rule[1] is not None} | set(typical_workload)
+        )
+        shape = (len(self.legislations), len(self.request_types), len(FEE_ITEMS))
+        self.rates = np.full(shape, np.nan)
+        self.free = np.zeros(shape)
+        for specific in (False, True):
+            for legislation, request_type, item, rate, free in rules:
+                if (request_type is not None) != specific:
+                    continue
+                types = [self.request_types.index(request_type)] if specific else slice(None)
+                leg = self.legislations.index(legislation)
+                self.rates[leg, types, FEE_ITEMS.index(item)] = rate
+                self.free[leg, types, FEE_ITEMS.index(item)] = free
+        self.rates = np.nan_to_num(self.rates)
+        self.waive_below = np.array([waive_below.get(legislation, 0) for legislation in self.legislations])
+        self.typical = np.zeros((len(self.request_types), 3))
+        # Media as codes into MEDIA
+        self.typical_media = np.zeros(len(self.request_types), dtype=np.int8)
+        for request_type, (pages, search, prep, media) in typical_workload.items():
+            code = self.request_types.index(request_type)
+            self.typical[code] = (pages, search, prep)
+            self.typical_media[code] = MEDIA.index(media)
+
+    def codes(self, request_types, legislations):
+        """Return legislation and request type codes; unlisted request types get code 0"""
+        leg = _codes(legislations, self.legislations)
+        if (leg < 0).any():
+            raise ValueError(f"Unknown legislation: {np.asarray(legislations, dtype=object)[leg < 0][0]}")
+        types = np.maximum(_codes(request_types, self.request_types), 0)
+        return leg, types
+
+    def evaluate(self, request_types, legislations, pages=None, search_hours=None, prep_hours=None,
+                 media=None, waiver=None):
+        """Return fee estimates (rounded to cents) for arrays of requests
+
+        Missing or NaN workload values (and blank media) fall back to the request
+        type's typical workload. A waiver, or extra fees below the legislation's threshold,
+        leaves only the application fee.
+        """
+        leg, types = self.codes(request_types, legislations)
+        count = len(leg)
+
+        def units(values, column):
+            typical = self.typical[types, column]
+            if values is None:
+                return typical
+            values = np.asarray(values, dtype=float)
+            return np.where(np.isnan(values), typical, values)
+
+        media_codes = self.typical_media[types]
+        if media is not None:
+            media = np.asarray(media, dtype=object)
+            given = pd.notna(media) & (media != '')
+            codes = _codes(media[given], MEDIA)
+            if (codes < 0).any():
+                raise ValueError(f"Unknown media: {media[given][codes < 0][0]}")
+            media_codes = media_codes.copy()
+            media_codes[given] = codes
+        quantities = np.column_stack([
+            np.ones(count),
+            units(pages, 0),
+            units(search_hours, 1),
+            units(prep_hours, 2),
+            media_codes == MEDIA.index('cd'),
+            media_codes == MEDIA.index('usb'),
+        ])
+        charges = np.maximum(quantities - self.free[leg, types], 0) * self.rates[leg, types]
+        application = charges[:, 0]
+        total = charges.sum(axis=1)
+        waived = total - application < self.waive_below[leg]
+        if waiver is not None:
+            waived |= np.asarray(waiver, dtype=bool)
+        return np.round(np.where(waived, application, total), 2)
+
+
+# Compiled once; recompute_fees() clears it after a rule change
+@lru_cache(maxsize=None)
+def fee_schedule():
+    """Return FEE_RULES compiled into a FeeSchedule"""
+    return FeeSchedule(FEE_RULES, WAIVE_BELOW, TYPICAL_WORKLOAD)
+
+
+def calculate_fees(request_types, legislations, pages=None, search_hours=None, prep_hours=None,
+                   media=None, waiver=None):
+    """Estimate fees for arrays of request types and legislations (see FeeSchedule.evaluate)"""
+    return fee_schedule().evaluate(request_types, legislations, pages, search_hours, prep_hours, media, waiver)
+
+
+def calculate_fee(request_type, legislation, pages=None, search_hours=None, prep_hours=None,
+                  media=None, waiver=False):
+    """Calculate estimated fee based on request type, legislation and the work involved"""
+    fee = float(calculate_fees(
+        [request_type], [legislation],
+        None if pages is None else [pages],
+        None if search_hours is None else [search_hours],
+        None if prep_hours is None else [prep_hours],
+        None if media is None else [media],
+        [waiver]
+    )[0])
+    return int(fee) if fee.is_integer() else fee
+
+
+def recompute_fees(store):
+    """Re-estimate open requests' fees from their stored workload in one batch, e.g. after a rule change
+
+    Only estimates worked out here (fee_computed) are redone; fees entered by
+    staff or carried over by an import stay as they are. Returns the number of
+    requests whose fee estimate changed.
+    """
+    fee_schedule.cache_clear()
+    frame = store.view([
+        'id', 'request_type', 'legislation_type', 'status', 'fee_estimate', 'fee_computed',
+        'pages', 'search_hours', 'prep_hours', 'media', 'fee_waived'
+    ])
+    frame = frame[(frame['status'] != 'Completed').to_numpy() & frame['fee_computed'].to_numpy()]
+    if frame.empty:
+        return 0
+    fees = calculate_fees(
+        frame['request_type'], frame['legislation_type'], frame['pages'], frame['search_hours'],
+        frame['prep_hours'], frame['media'].to_numpy(dtype=object), frame['fee_waived']
+    )
+    changed = fees != frame['fee_estimate'].to_numpy()
+    store.update_column('fee_estimate', dict(zip(frame['id'].to_numpy()[changed], fees[changed].tolist())))
+    return int(changed.sum())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-estimate fees for all open requests")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Request store database path")
+    args = parser.parse_args(argv)
+
+    store = RequestStore(args.db)
+    try:
+        start = time.perf_counter()
+        changed = recompute_fees(store)
+    finally:
+        store.close()
+    print(f"Updated {changed} fee estimates in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Streaming bulk importer for legacy FOI request backlogs (CSV or JSONL).
+
+Usage: python importer.py legacy_requests.csv [--chunk-size 5000] [--db foi_requests.db] [--assign]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+
+from core import ImportReport, add_assigned, prepare_chunk
+from store import DEFAULT_DB_PATH, RequestStore
+
+
+def detect_format(name):
+    """Return 'csv' or 'jsonl' based on a file name"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"Cannot detect import format for {name}; use .csv or .jsonl")
+
+
+def iter_chunks(source, fmt, chunk_size):
+    """Yield DataFrames of at most chunk_size rows without reading the whole file"""
+    if fmt == 'csv':
+        return pd.read_csv(source, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    if fmt == 'jsonl':
+        return pd.read_json(source, lines=True, chunksize=chunk_size, dtype=False)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def import_file(store, source, fmt=None, chunk_size=5000, progress=None, assigner=None):
+    """Stream a CSV/JSONL file (path or file object) into the store, one transaction per chunk
+
+    Rows without an assignee are auto-assigned when an assigner (AssignmentEngine) is given.
+    """
+    if fmt is None:
+        fmt = detect_format(getattr(source, 'name', source))
+    report = ImportReport()
+    start = time.perf_counter()
+    for chunk in iter_chunks(source, fmt, chunk_size):
+        first_row = report.rows_read + 1
+        report.rows_read += len(chunk)
+        records, rows = prepare_chunk(chunk, first_row, store, report)
+        if records:
+            try:
+                add_assigned(store, records, assigner)
+            except sqlite3.IntegrityError as e:
+                # The whole chunk is rolled back, so none of its valid rows were imported
+                for row in rows:
+                    report.add_error(row, f"chunk rolled back: {e}")
+            else:
+                report.rows_imported += len(records)
+        report.elapsed = time.perf_counter() - start
+        if progress:
+            progress(report)
+    report.elapsed = time.perf_counter() - start
+    report.errors.sort()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import FOI requests from CSV or JSONL")
+    parser.add_argument('path', help="CSV or JSONL file to import")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Override format detection")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="Rows validated and inserted per transaction")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Request store database path")
+    parser.add_argument('--assign', action='store_true', help="Auto-assign rows without an assignee by workload")
+    args = parser.parse_args(argv)
+
+    def print_progress(report):
+        print(f"\r{report.rows_read} read, {report.rows_imported} imported, "
+              f"{report.error_count} errors ({report.rows_per_second:,.0f} rows/s)", end='', flush=True)
+
+    store = RequestStore(args.db)
+    try:
+        assigner = None
+        if args.assign:
+            from assignment import AssignmentEngine, default_roster
+            assigner = AssignmentEngine(store, default_roster())
+        report = import_file(store, args.path, args.format, args.chunk_size, print_progress, assigner)
+    finally:
+        store.close()
+    print()
+    print(f"Imported {report.rows_imported} of {report.rows_read} rows in {report.elapsed:.1f}s "
+          f"({report.rows_per_second:,.0f} rows/s)")
+    for row, message in report.errors[:20]:
+        print(f"  row {row}: {message}")
+    if report.error_count > 20:
+        print(f"  ... and {report.error_count - 20} more errors")
+    return 1 if report.error_count else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
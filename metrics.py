@@ -0,0 +1,211 @@
+import json
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Durations kept per span for percentiles; older ones only count towards _sum/_count
+WINDOW = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+PREFIX = 'foi'
+
+_local = threading.local()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class MetricsRegistry:
+    """Process-wide span timings and counters, keyed by name and labels"""
+
+    def __init__(self, window=WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self._recent = {}
+        self._totals = {}
+        self._counters = Counter()
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is None:
+                recent = self._recent[key] = deque(maxlen=self._window)
+                self._totals[key] = [0, 0.0]
+            recent.append(seconds)
+            totals = self._totals[key]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def increment(self, name, n=1, **labels):
+        with self._lock:
+            self._counters[_key(name, labels)] += n
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+    def spans(self):
+        """Return [(name, labels, count, total seconds, {quantile: seconds})] for every span"""
+        with self._lock:
+            items = [(key, list(recent), list(self._totals[key])) for key, recent in self._recent.items()]
+        result = []
+        for (name, labels), recent, (count, total) in sorted(items):
+            quantiles = dict(zip(QUANTILES, np.quantile(recent, QUANTILES).tolist()))
+            result.append((name, labels, count, total, quantiles))
+        return result
+
+    def counters(self):
+        """Return [(name, labels, value)] for every counter"""
+        with self._lock:
+            return [(name, labels, value) for (name, labels), value in sorted(self._counters.items())]
+
+    def to_dict(self):
+        return {
+            'spans': [
+                {
+                    'name': name, 'labels': dict(labels), 'count': count, 'sum_seconds': total,
+                    **{f'p{round(q * 100)}_seconds': v for q, v in quantiles.items()}
+                }
+                for name, labels, count, total, quantiles in self.spans()
+            ],
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': value} for name, labels, value in self.counters()
+            ],
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    def to_prometheus(self):
+        """Render the Prometheus text exposition format"""
+        lines = [f'# TYPE {PREFIX}_span_seconds summary']
+        for name, labels, count, total, quantiles in self.spans():
+            span_labels = (('span', name),) + labels
+            for q, value in quantiles.items():
+                lines.append(f'{PREFIX}_span_seconds{_label_text(span_labels, quantile=q)} {value:.6f}')
+            lines.append(f'{PREFIX}_span_seconds_sum{_label_text(span_labels)} {total:.6f}')
+            lines.append(f'{PREFIX}_span_seconds_count{_label_text(span_labels)} {count}')
+        typed = set()
+        for name, labels, value in self.counters():
+            if name not in typed:
+                lines.append(f'# TYPE {PREFIX}_{name}_total counter')
+                typed.add(name)
+            lines.append(f'{PREFIX}_{name}_total{_label_text(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class Trace:
+    """Spans and counts recorded on one thread during one rerun, for the debug panel"""
+
+    def __init__(self):
+        # (start, depth, name, labels, seconds), appended as spans stop
+        self.spans = []
+        self.counts = Counter()
+        self.depth = 0
+
+
+def begin_trace():
+    """Start collecting this thread's spans and counts into a fresh Trace"""
+    _local.trace = Trace()
+    return _local.trace
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+class Span:
+    """Times a block; use as a context manager or call stop() when the section ends"""
+
+    def __init__(self, name, registry=REGISTRY, **labels):
+        self.name = name
+        self.labels = labels
+        self.seconds = None
+        self._registry = registry
+        self._trace = current_trace()
+        self._depth = 0
+        if self._trace is not None:
+            self._depth = self._trace.depth
+            self._trace.depth += 1
+        self._start = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stop(self, **labels):
+        """Record the elapsed time (once); labels known only at the end can be added here"""
+        if self.seconds is not None:
+            return self.seconds
+        self.seconds = time.perf_counter() - self._start
+        self.labels.update(labels)
+        self._registry.observe(self.name, self.seconds, **self.labels)
+        if self._trace is not None:
+            self._trace.depth = self._depth
+            self._trace.spans.append((self._start, self._depth, self.name, self.labels, self.seconds))
+        return self.seconds
+
+
+def span(name, **labels):
+    """Start timing a named section"""
+    return Span(name, **labels)
+
+
+def count(name, n=1, **labels):
+    """Add n to a named counter, and to the current trace if there is one"""
+    REGISTRY.increment(name, n, **labels)
+    trace = current_trace()
+    if trace is not None:
+        trace.counts[(name, tuple(sorted(labels.items())))] += n
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            body, content_type = self.registry.to_prometheus(), 'text/plain; version=0.0.4'
+        elif path == '/metrics.json':
+            body, content_type = self.registry.to_json(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+# Holidays observed on the following Monday when they fall on a weekend
+SHIFTED_HOLIDAYS = ("New Year's Day", 'Canada Day', 'Christmas Day', 'Boxing Day')
+
+
+def easter_sunday(year):
+    """Return the date of Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """Return the nth given weekday (Monday=0) of a month"""
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+@lru_cache(maxsize=None)
+def ontario_holidays(year):
+    """Return {date: name} of Ontario public holidays in a year, including weekend substitutes"""
+    easter = easter_sunday(year)
+    victoria_day = date(year, 5, 24) - timedelta(days=date(year, 5, 24).weekday())
+    named = {
+        "New Year's Day": date(year, 1, 1),
+        'Family Day': _nth_weekday(year, 2, 0, 3),
+        'Good Friday': easter - timedelta(days=2),
+        'Easter Monday': easter + timedelta(days=1),
+        'Victoria Day': victoria_day,
+        'Canada Day': date(year, 7, 1),
+        'Civic Holiday': _nth_weekday(year, 8, 0, 1),
+        'Labour Day': _nth_weekday(year, 9, 0, 1),
+        'Thanksgiving Day': _nth_weekday(year, 10, 0, 2),
+        'Remembrance Day': date(year, 11, 11),
+        'Christmas Day': date(year, 12, 25),
+        'Boxing Day': date(year, 12, 26)
+    }
+    holidays = {day: name for name, day in named.items()}
+    for name in SHIFTED_HOLIDAYS:
+        day = named[name]
+        if day.weekday() >= 5:
+            substitute = day + timedelta(days=7 - day.weekday())
+            while substitute in holidays:
+                substitute += timedelta(days=1)
+            holidays[substitute] = f"{name} (observed)"
+    return holidays
+
+
+@lru_cache(maxsize=None)
+def business_calendar(first_year, last_year):
+    """Return a NumPy business-day calendar (Mon-Fri minus holidays) covering the given years"""
+    days = sorted(day for year in range(first_year, last_year + 1) for day in ontario_holidays(year))
+    return np.busdaycalendar(weekmask='1111100', holidays=np.array(days, dtype='datetime64[D]'))
+
+
+@lru_cache(maxsize=4096)
+def next_business_day(day):
+    """Return day itself if it is a business day, otherwise the next one"""
+    while day.weekday() >= 5 or day in ontario_holidays(day.year):
+        day += timedelta(days=1)
+    return day
+
+
+def roll_forward(days):
+    """Vectorized next_business_day over a datetime64[D] array"""
+    days = np.asarray(days, dtype='datetime64[D]')
+    if days.size == 0:
+        return days
+    years = days.astype('datetime64[Y]').astype(int) + 1970
+    calendar = business_calendar(int(years.min()), int(years.max()) + 1)
+    return np.busday_offset(days, 0, roll='forward', busdaycal=calendar)
@@ -0,0 +1,215 @@
+"""Background scheduler that marks open requests At Risk or Overdue as their deadlines pass.
+
+Run it inside the app (the default) or as a standalone worker next to it.
+
+Usage: python scheduler.py [--db foi_requests.db] [--interval 60] [--once]
+"""
+import argparse
+import heapq
+import sys
+import threading
+import time
+import traceback
+from itertools import repeat
+
+import numpy as np
+
+from audit_log import Event
+from deadlines import today_snapshot, urgency_levels, urgency_thresholds
+from store import DEFAULT_DB_PATH, URGENCY_LEVELS, RequestStore
+
+# Upper bound on how long the scheduler sleeps before looking for changed requests
+POLL_INTERVAL = 60
+
+# The heap is rebuilt once stale entries outnumber live requests by this factor
+COMPACT_FACTOR = 4
+
+URGENCY_RANK = {'': 0, **{level: rank for rank, level in enumerate(URGENCY_LEVELS, start=1)}}
+
+
+def _seconds(now):
+    return int(np.datetime64(now, 's').astype(np.int64))
+
+
+class DeadlineScheduler:
+    """Min-heap of upcoming At Risk / Overdue crossings keyed on due date
+
+    Entries are (fire at, request id, due date). When an entry comes up the
+    request's urgency is worked out again from its due date and status, so a
+    flag is raised, lowered or cleared to match. Entries made stale by a later
+    due date change are skipped when they come up rather than removed.
+    """
+
+    def __init__(self, store, poll_interval=POLL_INTERVAL, on_reminder=None):
+        self._store = store
+        self.poll_interval = poll_interval
+        # Called with the list of reminder events after each batch of newly raised flags
+        self.on_reminder = on_reminder
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._load(today_snapshot())
+
+    def _load(self, now):
+        """Build the heap from every request, with those whose urgency is out of date due at once"""
+        self.seq = self._store.change_seq()
+        frame = self._store.frame(['id', 'status', 'due_date', 'urgency'])
+        ids = frame['id'].to_numpy()
+        due_dates = frame['due_date'].to_numpy()
+        is_open = (frame['status'] != 'Completed').to_numpy()
+        expected = np.where(is_open, urgency_levels(due_dates, now), '')
+        stale = expected != frame['urgency'].to_numpy()
+        self._heap = list(zip(repeat(0), ids[stale].tolist(), due_dates[stale].tolist()))
+        self._heap.extend(self._entries(ids[is_open], due_dates[is_open], now))
+        heapq.heapify(self._heap)
+
+    def _entries(self, ids, due_dates, now):
+        """Return heap entries for the At Risk and Overdue thresholds still ahead of now"""
+        if not len(ids):
+            return []
+        entries = []
+        for fire_at in urgency_thresholds(due_dates):
+            fire_at = fire_at.astype(np.int64)
+            pending = fire_at > _seconds(now)
+            entries.extend(zip(fire_at[pending].tolist(), ids[pending].tolist(), due_dates[pending].tolist()))
+        return entries
+
+    def reschedule(self, requests, now):
+        """Queue new or changed requests to have their urgency checked now and at each threshold"""
+        requests = [r for r in requests if r is not None]
+        if not requests:
+            return
+        entries = [(0, r['id'], r['due_date']) for r in requests]
+        open_requests = [r for r in requests if r['status'] != 'Completed']
+        entries.extend(self._entries(
+            np.array([r['id'] for r in open_requests], dtype=object),
+            np.array([r['due_date'] for r in open_requests], dtype=object),
+            now
+        ))
+        with self._lock:
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+
+    def next_due(self):
+        """Return when the next threshold is crossed, in epoch seconds of local time, or None"""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def run_due(self, now):
+        """Update the urgency of every request with an entry due; returns {id: new urgency}"""
+        seconds = _seconds(now)
+        due = {}
+        with self._lock:
+            while self._heap and self._heap[0][0] <= seconds:
+                _, request_id, due_date = heapq.heappop(self._heap)
+                request = self._store.get(request_id)
+                if request is not None and request['due_date'] == due_date:
+                    due[request_id] = request
+        if not due:
+            return {}
+        levels = urgency_levels([request['due_date'] for request in due.values()], now)
+        changes = {}
+        for (request_id, request), level in zip(due.items(), levels):
+            # Completing a request clears its flag
+            level = '' if request['status'] == 'Completed' else level
+            if level != request['urgency']:
+                changes[request_id] = level
+        if not changes:
+            return {}
+        versions = {request_id: due[request_id]['version'] for request_id in changes}
+        # Requests changed in the meantime are requeued by the next poll
+        updated = self._store.update_column('urgency', changes, expected_versions=versions)
+        self._remind(
+            [i for i in updated if URGENCY_RANK[changes[i]] > URGENCY_RANK[due[i]['urgency']]], changes
+        )
+        return {request_id: changes[request_id] for request_id in updated}
+
+    def _remind(self, request_ids, levels):
+        """Record a reminder event for each request whose flag was raised"""
+        now = time.time()
+        reminders = []
+        for request_id in request_ids:
+            request = self._store.get(request_id)
+            reminders.append(Event(
+                request_id, 'reminder', now,
+                changes={
+                    'urgency': levels[request_id],
+                    'due_date': request['due_date'],
+                    'assigned_to': request['assigned_to']
+                }
+            ))
+        if self._store.events is not None:
+            self._store.events.append(reminders)
+        if self.on_reminder is not None and reminders:
+            self.on_reminder(reminders)
+
+    def poll(self, now):
+        """Pick up changed requests, then update whatever has become due"""
+        self._store.sync()
+        seq, changed = self._store.changes_since(self.seq)
+        if changed is None or len(self._heap) > COMPACT_FACTOR * self._store.count() + 1000:
+            with self._lock:
+                self._load(now)
+        elif changed:
+            self.reschedule(map(self._store.get, changed), now)
+            self.seq = seq
+        return self.run_due(now)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = today_snapshot()
+            try:
+                self.poll(now)
+            except Exception:
+                traceback.print_exc()
+            wait = self.poll_interval
+            next_due = self.next_due()
+            if next_due is not None:
+                wait = min(wait, max(next_due - _seconds(now), 0))
+            self._stop.wait(wait)
+
+    def start(self):
+        """Catch up once, then keep flagging requests from a daemon thread"""
+        self.poll(today_snapshot())
+        self._thread = threading.Thread(target=self._run, name='deadline-scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mark requests At Risk or Overdue as their deadlines pass")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Request store database path")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                        help="Longest wait in seconds before checking for changed requests")
+    parser.add_argument('--once', action='store_true', help="Flag overdue requests once and exit")
+    args = parser.parse_args(argv)
+
+    store = RequestStore(args.db)
+
+    def report(reminders):
+        for event in reminders:
+            print(f"{event.time:%Y-%m-%d %H:%M:%S}  {event.request_id} is {event.changes['urgency']} "
+                  f"(due {event.changes['due_date']}, {event.changes['assigned_to']})")
+
+    scheduler = DeadlineScheduler(store, poll_interval=args.interval, on_reminder=report)
+    try:
+        if args.once:
+            scheduler.poll(today_snapshot())
+        else:
+            scheduler.start()
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop()
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
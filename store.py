@@ -0,0 +1,836 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from aggregates import AGGREGATE_COLUMNS, RequestAggregates
+from audit_log import Event, EventLog
+from columnar import RequestTable
+from metrics import count
+
+DEFAULT_DB_PATH = os.environ.get(
+    'FOI_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'foi_requests.db')
+)
+
+# Column order used for inserts and for rebuilding request dicts
+COLUMNS = [
+    'id',
+    'requester_name',
+    'request_type',
+    'date_received',
+    'due_date',
+    'status',
+    'assigned_to',
+    'legislation_type',
+    'description',
+    'third_party_notification',
+    'fee_estimate',
+    'extension_granted',
+    'urgency',
+    'pages',
+    'search_hours',
+    'prep_hours',
+    'media',
+    'fee_waived',
+    'fee_computed'
+]
+
+BOOLEAN_COLUMNS = ('third_party_notification', 'extension_granted', 'fee_waived', 'fee_computed')
+
+# Work a fee estimate is based on; NULL means the request type's typical workload
+WORKLOAD_COLUMNS = ('pages', 'search_hours', 'prep_hours')
+
+# Values for fields left out of a request dict, e.g. by records that predate them.
+# fee_computed marks estimates worked out here, which recompute_fees() may redo;
+# fees entered by staff or carried over by an import are left alone.
+COLUMN_DEFAULTS = {
+    'urgency': '',
+    'pages': None,
+    'search_hours': None,
+    'prep_hours': None,
+    'media': '',
+    'fee_waived': False,
+    'fee_computed': False
+}
+
+# Columns that may be used in filters and ordering
+INDEXED_COLUMNS = ('id', 'status', 'legislation_type', 'assigned_to', 'due_date', 'date_received', 'urgency')
+
+# Allowed status transitions: current status -> statuses it may move to
+TRANSITIONS = {
+    'Pending Review': ('In Progress',),
+    'In Progress': ('Extended', 'Completed'),
+    'Extended': ('Completed',),
+    'Completed': ()
+}
+
+# Deadline flags the scheduler keeps in the urgency column, least urgent first ('' when neither
+# applies). They sit alongside the workflow status rather than replacing it.
+URGENCY_LEVELS = ('At Risk', 'Overdue')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id TEXT PRIMARY KEY,
+    requester_name TEXT NOT NULL,
+    request_type TEXT NOT NULL,
+    date_received TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    assigned_to TEXT NOT NULL DEFAULT 'Unassigned',
+    legislation_type TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    third_party_notification INTEGER NOT NULL DEFAULT 0,
+    fee_estimate REAL NOT NULL DEFAULT 0,
+    extension_granted INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 1,
+    urgency TEXT NOT NULL DEFAULT '',
+    pages REAL,
+    search_hours REAL,
+    prep_hours REAL,
+    media TEXT NOT NULL DEFAULT '',
+    fee_waived INTEGER NOT NULL DEFAULT 0,
+    fee_computed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_requests_status_due_date ON requests (status, due_date);
+CREATE INDEX IF NOT EXISTS idx_requests_legislation_type ON requests (legislation_type);
+CREATE INDEX IF NOT EXISTS idx_requests_assigned_to ON requests (assigned_to);
+CREATE INDEX IF NOT EXISTS idx_requests_due_date ON requests (due_date);
+CREATE INDEX IF NOT EXISTS idx_requests_date_received ON requests (date_received);
+CREATE TABLE IF NOT EXISTS id_sequences (
+    year INTEGER PRIMARY KEY,
+    next_value INTEGER NOT NULL
+);
+"""
+
+# Every insert or update of a request is recorded here, so sessions and other
+# processes can pick up just the rows that changed
+CHANGES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS request_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id TEXT NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS request_changes_insert AFTER INSERT ON requests BEGIN
+    INSERT INTO request_changes (request_id, version) VALUES (new.id, new.version);
+END;
+CREATE TRIGGER IF NOT EXISTS request_changes_update AFTER UPDATE ON requests BEGIN
+    INSERT INTO request_changes (request_id, version) VALUES (new.id, new.version);
+END;
+"""
+
+# Change log entries kept once they are this far behind the newest one
+CHANGE_LOG_RETENTION = 100000
+
+# Rows read per batch when building the in-memory table at startup
+LOAD_CHUNK_SIZE = 50000
+
+# Request IDs are year-scoped sequences, e.g. FOI-2025-000042
+ID_PREFIX = 'FOI'
+ID_DIGITS = 6
+# IDs reserved per round trip by next_id(); unused IDs in a block are skipped on restart
+ID_BLOCK_SIZE = 20
+ID_PATTERN = re.compile(rf'{ID_PREFIX}-(\d{{4}})-(\d+)')
+
+# Columns covered by the full-text search index, with their bm25 ranking weights
+SEARCH_COLUMNS = ('id', 'requester_name', 'description', 'assigned_to')
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0, 2.0)
+# Searches whose terms match more requests than this are listed newest first instead of
+# ranked, since bm25 has to score and sort every match before the first page is known
+RANK_LIMIT = 1000
+
+# Trigram FTS5 index over the request table. It is an external-content table keyed on
+# the requests rowid, so only the index is stored and the triggers keep it in sync.
+# Status-only updates do not touch it.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS requests_fts USING fts5(
+    id, requester_name, description, assigned_to,
+    content='requests', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS requests_fts_insert AFTER INSERT ON requests BEGIN
+    INSERT INTO requests_fts (rowid, id, requester_name, description, assigned_to)
+    VALUES (new.rowid, new.id, new.requester_name, new.description, new.assigned_to);
+END;
+CREATE TRIGGER IF NOT EXISTS requests_fts_delete AFTER DELETE ON requests BEGIN
+    INSERT INTO requests_fts (requests_fts, rowid, id, requester_name, description, assigned_to)
+    VALUES ('delete', old.rowid, old.id, old.requester_name, old.description, old.assigned_to);
+END;
+CREATE TRIGGER IF NOT EXISTS requests_fts_update
+AFTER UPDATE OF id, requester_name, description, assigned_to ON requests BEGIN
+    INSERT INTO requests_fts (requests_fts, rowid, id, requester_name, description, assigned_to)
+    VALUES ('delete', old.rowid, old.id, old.requester_name, old.description, old.assigned_to);
+    INSERT INTO requests_fts (rowid, id, requester_name, description, assigned_to)
+    VALUES (new.rowid, new.id, new.requester_name, new.description, new.assigned_to);
+END;
+"""
+
+
+def events_dir_for(path):
+    """Return the audit log directory kept alongside a database file"""
+    return os.path.splitext(path)[0] + '_events'
+
+
+def _row_to_request(row):
+    """Convert a sqlite3.Row into the request dict used by the app"""
+    request = dict(row)
+    for column in BOOLEAN_COLUMNS:
+        request[column] = bool(request[column])
+    for column in ('fee_estimate',) + WORKLOAD_COLUMNS:
+        value = request[column]
+        if value is not None and float(value).is_integer():
+            request[column] = int(value)
+    return request
+
+
+def _value(request, column):
+    value = request.get(column, COLUMN_DEFAULTS.get(column))
+    if column in BOOLEAN_COLUMNS:
+        return int(bool(value))
+    if column in WORKLOAD_COLUMNS and value is not None and math.isnan(value):
+        return None
+    return value
+
+
+def _request_to_row(request):
+    """Convert a request dict into a tuple ordered like COLUMNS"""
+    return tuple(_value(request, column) for column in COLUMNS)
+
+
+def format_id(year, sequence):
+    """Format a request ID from its year and sequence number"""
+    return f"{ID_PREFIX}-{year}-{sequence:0{ID_DIGITS}d}"
+
+
+def max_sequences(request_ids):
+    """Return {year: highest sequence number} over the IDs that follow the request ID format"""
+    highest = {}
+    for request_id in request_ids:
+        match = ID_PATTERN.fullmatch(request_id)
+        if match:
+            year, sequence = int(match[1]), int(match[2])
+            if sequence > highest.get(year, 0):
+                highest[year] = sequence
+    return highest
+
+
+class InvalidTransition(ValueError):
+    """Raised when a request cannot move to the requested status"""
+
+
+class StaleRequest(Exception):
+    """Raised when a request was changed by someone else since it was read"""
+
+
+def can_transition(request, new_status):
+    """Return True if the request may move to new_status"""
+    if new_status not in TRANSITIONS.get(request['status'], ()):
+        return False
+    if new_status == 'Extended' and request['extension_granted']:
+        return False
+    return True
+
+
+def _search_terms(term):
+    """Split a search term into an FTS5 MATCH expression and tokens too short for trigrams"""
+    tokens = term.split()
+    phrases = ['"' + token.replace('"', '""') + '"' for token in tokens if len(token) >= 3]
+    short_tokens = [token for token in tokens if len(token) < 3]
+    return ' AND '.join(phrases), short_tokens
+
+
+def _short_token_clauses(short_tokens):
+    """Build LIKE clauses for tokens the trigram index cannot match"""
+    clauses = []
+    params = []
+    for token in short_tokens:
+        clauses.append(f"({' OR '.join(f'{c} LIKE ?' for c in SEARCH_COLUMNS)})")
+        params.extend([f"%{token}%"] * len(SEARCH_COLUMNS))
+    return clauses, params
+
+
+def _build_where(status=None, legislation=None, assigned_to=None, urgency=None, search=None):
+    """Build a WHERE clause and parameters for the supported request filters"""
+    clauses = []
+    params = []
+    if status:
+        clauses.append(f"status IN ({','.join('?' * len(status))})")
+        params.extend(status)
+    if urgency:
+        clauses.append(f"urgency IN ({','.join('?' * len(urgency))})")
+        params.extend(urgency)
+    if legislation:
+        clauses.append(f"legislation_type IN ({','.join('?' * len(legislation))})")
+        params.extend(legislation)
+    if assigned_to:
+        clauses.append(f"assigned_to IN ({','.join('?' * len(assigned_to))})")
+        params.extend(assigned_to)
+    if search:
+        match, short_tokens = _search_terms(search)
+        if match:
+            clauses.append("rowid IN (SELECT rowid FROM requests_fts WHERE requests_fts MATCH ?)")
+            params.append(match)
+        short_clauses, short_params = _short_token_clauses(short_tokens)
+        clauses.extend(short_clauses)
+        params.extend(short_params)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+class RequestStore:
+    """Durable SQLite-backed repository for FOI requests"""
+
+    def __init__(self, path=DEFAULT_DB_PATH, audit=True, load_table=True):
+        """Open (creating if needed) the database at path
+
+        load_table=False skips the in-memory table and dashboard counters, for
+        read-only tools such as the exporter CLI that page through SQLite instead.
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._conn.executescript(CHANGES_SCHEMA)
+        self._ensure_search_index()
+        # Bumped on every write so caches can tell when to refresh
+        self.revision = 0
+        # Newest change log entry already reflected in the table
+        self.last_seq = self.change_seq()
+        # Compact columnar copy of every request, kept in sync on every add and update
+        self.table = self._load_table() if load_table else None
+        # year -> [next sequence, end of reserved block) for next_id()
+        self._id_blocks = {}
+        # Running counters for the dashboard, kept in sync alongside the table
+        self.aggregates = None
+        if self.table is not None:
+            self.aggregates = RequestAggregates.from_counts(
+                len(self.table), {column: self.table.value_counts(column) for column in AGGREGATE_COLUMNS}
+            )
+        # Append-only history of every create, transition and extension
+        self.events = None
+        if audit and path != ':memory:':
+            self.events = EventLog(events_dir_for(path))
+            if not len(self.events) and self.table is not None and len(self.table):
+                # Databases that predate the log start their history from a snapshot
+                self._record_creates(self.table.records())
+        if self.table is not None:
+            self._separate_urgency()
+
+    def _load_table(self):
+        """Build the columnar table from SQLite a chunk at a time
+
+        Only one chunk is held as a DataFrame at once, so peak memory stays
+        close to the size of the finished table rather than several times it.
+        """
+        total = self._conn.execute("SELECT COUNT(*) FROM requests").fetchone()[0]
+        table = RequestTable(capacity=max(total, 1024))
+        for chunk in pd.read_sql_query("SELECT * FROM requests", self._conn, chunksize=LOAD_CHUNK_SIZE):
+            table.append_frame(chunk)
+        return table
+
+    def _migrate(self):
+        """Add columns introduced after a database was created"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(requests)")}
+        if 'version' not in columns:
+            self._conn.execute("ALTER TABLE requests ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        if 'urgency' not in columns:
+            self._conn.execute("ALTER TABLE requests ADD COLUMN urgency TEXT NOT NULL DEFAULT ''")
+        for column in WORKLOAD_COLUMNS:
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE requests ADD COLUMN {column} REAL")
+        if 'media' not in columns:
+            self._conn.execute("ALTER TABLE requests ADD COLUMN media TEXT NOT NULL DEFAULT ''")
+        # Fees already stored were entered or imported, so recompute_fees() leaves them alone
+        for column in ('fee_waived', 'fee_computed'):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE requests ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+        # Serves the urgent list, most urgent first
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_requests_urgency_due_date ON requests (urgency, due_date)"
+        )
+        # Superseded by idx_requests_status_due_date
+        self._conn.execute("DROP INDEX IF EXISTS idx_requests_status")
+
+    def _separate_urgency(self):
+        """Move At Risk / Overdue flags that older versions wrote into status over to urgency
+
+        Each request gets back the workflow status it had before it was flagged, taken
+        from its history (or from whether it was extended, if it has none).
+        """
+        placeholders = ','.join('?' * len(URGENCY_LEVELS))
+        flagged = [
+            self.table.get(row[0])
+            for row in self._conn.execute(f"SELECT id FROM requests WHERE status IN ({placeholders})", URGENCY_LEVELS)
+        ]
+        if not flagged:
+            return
+        statuses = {}
+        for request in flagged:
+            prior = next(
+                (event.to_status for event in reversed(self.history(request['id'])) if event.to_status in TRANSITIONS),
+                'Extended' if request['extension_granted'] else 'In Progress'
+            )
+            statuses[request['id']] = prior
+        self.update_column('urgency', {request['id']: request['status'] for request in flagged})
+        self.update_column('status', statuses)
+
+    def _ensure_search_index(self):
+        """Create the full-text index, backfilling it for databases that predate it"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'requests_fts'"
+        ).fetchone()
+        self._conn.executescript(SEARCH_SCHEMA)
+        if not exists:
+            self.rebuild_search_index()
+
+    def rebuild_search_index(self):
+        """Rebuild the full-text index from the request table (needed after VACUUM)"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO requests_fts (requests_fts) VALUES ('rebuild')")
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
+            if self.events is not None:
+                self.events.close()
+
+    def _record_creates(self, requests):
+        """Log a create event carrying the full record of each request"""
+        if self.events is None:
+            return
+        now = time.time()
+        self.events.append(
+            Event(r['id'], 'create', now, to_status=r['status'],
+                  changes={k: r[k] for k in COLUMNS if k != 'status'})
+            for r in requests
+        )
+
+    def _record_change(self, old, new, now=None):
+        """Log the difference between two versions of a request"""
+        if self.events is None:
+            return None
+        changes = {k: new[k] for k in COLUMNS[1:] if k != 'status' and old[k] != new[k]}
+        if old['status'] != new['status']:
+            kind = 'extension' if new['status'] == 'Extended' else 'transition'
+        elif changes:
+            kind = 'update'
+        else:
+            return None
+        return Event(new['id'], kind, now or time.time(), old['status'], new['status'], changes)
+
+    def _max_sequence(self, year):
+        """Return the highest sequence number already used in IDs for a year"""
+        prefix = f"{ID_PREFIX}-{year}-"
+        rows = self._conn.execute(
+            "SELECT id FROM requests WHERE id >= ? AND id < ?",
+            (prefix, prefix[:-1] + chr(ord('-') + 1))
+        ).fetchall()
+        suffixes = [row[0][len(prefix):] for row in rows]
+        return max((int(s) for s in suffixes if s.isdigit()), default=0)
+
+    def _reserve_sequences(self, year, count):
+        """Atomically reserve count sequence numbers for a year and return the first
+
+        The reservation is a single UPSERT on id_sequences, so it is safe across
+        sessions and processes sharing the database.
+        """
+        with self._lock, self._conn:
+            # Hold the write lock from the first read, so no insert lands between the two
+            self._conn.execute("BEGIN IMMEDIATE")
+            known = self._conn.execute(
+                "SELECT 1 FROM id_sequences WHERE year = ?", (year,)
+            ).fetchone()
+            # Only a year's first reservation has to look at IDs already in the table;
+            # after that, add_many() keeps the sequence ahead of any IDs inserted as given
+            start = 1 if known else self._max_sequence(year) + 1
+            end = self._conn.execute(
+                """
+                INSERT INTO id_sequences (year, next_value) VALUES (?, ?)
+                ON CONFLICT (year) DO UPDATE SET next_value = next_value + ?
+                RETURNING next_value
+                """,
+                (year, start + count, count)
+            ).fetchone()[0]
+        return end - count
+
+    def allocate_ids(self, year, count):
+        """Reserve count consecutive request IDs for a year in one round trip"""
+        if count <= 0:
+            return []
+        first = self._reserve_sequences(year, count)
+        return [format_id(year, sequence) for sequence in range(first, first + count)]
+
+    def next_id(self, year):
+        """Return the next request ID for a year, reserving IDs from the database in blocks"""
+        with self._lock:
+            while True:
+                block = self._id_blocks.get(year)
+                if block is None or block[0] >= block[1]:
+                    first = self._reserve_sequences(year, ID_BLOCK_SIZE)
+                    block = self._id_blocks[year] = [first, first + ID_BLOCK_SIZE]
+                request_id = format_id(year, block[0])
+                block[0] += 1
+                # Skip IDs imported as given since the block was reserved
+                if request_id not in self.table:
+                    return request_id
+
+    def seed(self, requests):
+        """Insert the given requests only when the store is empty"""
+        with self._lock:
+            if self.count() == 0:
+                self.add_many(requests)
+
+    def add(self, request):
+        """Insert a single request"""
+        self.add_many([request])
+
+    def add_many(self, requests):
+        """Insert several requests in one transaction
+
+        IDs given explicitly (e.g. by an import) move their year's sequence past
+        them in the same transaction, so allocated IDs never run into them.
+        """
+        rows = [_request_to_row(r) for r in requests]
+        placeholders = ','.join('?' * len(COLUMNS))
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT INTO requests ({','.join(COLUMNS)}) VALUES ({placeholders})",
+                    rows
+                )
+                self._conn.executemany(
+                    "UPDATE id_sequences SET next_value = MAX(next_value, ?) WHERE year = ?",
+                    [(sequence + 1, year) for year, sequence in max_sequences(row[0] for row in rows).items()]
+                )
+            added = []
+            for row in rows:
+                request = _row_to_request(dict(zip(COLUMNS, row)))
+                request['version'] = 1
+                self.aggregates.add(request)
+                added.append(request)
+            self.table.append_many(added)
+            self._record_creates(added)
+            self.revision += 1
+
+    def update(self, request_id, expected_version=None, **fields):
+        """Update fields of an existing request and return the updated request
+
+        If expected_version is given, the update only applies when the stored
+        version still matches; otherwise StaleRequest is raised.
+        """
+        unknown = set(fields) - set(COLUMNS[1:])
+        if unknown:
+            raise ValueError(f"Unknown request fields: {', '.join(sorted(unknown))}")
+        values = [int(bool(v)) if k in BOOLEAN_COLUMNS else v for k, v in fields.items()]
+        assignments = ''.join(f"{k} = ?, " for k in fields)
+        sql = f"UPDATE requests SET {assignments}version = version + 1 WHERE id = ?"
+        params = values + [request_id]
+        if expected_version is not None:
+            sql += " AND version = ?"
+            params.append(expected_version)
+        with self._lock:
+            if request_id not in self.table:
+                raise KeyError(request_id)
+            with self._conn:
+                row = self._conn.execute(sql + " RETURNING *", params).fetchone()
+            if row is None:
+                self.sync()
+                raise StaleRequest(f"{request_id} was changed by someone else; reload and try again")
+            old = self.table.get(request_id)
+            # Take the stored row so changes made elsewhere are picked up too
+            request = _row_to_request(row)
+            self.table.put(request)
+            self.aggregates.change(old, request)
+            event = self._record_change(old, request)
+            if event is not None:
+                self.events.append([event])
+            self.revision += 1
+            return dict(request)
+
+    def transition(self, request_id, new_status, expected_version=None, **fields):
+        """Move a request to new_status, applying any extra field changes"""
+        with self._lock:
+            request = self.table.get(request_id)
+            if request is None:
+                raise KeyError(request_id)
+            if expected_version is not None and expected_version != request['version']:
+                raise StaleRequest(f"{request_id} was changed by someone else; reload and try again")
+            if not can_transition(request, new_status):
+                raise InvalidTransition(
+                    f"{request_id} cannot move from {request['status']} to {new_status}"
+                )
+            return self.update(request_id, expected_version=request['version'], status=new_status, **fields)
+
+    def update_column(self, column, values, expected_versions=None):
+        """Set one column for many requests in a single transaction; values maps id -> value
+
+        If expected_versions (id -> version) is given, requests changed since are
+        left alone. Returns the IDs that were updated.
+        """
+        if column not in COLUMNS[1:]:
+            raise ValueError(f"Unknown request field: {column}")
+        if not values:
+            return []
+        convert = (lambda v: int(bool(v))) if column in BOOLEAN_COLUMNS else (lambda v: v)
+        sql = f"UPDATE requests SET {column} = ?, version = version + 1 WHERE id = ?"
+        with self._lock:
+            with self._conn:
+                if expected_versions is None:
+                    self._conn.executemany(
+                        sql, [(convert(value), request_id) for request_id, value in values.items()]
+                    )
+                    updated = list(values)
+                else:
+                    updated = [
+                        request_id for request_id, value in values.items()
+                        if self._conn.execute(
+                            sql + " AND version = ?",
+                            (convert(value), request_id, expected_versions[request_id])
+                        ).rowcount
+                    ]
+            now = time.time()
+            events = []
+            for request_id in updated:
+                value = values[request_id]
+                old = self.table.get(request_id)
+                if old is None:
+                    continue
+                request = dict(old, version=old['version'] + 1)
+                request[column] = bool(value) if column in BOOLEAN_COLUMNS else value
+                self.table.put(request)
+                self.aggregates.change(old, request)
+                event = self._record_change(old, request, now)
+                if event is not None:
+                    events.append(event)
+            if self.events is not None:
+                self.events.append(events)
+            self.revision += 1
+            return updated
+
+    def change_seq(self):
+        """Return the sequence number of the newest change log entry"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM request_changes").fetchone()[0]
+
+    def changes_since(self, seq):
+        """Return (newest seq, IDs changed after seq)
+
+        The ID list is None when seq is older than the retained change log, in
+        which case the caller should reload everything.
+        """
+        with self._lock:
+            oldest = self._conn.execute("SELECT MIN(seq) FROM request_changes").fetchone()[0]
+            if oldest is not None and seq < oldest - 1:
+                return self.change_seq(), None
+            rows = self._conn.execute(
+                "SELECT seq, request_id FROM request_changes WHERE seq > ? ORDER BY seq", (seq,)
+            ).fetchall()
+        if not rows:
+            return seq, []
+        return rows[-1][0], list(dict.fromkeys(row[1] for row in rows))
+
+    def sync(self):
+        """Apply changes written by other processes to the id index and counters
+
+        Returns the number of requests that were reloaded.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, request_id, version FROM request_changes WHERE seq > ? ORDER BY seq",
+                (self.last_seq,)
+            ).fetchall()
+            if not rows:
+                return 0
+            self.last_seq = rows[-1][0]
+            latest = {request_id: version for _, request_id, version in rows}
+            stale = [
+                request_id for request_id, version in latest.items()
+                if request_id not in self.table or self.table.version(request_id) < version
+            ]
+            for start in range(0, len(stale), 500):
+                batch = stale[start:start + 500]
+                fresh = self._conn.execute(
+                    f"SELECT * FROM requests WHERE id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for row in fresh:
+                    new = _row_to_request(row)
+                    old = self.table.get(new['id'])
+                    self.table.put(new)
+                    if old is None:
+                        self.aggregates.add(new)
+                    else:
+                        self.aggregates.change(old, new)
+            if stale:
+                self.revision += 1
+            self._prune_changes()
+            return len(stale)
+
+    def _prune_changes(self):
+        """Drop change log entries older than the retention window"""
+        cutoff = self.last_seq - CHANGE_LOG_RETENTION
+        if cutoff > 0:
+            with self._conn:
+                self._conn.execute("DELETE FROM request_changes WHERE seq <= ?", (cutoff,))
+
+    def history(self, request_id):
+        """Return the audit events recorded for a request, oldest first"""
+        return self.events.timeline(request_id) if self.events is not None else []
+
+    def __contains__(self, request_id):
+        if self.table is None:
+            return self.get(request_id) is not None
+        return request_id in self.table
+
+    def get(self, request_id):
+        """Return the request with the given ID, or None"""
+        with self._lock:
+            if self.table is None:
+                row = self._conn.execute("SELECT * FROM requests WHERE id = ?", (request_id,)).fetchone()
+                return _row_to_request(row) if row is not None else None
+            return self.table.get(request_id)
+
+    def count(self, limit=None, **filters):
+        """Count requests matching the given filters
+
+        With limit, counting stops after limit + 1 matches, so a result above
+        limit means "more than limit" and common search terms stay cheap.
+        """
+        if not any(filters.values()) and self.aggregates is not None:
+            return self.aggregates.total if limit is None else min(self.aggregates.total, limit + 1)
+        match, short_tokens = _search_terms(filters.get('search') or '')
+        if match and not short_tokens and not any(v for k, v in filters.items() if k != 'search'):
+            # Search alone is counted straight from the index without touching the request table
+            sql, params = "SELECT 1 FROM requests_fts WHERE requests_fts MATCH ?", [match]
+        else:
+            where, params = _build_where(**filters)
+            sql = f"SELECT 1 FROM requests{where}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = params + [limit + 1]
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+
+    def query(self, order_by='id', descending=False, limit=None, offset=0, after=None, **filters):
+        """Return requests matching the given filters as a list of dicts
+
+        When ordering by id, pass the last id of the previous page as `after`
+        to page through results with an index seek instead of an OFFSET scan.
+        """
+        if order_by not in INDEXED_COLUMNS:
+            raise ValueError(f"Cannot order by {order_by}")
+        where, params = _build_where(**filters)
+        if after is not None:
+            if order_by != 'id':
+                raise ValueError("Cursor paging requires order_by='id'")
+            where += f"{' AND' if where else ' WHERE'} id {'<' if descending else '>'} ?"
+            params.append(after)
+        sql = f"SELECT * FROM requests{where} ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+        if order_by != 'id':
+            sql += ", id"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        count('records_scanned', len(rows), source='query')
+        return [_row_to_request(row) for row in rows]
+
+    def search(self, term, limit=50, offset=0, **filters):
+        """Return requests matching term across id, requester, description and assignee, best first
+
+        Tokens of three or more characters are substring-matched through the trigram index
+        and ranked with bm25; shorter tokens fall back to a LIKE scan. Terms matching more
+        than RANK_LIMIT requests are listed newest first, which reads only the page asked for.
+        """
+        match, short_tokens = _search_terms(term)
+        if not match:
+            return self.query(limit=limit, offset=offset, search=term, **filters)
+        where, params = _build_where(**filters)
+        short_clauses, short_params = _short_token_clauses(short_tokens)
+        if short_clauses:
+            where += f"{' AND' if where else ' WHERE'} {' AND '.join(short_clauses)}"
+            params.extend(short_params)
+        with self._lock:
+            ranked = self._conn.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM requests_fts WHERE requests_fts MATCH ? LIMIT ?)",
+                (match, RANK_LIMIT + 1)
+            ).fetchone()[0] <= RANK_LIMIT
+            if ranked:
+                weights = ', '.join(str(w) for w in SEARCH_WEIGHTS)
+                sql = f"""
+                    SELECT requests.* FROM (
+                        SELECT rowid AS hit_rowid, bm25(requests_fts, {weights}) AS score
+                        FROM requests_fts WHERE requests_fts MATCH ?
+                    ) AS hits
+                    JOIN requests ON requests.rowid = hits.hit_rowid
+                    {where}
+                    ORDER BY hits.score, requests.id
+                    LIMIT ? OFFSET ?
+                """
+            else:
+                # CROSS JOIN keeps the index as the outer loop, so hits stream newest first
+                # and the scan stops as soon as the page is filled
+                sql = f"""
+                    SELECT requests.* FROM (
+                        SELECT rowid AS hit_rowid FROM requests_fts WHERE requests_fts MATCH ?
+                    ) AS hits
+                    CROSS JOIN requests ON requests.rowid = hits.hit_rowid
+                    {where}
+                    ORDER BY hits.hit_rowid DESC
+                    LIMIT ? OFFSET ?
+                """
+            rows = self._conn.execute(sql, [match] + params + [limit, offset]).fetchall()
+        count('records_scanned', len(rows), source='search')
+        return [_row_to_request(row) for row in rows]
+
+    def recent(self, limit=5):
+        """Return the most recently received requests"""
+        return self.query(order_by='date_received', descending=True, limit=limit)
+
+    def rows(self, status=None, legislation=None, urgency=None, search=None):
+        """Return table row positions of matching requests in id order"""
+        with self._lock:
+            if search:
+                where, params = _build_where(status=status, legislation=legislation, urgency=urgency, search=search)
+                ids = [row[0] for row in self._conn.execute(f"SELECT id FROM requests{where} ORDER BY id", params)]
+                return self.table.rows(ids)
+            rows = self.table.id_order()
+            if status:
+                rows = rows[self.table.mask('status', status)[rows]]
+            if legislation:
+                rows = rows[self.table.mask('legislation_type', legislation)[rows]]
+            if urgency:
+                rows = rows[self.table.mask('urgency', urgency)[rows]]
+            return rows
+
+    def view(self, columns=COLUMNS, rows=None, iso_dates=False):
+        """Return a typed DataFrame snapshot of the in-memory table (see RequestTable.to_pandas)"""
+        with self._lock:
+            view = self.table.to_pandas(columns, rows, iso_dates)
+        count('records_scanned', len(view), source='view')
+        return view
+
+    def arrow_view(self, columns=COLUMNS, rows=None):
+        """Return an Arrow table snapshot of the in-memory table (see RequestTable.to_arrow)"""
+        with self._lock:
+            view = self.table.to_arrow(columns, rows)
+        count('records_scanned', view.num_rows, source='view')
+        return view
+
+    def frame(self, columns=COLUMNS):
+        """Return the selected columns for every request as a DataFrame"""
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown request fields: {', '.join(sorted(unknown))}")
+        with self._lock:
+            frame = pd.read_sql_query(f"SELECT {','.join(columns)} FROM requests ORDER BY id", self._conn)
+        count('records_scanned', len(frame), source='frame')
+        return frame
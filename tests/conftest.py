@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import create_request  # noqa: E402
+from store import RequestStore  # noqa: E402
+
+REQUEST_FIELDS = {
+    'requester_name': 'Jane Doe',
+    'request_type': 'General Records',
+    'legislation_type': 'FIPPA',
+    'date_received': '2025-03-10',
+    'description': 'Board minutes',
+}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'foi_requests.db')
+
+
+@pytest.fixture
+def store(db_path):
+    store = RequestStore(db_path)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def new_request():
+    """Create a request in the given store; keyword arguments override the default fields"""
+    def new(store, **fields):
+        return create_request(store, **{**REQUEST_FIELDS, **fields})
+    return new
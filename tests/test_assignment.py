@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+from assignment import AssignmentEngine
+from core import transition_request
+
+
+def days_ago(days):
+    return date.today() - timedelta(days=days)
+
+
+def close(store, request):
+    transition_request(store, request['id'], 'In Progress')
+    transition_request(store, request['id'], 'Completed')
+
+
+def test_inferred_roster_leaves_out_staff_without_recent_or_open_requests(store, new_request):
+    close(store, new_request(store, assigned_to='Retired Analyst', date_received=days_ago(400)))
+    close(store, new_request(store, assigned_to='Current Analyst', date_received=days_ago(30)))
+    new_request(store, assigned_to='Busy Analyst', date_received=days_ago(400))
+
+    engine = AssignmentEngine(store)
+
+    assert sorted(engine.workload()['assigned_to']) == ['Busy Analyst', 'Current Analyst']
+    assert new_request(store, assigner=engine)['assigned_to'] == 'Current Analyst'
+
+
+def test_holders_off_an_explicit_roster_get_no_new_requests(store, new_request):
+    for _ in range(2):
+        new_request(store, assigned_to='Former Analyst')
+
+    engine = AssignmentEngine(store, {'Sarah Johnson': {'capacity': 30}})
+
+    assert [new_request(store, assigner=engine)['assigned_to'] for _ in range(3)] == ['Sarah Johnson'] * 3
+    workload = engine.workload().set_index('assigned_to')
+    assert workload.loc['Former Analyst', ['open', 'active']].tolist() == [2, False]
+    assert workload.loc['Sarah Johnson', ['open', 'active']].tolist() == [3, True]
+
+
+def test_rebalance_hands_out_work_held_off_the_roster(store, new_request):
+    held = [new_request(store, assigned_to='Former Analyst') for _ in range(2)]
+    started = new_request(store, assigned_to='Former Analyst')
+    transition_request(store, started['id'], 'In Progress')
+
+    engine = AssignmentEngine(store, {'Sarah Johnson': {}, 'Michael Chen': {}})
+    moves = engine.rebalance()
+
+    assert sorted(moves) == sorted(request['id'] for request in held)
+    assert set(moves.values()) == {'Sarah Johnson', 'Michael Chen'}
+    assert store.get(started['id'])['assigned_to'] == 'Former Analyst'
+
+
+def test_requests_changed_while_planning_are_not_moved(store, new_request, monkeypatch):
+    held = [new_request(store, assigned_to='Former Analyst') for _ in range(2)]
+    engine = AssignmentEngine(store, {'Sarah Johnson': {}})
+    plan = engine.plan_rebalance
+
+    def plan_then_edit(tolerance):
+        planned = plan(tolerance)
+        store.update(held[0]['id'], description='Edited by another session')
+        return planned
+
+    monkeypatch.setattr(engine, 'plan_rebalance', plan_then_edit)
+
+    assert engine.rebalance() == {held[1]['id']: 'Sarah Johnson'}
+    assert store.get(held[0]['id'])['assigned_to'] == 'Former Analyst'
+
+
+def test_full_experts_fall_back_to_other_staff(store, new_request):
+    roster = {
+        'PHIPA Expert': {'capacity': 3, 'legislations': ['PHIPA']},
+        'FIPPA Analyst': {'capacity': 40, 'legislations': ['FIPPA']},
+    }
+    new_request(store, assigned_to='PHIPA Expert', legislation_type='PHIPA')
+    engine = AssignmentEngine(store, roster)
+
+    assert new_request(store, assigner=engine, legislation_type='PHIPA')['assigned_to'] == 'FIPPA Analyst'
+
+
+def test_rebalance_falls_back_when_the_only_expert_is_the_donor(store, new_request):
+    roster = {
+        'PHIPA Expert': {'capacity': 3, 'legislations': ['PHIPA']},
+        'FIPPA Analyst': {'capacity': 40, 'legislations': ['FIPPA']},
+    }
+    held = [new_request(store, assigned_to='PHIPA Expert', legislation_type='PHIPA') for _ in range(3)]
+    engine = AssignmentEngine(store, roster)
+
+    moves = engine.rebalance()
+
+    assert moves and set(moves) <= {request['id'] for request in held}
+    assert set(moves.values()) == {'FIPPA Analyst'}
@@ -0,0 +1,174 @@
+import os
+
+import pytest
+
+from audit_log import (
+    RECORD_HEADER, SEGMENT_MAGIC, Event, EventLog, decode_event, encode_event, main, rebuild_store
+)
+from core import transition_request
+from store import COLUMNS, RequestStore, events_dir_for
+
+
+def test_record_round_trip():
+    event = Event('FOI-2025-000001', 'transition', 1741600000.5, 'Pending Review', 'In Progress',
+                  {'assigned_to': 'Sarah Johnson'})
+    record = encode_event(event)
+
+    assert len(record) == RECORD_HEADER.size + len('FOI-2025-000001') + len('{"assigned_to":"Sarah Johnson"}')
+    assert decode_event(record, 0) == event
+
+
+def test_record_without_changes_has_no_payload():
+    event = Event('FOI-2025-000001', 'create', 1741600000.0, None, 'Pending Review')
+    record = encode_event(event)
+
+    assert len(record) == RECORD_HEADER.size + len('FOI-2025-000001')
+    assert decode_event(record, 0) == event
+
+
+def test_status_without_a_code_is_kept_in_the_payload():
+    event = Event('FOI-2025-000001', 'update', 1741600000.0, 'In Progress', 'On Hold')
+
+    assert decode_event(encode_event(event), 0).to_status == 'On Hold'
+
+
+def test_append_and_timeline(tmp_path):
+    log = EventLog(str(tmp_path / 'events'))
+    try:
+        log.append([
+            Event('FOI-2025-000001', 'create', 1.0, None, 'Pending Review', {'description': 'a'}),
+            Event('FOI-2025-000002', 'create', 2.0, None, 'Pending Review'),
+            Event('FOI-2025-000001', 'transition', 3.0, 'Pending Review', 'In Progress'),
+        ])
+
+        assert len(log) == 3
+        assert [event.kind for event in log.timeline('FOI-2025-000001')] == ['create', 'transition']
+        assert log.timeline('FOI-2025-000003') == []
+        frame = log.frame()
+        assert list(frame['to_status']) == ['Pending Review', 'Pending Review', 'In Progress']
+    finally:
+        log.close()
+
+
+def test_segments_roll_over(tmp_path):
+    directory = str(tmp_path / 'events')
+    record_size = len(encode_event(Event('FOI-2025-000001', 'create', 1.0, None, 'Pending Review')))
+    log = EventLog(directory, segment_bytes=len(SEGMENT_MAGIC) + 2 * record_size)
+    try:
+        for n in range(5):
+            log.append([Event(f'FOI-2025-{n:06d}', 'create', float(n), None, 'Pending Review')])
+    finally:
+        log.close()
+
+    assert sorted(os.listdir(directory)) == ['000001.seg', '000002.seg', '000003.seg', 'LOCK']
+    reopened = EventLog(directory)
+    try:
+        assert [event.request_id for event in reopened.events()] == [f'FOI-2025-{n:06d}' for n in range(5)]
+    finally:
+        reopened.close()
+
+
+def test_events_reader_survives_appends_that_remap_its_segment(tmp_path):
+    log = EventLog(str(tmp_path / 'events'))
+    try:
+        log.append([Event(f'FOI-2025-{n:06d}', 'create', float(n), None, 'Pending Review') for n in range(3)])
+        events = log.events()
+        first = next(events)
+
+        log.append([Event('FOI-2025-000003', 'create', 3.0, None, 'Pending Review')])
+        assert len(log.timeline('FOI-2025-000003')) == 1
+
+        assert [event.request_id for event in [first, *events]] == [f'FOI-2025-{n:06d}' for n in range(3)]
+    finally:
+        log.close()
+
+
+def test_torn_tail_is_ignored_and_overwritten(tmp_path):
+    directory = str(tmp_path / 'events')
+    log = EventLog(directory)
+    log.append([Event('FOI-2025-000001', 'create', 1.0, None, 'Pending Review')])
+    log.close()
+    segment = os.path.join(directory, '000001.seg')
+    with open(segment, 'ab') as handle:
+        handle.write(encode_event(Event('FOI-2025-000002', 'create', 2.0, None, 'Pending Review'))[:-3])
+
+    log = EventLog(directory)
+    try:
+        assert len(log) == 1
+        log.append([Event('FOI-2025-000003', 'create', 3.0, None, 'Pending Review')])
+        assert [event.request_id for event in log.events()] == ['FOI-2025-000001', 'FOI-2025-000003']
+    finally:
+        log.close()
+
+
+def test_corrupt_record_stops_the_scan(tmp_path):
+    directory = str(tmp_path / 'events')
+    log = EventLog(directory)
+    log.append([
+        Event('FOI-2025-000001', 'create', 1.0, None, 'Pending Review'),
+        Event('FOI-2025-000002', 'create', 2.0, None, 'Pending Review'),
+    ])
+    log.close()
+    segment = os.path.join(directory, '000001.seg')
+    with open(segment, 'r+b') as handle:
+        handle.seek(-1, os.SEEK_END)
+        handle.write(b'X')
+
+    log = EventLog(directory)
+    try:
+        assert [event.request_id for event in log.events()] == ['FOI-2025-000001']
+    finally:
+        log.close()
+
+
+@pytest.fixture
+def history(store, new_request):
+    first = new_request(store)
+    second = new_request(store, description='Contracts')
+    new_request(store, description='Budget')
+    transition_request(store, first['id'], 'In Progress')
+    transition_request(store, first['id'], 'Extended')
+    transition_request(store, second['id'], 'In Progress')
+    store.update(second['id'], assigned_to='Michael Chen')
+    transition_request(store, second['id'], 'Completed')
+    return store
+
+
+def test_verify_matches_the_database(history, db_path, capsys):
+    assert main(['--db', db_path, 'verify']) == 0
+    assert 'for 3 requests' in capsys.readouterr().out
+
+
+def test_verify_reports_changes_made_outside_the_log(history, db_path, capsys):
+    request_id = history.query()[0]['id']
+    with history._conn:
+        history._conn.execute("UPDATE requests SET description = 'edited' WHERE id = ?", (request_id,))
+
+    assert main(['--db', db_path, 'verify']) == 1
+    assert request_id in capsys.readouterr().out
+
+
+def test_rebuild_reproduces_the_database(history, tmp_path):
+    rebuilt = RequestStore(str(tmp_path / 'rebuilt.db'), audit=False)
+    try:
+        assert rebuild_store(history.events, rebuilt) == 3
+        expected = {request['id']: {k: request[k] for k in COLUMNS} for request in history.query()}
+        actual = {request['id']: {k: request[k] for k in COLUMNS} for request in rebuilt.query()}
+        assert actual == expected
+        with pytest.raises(ValueError):
+            rebuild_store(history.events, rebuilt)
+    finally:
+        rebuilt.close()
+
+
+def test_existing_database_is_seeded_into_an_empty_log(db_path, new_request):
+    store = RequestStore(db_path, audit=False)
+    new_request(store)
+    store.close()
+    assert not os.path.exists(events_dir_for(db_path))
+
+    store = RequestStore(db_path)
+    try:
+        assert [event.kind for event in store.history(store.query()[0]['id'])] == ['create']
+    finally:
+        store.close()
@@ -0,0 +1,50 @@
+import pytest
+
+from core import ValidationError, create_requests, find_requests, transition_requests
+
+
+def test_search_pages_follow_the_cursor(store, new_request):
+    created = [new_request(store, requester_name=f'Jane Doe {i}') for i in range(3)]
+
+    first, cursor = find_requests(store, search='doe', limit=2)
+    second, last = find_requests(store, search='doe', limit=2, cursor=cursor)
+
+    assert {r['id'] for r in first + second} == {r['id'] for r in created}
+    assert last is None
+
+
+@pytest.mark.parametrize('cursor', ['abc', '-2', 'FOI-2025-000001'])
+def test_malformed_search_cursor_is_rejected(store, new_request, cursor):
+    new_request(store, requester_name='Jane Doe')
+
+    with pytest.raises(ValidationError):
+        find_requests(store, search='doe', cursor=cursor)
+
+
+def test_created_requests_are_returned_as_stored(store, new_request):
+    created, errors = create_requests(store, [{
+        'requester_name': 'Jane Doe',
+        'request_type': 'General Records',
+        'legislation_type': 'FIPPA',
+        'date_received': '2025-03-03',
+        'description': 'Council meeting minutes'
+    }])
+
+    assert errors == []
+    assert created == [store.get(created[0]['id'])]
+    assert created[0]['version'] == 1
+    assert type(created[0]['fee_estimate']) is int
+    assert new_request(store, requester_name='John Smith')['version'] == 1
+
+
+def test_malformed_transition_items_are_reported_per_item(store, new_request):
+    request = new_request(store, requester_name='Jane Doe')
+
+    results = transition_requests(store, [
+        {'id': ['FOI'], 'status': 'In Progress'},
+        {'id': request['id'], 'status': 'In Progress', 'version': '1'},
+        {'id': request['id'], 'status': 'In Progress', 'version': 1},
+    ])
+
+    assert [result.get('error') for result in results] == ['invalid', 'invalid', None]
+    assert results[2]['request']['status'] == 'In Progress'
@@ -0,0 +1,18 @@
+import numpy as np
+
+from deadlines import AT_RISK_DAYS, days_remaining, urgency_levels
+
+
+def test_days_remaining():
+    now = np.datetime64('2025-06-02T09:30:00')
+
+    assert days_remaining(['2025-06-03', '2025-06-02', '2025-05-30'], now).tolist() == [0, -1, -4]
+    assert days_remaining([], now).size == 0
+
+
+def test_urgency_levels_agree_with_days_remaining():
+    due_dates = np.datetime_as_string(np.arange('2025-05-20', '2025-06-20', dtype='datetime64[D]')).astype(object)
+    for now in np.arange('2025-06-01T00:00:00', '2025-06-03T00:00:00', 3 * 3600, dtype='datetime64[s]'):
+        days = days_remaining(due_dates, now)
+        expected = np.select([days < 0, days <= AT_RISK_DAYS], ['Overdue', 'At Risk'], default='')
+        assert urgency_levels(due_dates, now).tolist() == expected.tolist()
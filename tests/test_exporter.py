@@ -0,0 +1,25 @@
+import io
+
+import pandas as pd
+import pytest
+
+from exporter import export
+from store import RequestStore
+
+
+@pytest.mark.parametrize('load_table', [True, False])
+def test_export_filters_by_urgency(store, db_path, new_request, load_table):
+    overdue, at_risk, _ = (new_request(store, description=d) for d in ('Contracts', 'Budget', 'Board minutes'))
+    store.update(overdue['id'], urgency='Overdue')
+    store.update(at_risk['id'], urgency='At Risk')
+    reader = store if load_table else RequestStore(db_path, audit=False, load_table=False)
+    out = io.BytesIO()
+
+    try:
+        assert export(reader, out, 'csv', chunk_size=1, urgency=['Overdue']) == 1
+    finally:
+        if not load_table:
+            reader.close()
+
+    out.seek(0)
+    assert pd.read_csv(out)['id'].tolist() == [overdue['id']]
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import fees
+from core import create_requests, transition_request
+from fees import FeeSchedule, calculate_fee, recompute_fees
+
+RULES = [
+    ('FIPPA', None, 'application', 5, 0),
+    ('FIPPA', None, 'page', 0.20, 0),
+    ('FIPPA', None, 'search_hour', 30, 0),
+    ('FIPPA', 'Personal Health Information', 'search_hour', 0, 0),
+    ('PHIPA', None, 'page', 0.25, 20),
+    ('PHIPA', None, 'usb', 10, 0),
+]
+TYPICAL = {
+    'General Records': (100, 2, 0, 'paper'),
+    'Personal Health Information': (20, 0, 0, 'usb'),
+}
+
+
+@pytest.fixture
+def schedule():
+    return FeeSchedule(RULES, {'FIPPA': 5, 'PHIPA': 0}, TYPICAL)
+
+
+def test_typical_workload_fills_in_missing_values(schedule):
+    fee = schedule.evaluate(
+        ['General Records', 'General Records', 'General Records'], ['FIPPA'] * 3,
+        pages=[np.nan, 10, np.nan], search_hours=[np.nan, 0, 1]
+    )
+
+    assert fee.tolist() == [85.0, 5.0, 55.0]
+
+
+def test_type_specific_rules_override_legislation_wide_ones(schedule):
+    fee = schedule.evaluate(
+        ['Personal Health Information', 'Other'], ['FIPPA', 'FIPPA'], pages=[40, 40], search_hours=[4, 4]
+    )
+
+    assert fee.tolist() == [13.0, 133.0]
+
+
+def test_free_units_media_and_waivers(schedule):
+    fee = schedule.evaluate(
+        ['Personal Health Information'] * 4, ['PHIPA'] * 4,
+        pages=[20, 60, 60, 60], media=[None, '', 'paper', 'usb'], waiver=[False, False, False, True]
+    )
+
+    assert fee.tolist() == [10.0, 20.0, 10.0, 0.0]
+
+
+def test_unknown_legislation_or_media_is_rejected(schedule):
+    with pytest.raises(ValueError, match='legislation'):
+        schedule.evaluate(['General Records'], ['HIPAA'])
+    with pytest.raises(ValueError, match='media'):
+        schedule.evaluate(['General Records'], ['FIPPA'], media=['floppy'])
+
+
+def test_phipa_personal_health_information_is_free_by_default():
+    assert calculate_fee('Personal Health Information', 'PHIPA') == 0
+    assert calculate_fee('Personal Health Information', 'PHIPA', pages=60) == 10
+
+
+def test_recompute_only_redoes_open_computed_estimates(store, new_request, monkeypatch):
+    computed = new_request(store, pages=100, search_hours=0, prep_hours=0)
+    completed = new_request(store, pages=100, search_hours=0, prep_hours=0)
+    transition_request(store, completed['id'], 'In Progress')
+    transition_request(store, completed['id'], 'Completed')
+    (imported,), errors = create_requests(store, [{
+        'requester_name': 'Jane Doe', 'request_type': 'General Records', 'legislation_type': 'FIPPA',
+        'date_received': '2025-03-10', 'description': 'Board minutes', 'fee_estimate': '12.5'
+    }])
+    assert errors == []
+    assert (computed['fee_estimate'], computed['fee_computed']) == (50, True)
+    assert (imported['fee_estimate'], imported['fee_computed']) == (12.5, False)
+
+    monkeypatch.setattr(fees, 'FEE_RULES', fees.FEE_RULES + [('FIPPA', None, 'page', 0.50, 0)])
+    try:
+        assert recompute_fees(store) == 1
+    finally:
+        fees.fee_schedule.cache_clear()
+
+    assert store.get(computed['id'])['fee_estimate'] == 80
+    assert store.get(completed['id'])['fee_estimate'] == 50
+    assert store.get(imported['id'])['fee_estimate'] == 12.5
@@ -0,0 +1,86 @@
+import io
+
+from importer import import_file
+from store import RequestStore
+
+
+def import_ids(store, *ids, date_received='2025-03-10'):
+    lines = ['id,requester_name,request_type,legislation_type,date_received,description']
+    lines += [f'{request_id},Legacy Requester,General Records,FIPPA,{date_received},Imported' for request_id in ids]
+    report = import_file(store, io.StringIO('\n'.join(lines) + '\n'), fmt='csv')
+    assert report.errors == []
+    return report
+
+
+def test_ids_count_up_per_year(store, new_request):
+    assert [new_request(store)['id'] for _ in range(3)] == ['FOI-2025-000001', 'FOI-2025-000002', 'FOI-2025-000003']
+    assert store.allocate_ids(2025, 2) == ['FOI-2025-000021', 'FOI-2025-000022']
+
+
+def test_imported_ids_are_skipped_by_next_id(store, new_request):
+    assert new_request(store)['id'] == 'FOI-2025-000001'
+    import_ids(store, 'FOI-2025-000002', 'FOI-2025-000030')
+
+    created = [new_request(store)['id'] for _ in range(40)]
+
+    assert 'FOI-2025-000002' not in created
+    assert 'FOI-2025-000030' not in created
+    assert len(set(created)) == 40
+    assert store.count() == 43
+
+
+def test_imported_ids_move_the_sequence_for_bulk_allocation(store, new_request):
+    new_request(store)
+    import_ids(store, 'FOI-2025-000030')
+
+    allocated = store.allocate_ids(2025, 20)
+
+    assert allocated[0] == 'FOI-2025-000031'
+
+
+def test_first_allocation_starts_after_existing_ids(store, new_request):
+    import_ids(store, 'FOI-2025-000007', 'FOI-2025-000003')
+
+    assert new_request(store)['id'] == 'FOI-2025-000008'
+
+
+def test_mixed_import_allocates_after_the_given_ids(store, new_request):
+    new_request(store)
+    csv = (
+        'id,requester_name,request_type,legislation_type,date_received,description\n'
+        'FOI-2025-000050,A,General Records,FIPPA,2025-03-10,x\n'
+        ',B,General Records,FIPPA,2025-03-10,x\n'
+    )
+    report = import_file(store, io.StringIO(csv), fmt='csv')
+
+    assert report.rows_imported == 2
+    assert 'FOI-2025-000050' in store
+    created = [new_request(store)['id'] for _ in range(60)]
+    assert len(set(created)) == 60
+    assert store.count() == 63
+
+
+def test_year_rollover(store, new_request):
+    assert new_request(store, date_received='2025-12-31')['id'] == 'FOI-2025-000001'
+    import_ids(store, 'FOI-2026-000005', date_received='2026-01-01')
+
+    assert new_request(store, date_received='2026-01-01')['id'] == 'FOI-2026-000006'
+    assert new_request(store, date_received='2025-12-31')['id'] == 'FOI-2025-000002'
+
+    import_ids(store, 'FOI-2026-000010', date_received='2026-01-02')
+    assert store.allocate_ids(2026, 1) == ['FOI-2026-000026']
+    assert new_request(store, date_received='2027-01-04')['id'] == 'FOI-2027-000001'
+
+
+def test_ids_imported_by_another_process(store, db_path, new_request):
+    assert new_request(store)['id'] == 'FOI-2025-000001'
+    other = RequestStore(db_path)
+    try:
+        # Lands inside the block this store has already reserved
+        import_ids(other, 'FOI-2025-000002', 'FOI-2025-000003')
+        assert new_request(other)['id'] == 'FOI-2025-000021'
+    finally:
+        other.close()
+
+    assert new_request(store)['id'] == 'FOI-2025-000004'
+    assert store.count() == 5
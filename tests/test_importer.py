@@ -0,0 +1,24 @@
+import io
+import sqlite3
+
+from importer import import_file
+
+
+def test_rolled_back_chunk_reports_each_row_once(store, monkeypatch):
+    csv = (
+        'requester_name,request_type,legislation_type,date_received,description\n'
+        'Jane Doe,General Records,FIPPA,2025-03-10,Board minutes\n'
+        'Jane Doe,General Records,FIPPA,10/03/2025,Board minutes\n'
+        'Jane Doe,General Records,FIPPA,2025-03-11,Contracts\n'
+    )
+
+    def add_many(requests):
+        raise sqlite3.IntegrityError('UNIQUE constraint failed: requests.id')
+    monkeypatch.setattr(store, 'add_many', add_many)
+
+    report = import_file(store, io.StringIO(csv), fmt='csv')
+
+    assert (report.rows_read, report.rows_imported, report.error_count) == (3, 0, 3)
+    assert [row for row, _ in report.errors] == [1, 2, 3]
+    assert report.errors[1] == (2, 'date_received must be YYYY-MM-DD')
+    assert report.errors[0][1].startswith('chunk rolled back')
@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from ontario_calendar import easter_sunday, next_business_day, ontario_holidays, roll_forward
+
+
+@pytest.mark.parametrize('year, easter', [
+    (2019, date(2019, 4, 21)),
+    (2024, date(2024, 3, 31)),
+    (2025, date(2025, 4, 20)),
+    (2026, date(2026, 4, 5)),
+    (2038, date(2038, 4, 25)),
+])
+def test_easter_sunday(year, easter):
+    assert easter_sunday(year) == easter
+
+
+def test_holidays_2025():
+    assert ontario_holidays(2025) == {
+        date(2025, 1, 1): "New Year's Day",
+        date(2025, 2, 17): 'Family Day',
+        date(2025, 4, 18): 'Good Friday',
+        date(2025, 4, 21): 'Easter Monday',
+        date(2025, 5, 19): 'Victoria Day',
+        date(2025, 7, 1): 'Canada Day',
+        date(2025, 8, 4): 'Civic Holiday',
+        date(2025, 9, 1): 'Labour Day',
+        date(2025, 10, 13): 'Thanksgiving Day',
+        date(2025, 11, 11): 'Remembrance Day',
+        date(2025, 12, 25): 'Christmas Day',
+        date(2025, 12, 26): 'Boxing Day',
+    }
+
+
+@pytest.mark.parametrize('year, victoria_day', [
+    (2021, date(2021, 5, 24)),  # May 24 itself is a Monday
+    (2022, date(2022, 5, 23)),
+    (2027, date(2027, 5, 24)),
+])
+def test_victoria_day_is_the_monday_before_may_25(year, victoria_day):
+    assert ontario_holidays(year)[victoria_day] == 'Victoria Day'
+
+
+def test_weekend_holidays_are_observed_on_the_next_free_weekday():
+    assert ontario_holidays(2022)[date(2022, 1, 3)] == "New Year's Day (observed)"
+    assert ontario_holidays(2023)[date(2023, 7, 3)] == 'Canada Day (observed)'
+    # Christmas on a Sunday moves past Boxing Day on the Monday
+    assert ontario_holidays(2022)[date(2022, 12, 26)] == 'Boxing Day'
+    assert ontario_holidays(2022)[date(2022, 12, 27)] == 'Christmas Day (observed)'
+    # Both on a weekend take the following Monday and Tuesday
+    assert ontario_holidays(2021)[date(2021, 12, 27)] == 'Christmas Day (observed)'
+    assert ontario_holidays(2021)[date(2021, 12, 28)] == 'Boxing Day (observed)'
+
+
+def test_next_business_day():
+    assert next_business_day(date(2025, 3, 12)) == date(2025, 3, 12)
+    assert next_business_day(date(2025, 3, 15)) == date(2025, 3, 17)
+    # Good Friday, then the weekend and Easter Monday
+    assert next_business_day(date(2025, 4, 18)) == date(2025, 4, 22)
+    assert next_business_day(date(2025, 12, 25)) == date(2025, 12, 29)
+
+
+def test_roll_forward_matches_next_business_day():
+    days = [date(2020, 12, 1) + timedelta(days=n) for n in range(3 * 366)]
+    rolled = roll_forward(np.array(days, dtype='datetime64[D]'))
+    assert [day.item() for day in rolled] == [next_business_day(day) for day in days]
+
+
+def test_roll_forward_empty():
+    assert roll_forward(np.array([], dtype='datetime64[D]')).size == 0
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from core import transition_request
+from scheduler import DeadlineScheduler
+from store import RequestStore
+
+NOW = np.datetime64('2025-06-02T09:00:00')
+
+
+@pytest.fixture
+def scheduler(store):
+    return DeadlineScheduler(store)
+
+
+def test_flags_are_kept_apart_from_status(store, new_request, scheduler):
+    overdue = new_request(store, date_received='2025-04-01', legislation_type='PHIPA')
+    at_risk = new_request(store, date_received='2025-05-05', legislation_type='PHIPA')
+    on_time = new_request(store, date_received='2025-05-30', legislation_type='PHIPA')
+
+    flags = scheduler.poll(NOW)
+
+    assert flags == {overdue['id']: 'Overdue', at_risk['id']: 'At Risk'}
+    assert store.get(overdue['id'])['status'] == 'Pending Review'
+    assert store.get(on_time['id'])['urgency'] == ''
+    assert store.aggregates.get('status', 'Pending Review') == 3
+    assert store.aggregates.get('urgency', 'Overdue') == 1
+
+
+def test_flagged_request_moves_through_the_workflow(store, new_request, scheduler):
+    request = new_request(store, date_received='2025-04-01', legislation_type='PHIPA')
+    scheduler.poll(NOW)
+
+    started = transition_request(store, request['id'], 'In Progress')
+
+    assert (started['status'], started['urgency']) == ('In Progress', 'Overdue')
+    completed = transition_request(store, request['id'], 'Completed')
+    assert (completed['status'], completed['urgency']) == ('Completed', '')
+    assert scheduler.poll(NOW) == {}
+
+
+def test_flag_is_lowered_when_the_due_date_moves_later(store, new_request, scheduler):
+    request = new_request(store, date_received='2025-04-01', legislation_type='PHIPA')
+    scheduler.poll(NOW)
+
+    store.update(request['id'], due_date='2025-06-05')
+    assert scheduler.poll(NOW) == {request['id']: 'At Risk'}
+    store.update(request['id'], due_date='2025-07-31')
+    assert scheduler.poll(NOW) == {request['id']: ''}
+    # and raised again once the new thresholds pass
+    assert scheduler.poll(np.datetime64('2025-07-28T00:00:00')) == {request['id']: 'At Risk'}
+    assert scheduler.poll(np.datetime64('2025-08-01T00:00:00')) == {request['id']: 'Overdue'}
+
+
+def test_reminders_only_for_raised_flags(store, new_request, scheduler):
+    request = new_request(store, date_received='2025-04-01', legislation_type='PHIPA')
+    scheduler.poll(NOW)
+    store.update(request['id'], due_date='2025-07-31')
+    scheduler.poll(NOW)
+
+    reminders = [event for event in store.history(request['id']) if event.kind == 'reminder']
+
+    assert [event.changes['urgency'] for event in reminders] == ['Overdue']
+
+
+def test_statuses_flagged_by_older_versions_are_restored(db_path, new_request):
+    store = RequestStore(db_path)
+    started = new_request(store, date_received='2025-04-01', legislation_type='PHIPA')
+    transition_request(store, started['id'], 'In Progress')
+    pending = new_request(store, date_received='2025-05-01', legislation_type='PHIPA')
+    with store._conn:
+        store._conn.execute("UPDATE requests SET status = 'Overdue' WHERE id = ?", (started['id'],))
+        store._conn.execute("UPDATE requests SET status = 'At Risk' WHERE id = ?", (pending['id'],))
+    store.close()
+
+    store = RequestStore(db_path)
+    try:
+        assert {k: store.get(started['id'])[k] for k in ('status', 'urgency')} == {
+            'status': 'In Progress', 'urgency': 'Overdue'
+        }
+        assert {k: store.get(pending['id'])[k] for k in ('status', 'urgency')} == {
+            'status': 'Pending Review', 'urgency': 'At Risk'
+        }
+    finally:
+        store.close()
@@ -0,0 +1,16 @@
+from core import transition_request
+
+
+def test_views_are_not_changed_by_later_updates(store, new_request):
+    request = new_request(store)
+    view = store.view(['id', 'status', 'assigned_to', 'fee_estimate'])
+    arrow = store.arrow_view(['status', 'fee_estimate'])
+
+    transition_request(store, request['id'], 'In Progress')
+    store.update(request['id'], assigned_to='Sarah Johnson', fee_estimate=12.5)
+
+    assert view['status'].tolist() == ['Pending Review']
+    assert view['assigned_to'].tolist() == ['Unassigned']
+    assert view['fee_estimate'].tolist() == [request['fee_estimate']]
+    assert arrow.to_pydict() == {'status': ['Pending Review'], 'fee_estimate': [request['fee_estimate']]}
+    assert store.view(['status'])['status'].tolist() == ['In Progress']
@@ -0,0 +1,146 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_COLUMNS = [
+    'id', 'date_received', 'due_date', 'status', 'legislation_type',
+    'request_type', 'assigned_to', 'extension_granted'
+]
+
+# Choices offered for the trend charts, in weeks (None shows everything)
+TREND_WINDOWS = {'Last 13 weeks': 13, 'Last 26 weeks': 26, 'Last year': 52, 'Last 2 years': 104, 'All time': None}
+
+
+def completion_times(events):
+    """Return the time each request was completed, from an audit log event frame"""
+    # Requests created or imported as Completed have no completion time of their own
+    completed = events[(events['kind'] == 'transition') & (events['to_status'] == 'Completed')]
+    return completed.groupby('request_id', sort=False)['time'].max()
+
+
+def build_snapshot(view, completed_at):
+    """Derive the trend columns from a typed request view (see RequestStore.view)"""
+    snapshot = pd.DataFrame({
+        'received': view['date_received'].to_numpy(),
+        'legislation_type': view['legislation_type'].array,
+        'request_type': view['request_type'].array,
+        'assigned_to': view['assigned_to'].array,
+        'extension_granted': view['extension_granted'].to_numpy(),
+        'completed_at': completed_at.reindex(view['id']).to_numpy(),
+    }, index=pd.Index(view['id'], name='id'))
+    snapshot['days_to_complete'] = (snapshot['completed_at'].dt.normalize() - snapshot['received']).dt.days
+    # Completed requests imported without history are taken as closed on their due date
+    is_completed = (view['status'] == 'Completed').to_numpy()
+    closed = np.where(is_completed, view['due_date'].to_numpy(), np.datetime64('NaT'))
+    snapshot['closed'] = snapshot['completed_at'].fillna(pd.Series(closed, index=snapshot.index))
+    return snapshot
+
+
+def weekly_intake(snapshot, now):
+    """Requests received per week, one column per legislation"""
+    weeks = pd.period_range(snapshot['received'].min(), now, freq='W')
+    intake = (
+        snapshot.groupby([snapshot['received'].dt.to_period('W'), 'legislation_type'], observed=False)
+        .size()
+        .unstack(fill_value=0)
+        .reindex(weeks, fill_value=0)
+    )
+    intake.index = intake.index.start_time
+    return intake
+
+
+def time_to_complete(snapshot):
+    """Median days from receipt to completion by legislation and request type"""
+    completed = snapshot[snapshot['days_to_complete'].notna()]
+    return completed.pivot_table(
+        index='request_type', columns='legislation_type', values='days_to_complete',
+        aggfunc='median', observed=True
+    )
+
+
+def completion_trend(snapshot):
+    """Median days to complete per month of completion, one column per legislation"""
+    completed = snapshot[snapshot['days_to_complete'].notna()]
+    if completed.empty:
+        return pd.DataFrame()
+    trend = (
+        completed.groupby([completed['completed_at'].dt.to_period('M'), 'legislation_type'], observed=True)
+        ['days_to_complete'].median()
+        .unstack()
+    )
+    trend.index = trend.index.start_time
+    return trend
+
+
+def extension_rates(snapshot):
+    """Share of requests granted an extension, by legislation and by month received"""
+    by_legislation = snapshot.groupby('legislation_type', observed=True)['extension_granted'].mean() * 100
+    by_month = snapshot.groupby(snapshot['received'].dt.to_period('M'))['extension_granted'].mean() * 100
+    by_month.index = by_month.index.start_time
+    return by_legislation.rename('extension %'), by_month.rename('extension %')
+
+
+def assignee_workload(snapshot, now):
+    """Open requests held by each assignee at the end of every week"""
+    weeks = pd.period_range(snapshot['received'].min(), now, freq='W')
+
+    assignees = snapshot['assigned_to'].cat.categories
+
+    def weekly(dates):
+        known = dates.notna()
+        counts = (
+            snapshot[known].groupby([dates[known].dt.to_period('W'), 'assigned_to'], observed=True)
+            .size()
+            .unstack(fill_value=0)
+        )
+        return counts.reindex(index=weeks, columns=assignees, fill_value=0).cumsum()
+
+    workload = (weekly(snapshot['received']) - weekly(snapshot['closed'])).rename_axis(columns='assigned_to')
+    workload.index = workload.index.start_time
+    return workload
+
+
+def compute_rollups(snapshot, now):
+    """Compute every trend rollup from one snapshot"""
+    now = pd.Timestamp(now)
+    if snapshot.empty:
+        return None
+    by_legislation, by_month = extension_rates(snapshot)
+    return {
+        'intake': weekly_intake(snapshot, now),
+        'time_to_complete': time_to_complete(snapshot),
+        'completion_trend': completion_trend(snapshot),
+        'extension_by_legislation': by_legislation,
+        'extension_by_month': by_month,
+        'workload': assignee_workload(snapshot, now),
+    }
+
+
+def window(frame, now, weeks):
+    """Keep the rows of a time-indexed rollup that fall in the last weeks"""
+    if weeks is None or frame.empty:
+        return frame
+    return frame[frame.index >= pd.Timestamp(now) - pd.Timedelta(weeks=weeks)]
+
+
+class TrendCache:
+    """Rollups shared by every session, recomputed only when requests change or the day rolls over"""
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.Lock()
+        self._key = None
+        self._rollups = None
+
+    def rollups(self, now):
+        """Return the rollups for the current data, or None when there are no requests"""
+        with self._lock:
+            key = (self._store.change_seq(), pd.Timestamp(now).date())
+            if key != self._key:
+                events = self._store.events.frame() if self._store.events is not None else None
+                completed_at = completion_times(events) if events is not None else pd.Series(dtype='datetime64[ns]')
+                snapshot = build_snapshot(self._store.view(SNAPSHOT_COLUMNS), completed_at)
+                self._rollups = compute_rollups(snapshot, now)
+                self._key = key
+            return self._rollups